@@ -4,13 +4,17 @@ Handles adding and managing tools for agents
 """
 
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from loguru import logger
+import asyncio
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_async_db
 from app.core.security import get_current_user_optional
+from app.models.agent import Agent
 from app.models.user import User
 from app.services.vapi_service import vapi_service
 
@@ -30,6 +34,65 @@ class AddToolsToAgentRequest(BaseModel):
     update_system_prompt: bool = True
 
 
+async def _get_user_agent(db: AsyncSession, agent_id: str, current_user: User) -> Optional[Agent]:
+    """Get an agent owned by the current user"""
+    return await db.scalar(
+        select(Agent).where(
+            Agent.id == agent_id,
+            Agent.user_id == current_user.id
+        )
+    )
+
+
+async def _resolve_tool(
+    tool_id: str,
+    semaphore: asyncio.Semaphore
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Fetch a tool from Vapi, isolating failures
+
+    Returns:
+        (tool_id, tool data) - tool data is None if the tool could not be fetched
+    """
+    async with semaphore:
+        try:
+            return tool_id, await vapi_service.get_tool(tool_id)
+        except Exception as e:
+            logger.error(f"Error fetching tool {tool_id}: {str(e)}")
+            return tool_id, None
+
+
+def _build_tool_entry(tool_id: str, tool: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build the assistant model.tools entry activating a tool"""
+    tool_type = tool.get("type") if tool else None
+
+    # For native Google Calendar tools, use type with name and description to activate
+    if tool_type == "google.calendar.event.create":
+        return {
+            "type": tool_type,
+            "name": "scheduleAppointment",
+            "description": "Use this tool to schedule appointments and create calendar events. Notes: - All appointments are 30 mins.",
+            "enabled": True
+        }
+    if tool_type == "google.calendar.availability.check":
+        return {
+            "type": tool_type,
+            "name": "checkAvailability",
+            "description": "Use this tool to check calendar availability.",
+            "enabled": True
+        }
+
+    # For custom tools (or if we can't fetch the tool), use toolId
+    return {"toolId": tool_id}
+
+
+def _has_tool_entry(tools: List[Dict[str, Any]], entry: Dict[str, Any]) -> bool:
+    """Check if an equivalent entry is already in model.tools"""
+    if "toolId" in entry:
+        return any(t.get("toolId") == entry["toolId"] for t in tools)
+    return any(t.get("type") == entry["type"] and "toolId" not in t for t in tools)
+
+
 @router.get("/vapi/tools")
 async def get_vapi_tools(
     current_user: User = Depends(get_current_user_optional)
@@ -41,14 +104,14 @@ async def get_vapi_tools(
         List of available tools
     """
     try:
-        async with vapi_service.client() as client:
-            response = await client.get(
-                f"{vapi_service.base_url}/tool",
-                headers=vapi_service.headers,
-                timeout=30.0
-            )
-            response.raise_for_status()
-            tools = response.json()
+        client = vapi_service.client()
+        response = await client.get(
+            f"{vapi_service.base_url}/tool",
+            headers=vapi_service.headers,
+            timeout=30.0
+        )
+        response.raise_for_status()
+        tools = response.json()
 
         logger.info(f"Retrieved {len(tools)} tools from Vapi")
         return {"tools": tools}
@@ -116,7 +179,7 @@ async def add_tools_to_agent(
     agent_id: str,
     request: AddToolsToAgentRequest,
     current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Add tools to an agent
@@ -129,13 +192,7 @@ async def add_tools_to_agent(
         Updated agent configuration
     """
     try:
-        from app.models.agent import Agent
-
-        # Get agent from database
-        agent = db.query(Agent).filter(
-            Agent.id == agent_id,
-            Agent.user_id == current_user.id
-        ).first()
+        agent = await _get_user_agent(db, agent_id, current_user)
 
         if not agent:
             raise HTTPException(status_code=404, detail="Agent not found")
@@ -151,44 +208,34 @@ async def add_tools_to_agent(
         current_tools = assistant_config.get("model", {}).get("tools", [])
         current_tool_ids = assistant_config.get("model", {}).get("toolIds", [])
 
-        # For each tool ID, fetch the tool to get its type
-        new_tools = []
-        new_tool_ids = []
-
-        for tool_id in request.tool_ids:
-            try:
-                tool = await vapi_service.get_tool(tool_id)
-                tool_type = tool.get("type")
-
-                # Add to toolIds array (for referencing)
-                new_tool_ids.append(tool_id)
-
-                # For native Google Calendar tools, use type with name and description to activate
-                if tool_type == "google.calendar.event.create":
-                    new_tools.append({
-                        "type": tool_type,
-                        "name": "scheduleAppointment",
-                        "description": "Use this tool to schedule appointments and create calendar events. Notes: - All appointments are 30 mins.",
-                        "enabled": True
-                    })
-                elif tool_type == "google.calendar.availability.check":
-                    new_tools.append({
-                        "type": tool_type,
-                        "name": "checkAvailability",
-                        "description": "Use this tool to check calendar availability.",
-                        "enabled": True
-                    })
-                else:
-                    # For custom tools, use toolId
-                    new_tools.append({"toolId": tool_id})
-            except Exception as e:
-                logger.error(f"Error fetching tool {tool_id}: {str(e)}")
-                # Fallback to toolId if we can't fetch the tool
-                new_tool_ids.append(tool_id)
-                new_tools.append({"toolId": tool_id})
-
-        updated_tools = current_tools + new_tools
-        updated_tool_ids = current_tool_ids + new_tool_ids
+        # Fetch the requested tools concurrently to get their types
+        requested_ids = list(dict.fromkeys(request.tool_ids))
+        semaphore = asyncio.Semaphore(settings.VAPI_MAX_CONCURRENT_REQUESTS)
+        resolved = await asyncio.gather(
+            *[_resolve_tool(tool_id, semaphore) for tool_id in requested_ids]
+        )
+
+        # Skip tools that are already attached so repeated calls don't grow the payload
+        updated_tool_ids = list(current_tool_ids)
+        updated_tools = list(current_tools)
+        added_ids = []
+
+        for tool_id, tool in resolved:
+            entry = _build_tool_entry(tool_id, tool)
+            is_new = False
+
+            # Add to toolIds array (for referencing)
+            if tool_id not in updated_tool_ids:
+                updated_tool_ids.append(tool_id)
+                is_new = True
+
+            # Add to tools array (for activation)
+            if not _has_tool_entry(updated_tools, entry):
+                updated_tools.append(entry)
+                is_new = True
+
+            if is_new:
+                added_ids.append(tool_id)
 
         # Build update payload with both toolIds (for reference) and tools (for activation)
         update_payload = {
@@ -218,7 +265,8 @@ Notes:
             system_message_found = False
             for msg in current_messages:
                 if msg.get("role") == "system":
-                    msg["content"] = msg["content"] + calendar_instructions
+                    if calendar_instructions.strip() not in msg["content"]:
+                        msg["content"] = msg["content"] + calendar_instructions
                     system_message_found = True
                     break
 
@@ -236,12 +284,13 @@ Notes:
             **update_payload
         )
 
-        logger.info(f"Added {len(request.tool_ids)} tools to agent {agent_id}")
+        logger.info(f"Added {len(added_ids)} tools to agent {agent_id} ({len(requested_ids) - len(added_ids)} already attached)")
 
         return {
             "success": True,
             "agent": updated_assistant,
-            "message": f"Added {len(request.tool_ids)} tools to agent successfully"
+            "added_tool_ids": added_ids,
+            "message": f"Added {len(added_ids)} tools to agent successfully"
         }
 
     except HTTPException:
@@ -258,7 +307,7 @@ Notes:
 async def get_agent_tools(
     agent_id: str,
     current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all tools assigned to an agent
@@ -270,13 +319,7 @@ async def get_agent_tools(
         List of tools assigned to the agent
     """
     try:
-        from app.models.agent import Agent
-
-        # Get agent from database
-        agent = db.query(Agent).filter(
-            Agent.id == agent_id,
-            Agent.user_id == current_user.id
-        ).first()
+        agent = await _get_user_agent(db, agent_id, current_user)
 
         if not agent:
             raise HTTPException(status_code=404, detail="Agent not found")
@@ -309,7 +352,7 @@ async def remove_tool_from_agent(
     agent_id: str,
     tool_id: str,
     current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Remove a tool from an agent
@@ -322,13 +365,7 @@ async def remove_tool_from_agent(
         Updated agent configuration
     """
     try:
-        from app.models.agent import Agent
-
-        # Get agent from database
-        agent = db.query(Agent).filter(
-            Agent.id == agent_id,
-            Agent.user_id == current_user.id
-        ).first()
+        agent = await _get_user_agent(db, agent_id, current_user)
 
         if not agent:
             raise HTTPException(status_code=404, detail="Agent not found")
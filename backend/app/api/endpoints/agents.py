@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from loguru import logger
 from pydantic import BaseModel
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.security import get_current_user_optional
 from app.core.background_sounds import get_background_sound_url
 from app.models.user import User
@@ -20,11 +21,21 @@ class AvatarUpdate(BaseModel):
     avatar_url: str
 
 
+async def _get_user_agent(db: AsyncSession, agent_id: str, current_user: User) -> Optional[Agent]:
+    """Get an agent owned by the current user"""
+    return await db.scalar(
+        select(Agent).where(
+            Agent.id == agent_id,
+            Agent.user_id == current_user.id
+        )
+    )
+
+
 @router.post("", response_model=AgentResponse, status_code=status.HTTP_201_CREATED)
 async def create_agent(
     agent_data: AgentCreate,
     current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new agent and sync with Vapi"""
 
@@ -75,15 +86,15 @@ Objectif : {agent_data.purpose or 'Aider les utilisateurs avec leurs questions'}
         )
 
         db.add(new_agent)
-        db.commit()
-        db.refresh(new_agent)
+        await db.commit()
+        await db.refresh(new_agent)
 
         logger.info(f"Agent created: {new_agent.id} (Vapi: {new_agent.vapi_assistant_id})")
         return new_agent
 
     except Exception as e:
         logger.error(f"Error creating agent: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create agent: {str(e)}"
@@ -94,32 +105,29 @@ Objectif : {agent_data.purpose or 'Aider les utilisateurs avec leurs questions'}
 async def list_agents(
     status_filter: Optional[str] = Query(None, alias="status"),
     current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """List all agents for current user"""
 
-    query = db.query(Agent).filter(Agent.user_id == current_user.id)
+    query = select(Agent).where(Agent.user_id == current_user.id)
 
     # Apply status filter if provided
     if status_filter:
-        query = query.filter(Agent.status == status_filter)
+        query = query.where(Agent.status == status_filter)
 
-    agents = query.order_by(Agent.created_at.desc()).all()
-    return agents
+    agents = await db.scalars(query.order_by(Agent.created_at.desc()))
+    return agents.all()
 
 
 @router.get("/{agent_id}", response_model=AgentResponse)
 async def get_agent(
     agent_id: str,
     current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific agent by ID"""
 
-    agent = db.query(Agent).filter(
-        Agent.id == agent_id,
-        Agent.user_id == current_user.id
-    ).first()
+    agent = await _get_user_agent(db, agent_id, current_user)
 
     if not agent:
         raise HTTPException(
@@ -135,14 +143,11 @@ async def update_agent(
     agent_id: str,
     agent_data: AgentUpdate,
     current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update an agent and sync with Vapi"""
 
-    agent = db.query(Agent).filter(
-        Agent.id == agent_id,
-        Agent.user_id == current_user.id
-    ).first()
+    agent = await _get_user_agent(db, agent_id, current_user)
 
     if not agent:
         raise HTTPException(
@@ -263,15 +268,15 @@ async def update_agent(
         for field, value in update_data.items():
             setattr(agent, field, value)
 
-        db.commit()
-        db.refresh(agent)
+        await db.commit()
+        await db.refresh(agent)
 
         logger.info(f"Agent updated: {agent.id}")
         return agent
 
     except Exception as e:
         logger.error(f"Error updating agent: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update agent: {str(e)}"
@@ -282,14 +287,11 @@ async def update_agent(
 async def delete_agent(
     agent_id: str,
     current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete an agent and remove from Vapi"""
 
-    agent = db.query(Agent).filter(
-        Agent.id == agent_id,
-        Agent.user_id == current_user.id
-    ).first()
+    agent = await _get_user_agent(db, agent_id, current_user)
 
     if not agent:
         raise HTTPException(
@@ -308,15 +310,15 @@ async def delete_agent(
                 logger.warning(f"Failed to delete Vapi assistant: {vapi_error}")
 
         # Delete local agent
-        db.delete(agent)
-        db.commit()
+        await db.delete(agent)
+        await db.commit()
 
         logger.info(f"Agent deleted: {agent_id}")
         return None
 
     except Exception as e:
         logger.error(f"Error deleting agent: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to delete agent: {str(e)}"
@@ -328,14 +330,11 @@ async def update_agent_avatar(
     agent_id: str,
     avatar_data: AvatarUpdate,
     current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update agent avatar image"""
 
-    agent = db.query(Agent).filter(
-        Agent.id == agent_id,
-        Agent.user_id == current_user.id
-    ).first()
+    agent = await _get_user_agent(db, agent_id, current_user)
 
     if not agent:
         raise HTTPException(
@@ -346,15 +345,15 @@ async def update_agent_avatar(
     try:
         # Update avatar
         agent.avatar = avatar_data.avatar_url
-        db.commit()
-        db.refresh(agent)
+        await db.commit()
+        await db.refresh(agent)
 
         logger.info(f"Agent avatar updated: {agent_id}")
         return agent
 
     except Exception as e:
         logger.error(f"Error updating agent avatar: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update agent avatar: {str(e)}"
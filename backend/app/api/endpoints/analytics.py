@@ -1,18 +1,24 @@
 """
-Analytics endpoints for retrieving agent metrics from Vapi
+Analytics endpoints for retrieving agent metrics
+
+Calls are synced incrementally from Vapi into the local calls table, by the
+background job and, for stale assistants, in the background after a
+dashboard load. Analytics are computed from the local tables only, so a
+request never waits for Vapi.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from loguru import logger
 from datetime import datetime, timedelta
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.security import get_current_user_optional
 from app.models.user import User
 from app.models.agent import Agent
-from app.services.vapi_service import vapi_service
+from app.services.call_sync_service import call_sync_service
 
 router = APIRouter()
 
@@ -20,28 +26,30 @@ router = APIRouter()
 @router.get("/agents/{agent_id}")
 async def get_agent_analytics(
     agent_id: str,
-    start_date: Optional[str] = Query(None, description="Start date (ISO 8601)"),
-    end_date: Optional[str] = Query(None, description="End date (ISO 8601)"),
+    start_date: Optional[str] = Query(None, description="Start date (ISO 8601, whole UTC days)"),
+    end_date: Optional[str] = Query(None, description="End date (ISO 8601, included, whole UTC days)"),
     current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get analytics for a specific agent
 
     Args:
         agent_id: Agent ID (local DB ID)
-        start_date: Start date for analytics (ISO 8601 format)
-        end_date: End date for analytics (ISO 8601 format)
+        start_date: Start date for analytics (ISO 8601 format, only its UTC day is used)
+        end_date: End date for analytics (ISO 8601 format, its UTC day is included)
 
     Returns:
         Analytics data including metrics
     """
     try:
         # Get agent from database
-        agent = db.query(Agent).filter(
-            Agent.id == agent_id,
-            Agent.user_id == current_user.id
-        ).first()
+        agent = await db.scalar(
+            select(Agent).where(
+                Agent.id == agent_id,
+                Agent.user_id == current_user.id
+            )
+        )
 
         if not agent:
             raise HTTPException(status_code=404, detail="Agent not found")
@@ -67,9 +75,13 @@ async def get_agent_analytics(
             start = datetime.utcnow() - timedelta(days=30)
             start_date = start.isoformat()
 
-        # Get analytics from Vapi
-        analytics = await vapi_service.get_analytics(
-            assistant_id=agent.vapi_assistant_id,
+        # Pull new calls from Vapi after answering, if the local data is stale
+        call_sync_service.request_sync([agent.vapi_assistant_id])
+
+        # Compute analytics from the local call store
+        analytics = await call_sync_service.get_analytics(
+            db,
+            assistant_ids=[agent.vapi_assistant_id],
             start_date=start_date,
             end_date=end_date
         )
@@ -89,27 +101,30 @@ async def get_agent_analytics(
 
 @router.get("/all")
 async def get_all_agents_analytics(
-    start_date: Optional[str] = Query(None, description="Start date (ISO 8601)"),
-    end_date: Optional[str] = Query(None, description="End date (ISO 8601)"),
+    start_date: Optional[str] = Query(None, description="Start date (ISO 8601, whole UTC days)"),
+    end_date: Optional[str] = Query(None, description="End date (ISO 8601, included, whole UTC days)"),
     current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get analytics for all agents of the current user
 
     Args:
-        start_date: Start date for analytics (ISO 8601 format)
-        end_date: End date for analytics (ISO 8601 format)
+        start_date: Start date for analytics (ISO 8601 format, only its UTC day is used)
+        end_date: End date for analytics (ISO 8601 format, its UTC day is included)
 
     Returns:
-        Combined analytics data for all agents
+        Combined analytics data for all agents. Agents whose calls could not
+        be synced or aggregated are listed in failed_agents.
     """
     try:
         # Get all agents for the current user
-        agents = db.query(Agent).filter(
-            Agent.user_id == current_user.id,
-            Agent.vapi_assistant_id.isnot(None)
-        ).all()
+        agents = (await db.scalars(
+            select(Agent).where(
+                Agent.user_id == current_user.id,
+                Agent.vapi_assistant_id.isnot(None)
+            )
+        )).all()
 
         # Set default date range if not provided (last 30 days)
         if not end_date:
@@ -118,8 +133,9 @@ async def get_all_agents_analytics(
             start = datetime.utcnow() - timedelta(days=30)
             start_date = start.isoformat()
 
-        # Aggregate analytics from all agents
-        from collections import defaultdict
+        # Pull new calls from Vapi after answering; failures only mean stale local data
+        call_sync_service.request_sync([agent.vapi_assistant_id for agent in agents])
+        sync_errors = call_sync_service.sync_errors
 
         total_metrics = {
             "total_calls": 0,
@@ -127,51 +143,37 @@ async def get_all_agents_analytics(
             "total_cost": 0.0,
             "successful_calls": 0,
             "end_reasons": {},
-            "agents": []
+            "agents": [],
+            "failed_agents": []
         }
 
-        # Time series aggregation
-        daily_aggregates = defaultdict(lambda: {
-            "date": "",
-            "calls": 0,
-            "minutes": 0,
-            "cost": 0,
-            "avg_cost": 0
-        })
-
-        # Duration by assistant aggregation
-        all_assistant_durations = {}
-
+        # Per-agent analytics from the local store
         for agent in agents:
-            analytics = await vapi_service.get_analytics(
-                assistant_id=agent.vapi_assistant_id,
-                start_date=start_date,
-                end_date=end_date
-            )
+            try:
+                analytics = await call_sync_service.get_analytics(
+                    db,
+                    assistant_ids=[agent.vapi_assistant_id],
+                    start_date=start_date,
+                    end_date=end_date
+                )
+            except Exception as e:
+                logger.error(f"Error computing analytics for agent {agent.id}: {str(e)}")
+                total_metrics["failed_agents"].append({
+                    "id": agent.id,
+                    "name": agent.name,
+                    "vapi_assistant_id": agent.vapi_assistant_id,
+                    "error": str(e)
+                })
+                continue
+
+            if agent.vapi_assistant_id in sync_errors:
+                total_metrics["failed_agents"].append({
+                    "id": agent.id,
+                    "name": agent.name,
+                    "vapi_assistant_id": agent.vapi_assistant_id,
+                    "error": f"Sync failed, showing last synced data: {sync_errors[agent.vapi_assistant_id]}"
+                })
 
-            # Add to totals
-            total_metrics["total_calls"] += analytics.get("total_calls", 0)
-            total_metrics["total_minutes"] += analytics.get("total_minutes", 0.0)
-            total_metrics["total_cost"] += analytics.get("total_cost", 0.0)
-            total_metrics["successful_calls"] += analytics.get("successful_calls", 0)
-
-            # Merge end reasons
-            for reason, count in analytics.get("end_reasons", {}).items():
-                total_metrics["end_reasons"][reason] = total_metrics["end_reasons"].get(reason, 0) + count
-
-            # Merge time series data
-            for day_data in analytics.get("time_series", []):
-                date_key = day_data["date"]
-                daily_aggregates[date_key]["date"] = date_key
-                daily_aggregates[date_key]["calls"] += day_data.get("calls", 0)
-                daily_aggregates[date_key]["minutes"] += day_data.get("minutes", 0)
-                daily_aggregates[date_key]["cost"] += day_data.get("cost", 0)
-
-            # Merge assistant duration data (use agent name instead of assistant ID)
-            for assistant_id, avg_duration in analytics.get("avg_duration_by_assistant", {}).items():
-                all_assistant_durations[agent.name] = avg_duration
-
-            # Add agent-specific data
             total_metrics["agents"].append({
                 "id": agent.id,
                 "name": agent.name,
@@ -179,37 +181,26 @@ async def get_all_agents_analytics(
                 "analytics": analytics
             })
 
-        # Calculate average cost per day
-        for date_key in daily_aggregates:
-            if daily_aggregates[date_key]["calls"] > 0:
-                daily_aggregates[date_key]["avg_cost"] = round(
-                    daily_aggregates[date_key]["cost"] / daily_aggregates[date_key]["calls"], 4
-                )
-            daily_aggregates[date_key]["minutes"] = round(daily_aggregates[date_key]["minutes"], 2)
-            daily_aggregates[date_key]["cost"] = round(daily_aggregates[date_key]["cost"], 2)
-
-        # Convert to sorted list
-        total_metrics["time_series"] = sorted(daily_aggregates.values(), key=lambda x: x["date"])
-        total_metrics["avg_duration_by_assistant"] = all_assistant_durations
-
-        # Calculate averages
-        if total_metrics["total_calls"] > 0:
-            total_metrics["avg_cost_per_call"] = round(
-                total_metrics["total_cost"] / total_metrics["total_calls"], 4
-            )
-            total_metrics["avg_duration_minutes"] = round(
-                total_metrics["total_minutes"] / total_metrics["total_calls"], 2
-            )
-            total_metrics["success_rate"] = round(
-                (total_metrics["successful_calls"] / total_metrics["total_calls"]) * 100, 2
-            )
-        else:
-            total_metrics["avg_cost_per_call"] = 0.0
-            total_metrics["avg_duration_minutes"] = 0.0
-            total_metrics["success_rate"] = 0.0
+        # Combined analytics computed in a single pass over all assistants
+        combined = await call_sync_service.get_analytics(
+            db,
+            assistant_ids=[agent.vapi_assistant_id for agent in agents],
+            start_date=start_date,
+            end_date=end_date
+        )
 
-        total_metrics["total_cost"] = round(total_metrics["total_cost"], 2)
-        total_metrics["total_minutes"] = round(total_metrics["total_minutes"], 2)
+        for key in [
+            "total_calls", "total_minutes", "total_cost", "successful_calls", "end_reasons",
+            "time_series", "avg_cost_per_call", "avg_duration_minutes", "success_rate"
+        ]:
+            total_metrics[key] = combined[key]
+
+        # Use agent name instead of assistant ID
+        agent_names = {agent.vapi_assistant_id: agent.name for agent in agents}
+        total_metrics["avg_duration_by_assistant"] = {
+            agent_names.get(assistant_id, assistant_id): avg_duration
+            for assistant_id, avg_duration in combined["avg_duration_by_assistant"].items()
+        }
 
         logger.info(f"Retrieved combined analytics: {total_metrics['total_calls']} calls across {len(agents)} agents")
         return total_metrics
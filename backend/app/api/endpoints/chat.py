@@ -2,22 +2,31 @@
 Chat endpoints - Text chat using Vapi Chat API
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Dict, Any, AsyncIterator
 from pydantic import BaseModel
 from datetime import datetime
 from loguru import logger
+import json
+import uuid
 
-from app.core.database import get_db
+from app.core.database import get_async_db, AsyncSessionLocal
 from app.core.security import get_current_user_optional
 from app.models.user import User
 from app.models.agent import Agent
-from app.models.conversation import Conversation
+from app.models.conversation import Conversation, ConversationMessage
+from app.schemas.conversation import ConversationMessagesPage
 from app.services.vapi_service import vapi_service
 
 router = APIRouter()
 
+# Attempts at saving an exchange when its seqs conflict with stored messages
+SAVE_EXCHANGE_ATTEMPTS = 3
+
 
 class ChatRequest(BaseModel):
     message: str
@@ -29,20 +38,14 @@ class ChatResponse(BaseModel):
     conversation_id: str
 
 
-@router.post("/{agent_id}", response_model=ChatResponse)
-async def send_message(
-    agent_id: str,
-    chat_request: ChatRequest,
-    current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
-):
-    """Send a text message to an agent using Vapi Chat API"""
-
-    # Check if agent exists and belongs to user
-    agent = db.query(Agent).filter(
-        Agent.id == agent_id,
-        Agent.user_id == current_user.id
-    ).first()
+async def _get_chat_agent(db: AsyncSession, agent_id: str, current_user: User) -> Agent:
+    """Get the user's agent, checking it is configured with a Vapi assistant"""
+    agent = await db.scalar(
+        select(Agent).where(
+            Agent.id == agent_id,
+            Agent.user_id == current_user.id
+        )
+    )
 
     if not agent:
         raise HTTPException(
@@ -57,41 +60,181 @@ async def send_message(
             detail="Agent is not configured with Vapi assistant"
         )
 
-    try:
-        # Get or create conversation
-        if chat_request.conversation_id:
-            conversation = db.query(Conversation).filter(
-                Conversation.id == chat_request.conversation_id,
-                Conversation.agent_id == agent_id,
-                Conversation.user_id == current_user.id
-            ).first()
-
-            if not conversation:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Conversation not found"
-                )
-        else:
-            # Create new conversation
-            conversation = Conversation(
-                agent_id=agent_id,
-                user_id=current_user.id,
-                channel="chat",
-                messages=[]
+    return agent
+
+
+async def _get_or_start_conversation(
+    db: AsyncSession,
+    agent_id: str,
+    current_user: User,
+    conversation_id: Optional[str]
+) -> Conversation:
+    """
+    Load the conversation to continue, or start a new one
+
+    A new conversation is not saved here: it gets its ID now and is inserted
+    with its first exchange, so a failed or abandoned reply leaves no empty
+    conversation behind.
+    """
+    if conversation_id:
+        conversation = await _get_user_conversation(db, agent_id, current_user, conversation_id)
+
+        if not conversation:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Conversation not found"
             )
+        return conversation
+
+    return Conversation(
+        id=str(uuid.uuid4()),
+        agent_id=agent_id,
+        user_id=current_user.id,
+        channel="chat"
+    )
+
+
+async def _get_user_conversation(
+    db: AsyncSession,
+    agent_id: str,
+    current_user: User,
+    conversation_id: str
+) -> Optional[Conversation]:
+    """Get a conversation of the user with an agent"""
+    return await db.scalar(
+        select(Conversation).where(
+            Conversation.id == conversation_id,
+            Conversation.agent_id == agent_id,
+            Conversation.user_id == current_user.id
+        )
+    )
+
+
+def _get_previous_chat_id(conversation: Conversation) -> Optional[str]:
+    """
+    Get the Vapi chat ID of the last exchange
+
+    Vapi maintains conversation context via previousChatId.
+    """
+    if conversation.vapi_chat_id:
+        return conversation.vapi_chat_id
+
+    # Conversations not migrated yet still only have it in the legacy JSON array
+    for msg in reversed(conversation.messages or []):
+        if msg.get("vapi_chat_id"):
+            return msg["vapi_chat_id"]
+    return None
+
+
+async def _save_exchange(
+    db: AsyncSession,
+    conversation: Conversation,
+    agent_id: str,
+    user_message: str,
+    assistant_message: str,
+    vapi_chat_id: Optional[str]
+):
+    """
+    Append a user/assistant exchange to the conversation and update stats
+
+    The seqs are allocated by incrementing message_count in the database
+    (UPDATE ... RETURNING), which holds the conversation row lock until the
+    commit: concurrent sends get consecutive seqs instead of the same ones.
+    A conflict on (conversation_id, seq) means message_count fell behind the
+    stored messages; it is caught up and the exchange retried.
+    """
+    conversation_id = conversation.id
+    new_conversation = inspect(conversation).transient
+    stats = {"vapi_chat_id": vapi_chat_id} if vapi_chat_id else {}
+
+    for attempt in range(1, SAVE_EXCHANGE_ATTEMPTS + 1):
+        if new_conversation:
+            # First exchange of a new conversation (a rollback leaves it transient again)
             db.add(conversation)
-            db.commit()
-            db.refresh(conversation)
+            await db.flush()
+
+        now = datetime.utcnow()
+        message_count = await db.scalar(
+            update(Conversation)
+            .where(Conversation.id == conversation_id)
+            .values(
+                message_count=func.coalesce(Conversation.message_count, 0) + 2,
+                last_message_at=now,
+                **stats
+            )
+            .returning(Conversation.message_count)
+        )
+        seq = message_count - 2
+
+        # Append-only inserts, the (conversation_id, seq) unique index rejects duplicates
+        db.add_all([
+            ConversationMessage(
+                conversation_id=conversation_id,
+                seq=seq,
+                role="user",
+                content=user_message,
+                created_at=now
+            ),
+            ConversationMessage(
+                conversation_id=conversation_id,
+                seq=seq + 1,
+                role="assistant",
+                content=assistant_message,
+                vapi_chat_id=vapi_chat_id,
+                created_at=now
+            )
+        ])
+
+        # Update agent metrics
+        await db.execute(
+            update(Agent).where(Agent.id == agent_id).values(interactions=Agent.interactions + 1)
+        )
+
+        try:
+            await db.commit()
+            return
+        except IntegrityError:
+            await db.rollback()
+            if attempt == SAVE_EXCHANGE_ATTEMPTS:
+                raise
+            logger.warning(f"Message seq {seq} of conversation {conversation_id} already taken, retrying")
+
+            await db.execute(
+                update(Conversation)
+                .where(Conversation.id == conversation_id)
+                .values(
+                    message_count=select(func.coalesce(func.max(ConversationMessage.seq) + 1, 0))
+                    .where(ConversationMessage.conversation_id == conversation_id)
+                    .scalar_subquery()
+                )
+            )
+
+
+def _sse(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Format a server-sent event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@router.post("/{agent_id}", response_model=ChatResponse)
+async def send_message(
+    agent_id: str,
+    chat_request: ChatRequest,
+    current_user: User = Depends(get_current_user_optional),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Send a text message to an agent using Vapi Chat API"""
+
+    agent = await _get_chat_agent(db, agent_id, current_user)
+
+    try:
+        conversation = await _get_or_start_conversation(
+            db, agent_id, current_user, chat_request.conversation_id
+        )
+        conversation_id = conversation.id
 
         # Get previous Vapi chat ID if exists (for context continuity)
-        # Vapi maintains conversation context via previousChatId
-        previous_chat_id = None
-        if conversation.messages:
-            # Look for vapi_chat_id in last message metadata
-            for msg in reversed(conversation.messages):
-                if msg.get("vapi_chat_id"):
-                    previous_chat_id = msg["vapi_chat_id"]
-                    break
+        previous_chat_id = _get_previous_chat_id(conversation)
 
         # Call Vapi Chat API with just the current message
         # Vapi handles context via previousChatId
@@ -149,47 +292,168 @@ async def send_message(
                 detail="Invalid response format from Vapi"
             )
 
-        # Save user message to conversation
-        conversation.messages.append({
-            "role": "user",
-            "content": chat_request.message,
-            "timestamp": datetime.utcnow().isoformat()
-        })
-
-        # Save assistant message to conversation with Vapi chat ID
-        assistant_msg = {
-            "role": "assistant",
-            "content": assistant_message,
-            "timestamp": datetime.utcnow().isoformat()
-        }
+        await _save_exchange(
+            db, conversation, agent.id,
+            user_message=chat_request.message,
+            assistant_message=assistant_message,
+            vapi_chat_id=vapi_chat_id
+        )
 
-        if vapi_chat_id:
-            assistant_msg["vapi_chat_id"] = vapi_chat_id
+        logger.info(f"Chat response generated via Vapi for agent {agent_id}")
 
-        conversation.messages.append(assistant_msg)
+        return ChatResponse(
+            response=assistant_message,
+            conversation_id=conversation_id
+        )
 
-        # Update conversation stats
-        conversation.message_count = len(conversation.messages)
-        conversation.last_message_at = datetime.utcnow()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in Vapi chat: {e}")
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error generating response from Vapi: {str(e)}"
+        )
 
-        # Update agent metrics
-        agent.interactions += 1
 
-        db.commit()
+@router.get("/{agent_id}/conversations/{conversation_id}/messages", response_model=ConversationMessagesPage)
+async def get_conversation_messages(
+    agent_id: str,
+    conversation_id: str,
+    before_seq: Optional[int] = Query(None, description="Return messages older than this seq"),
+    after_seq: Optional[int] = Query(None, description="Return messages newer than this seq"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_user_optional),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get a page of conversation messages, oldest first
 
-        logger.info(f"Chat response generated via Vapi for agent {agent_id}")
+    Without cursors the latest messages are returned; pass before_seq (the
+    first seq of the page) to load older history, or after_seq (the last seq
+    seen) to poll for new messages.
+    """
+    conversation = await _get_user_conversation(db, agent_id, current_user, conversation_id)
 
-        return ChatResponse(
-            response=assistant_message,
-            conversation_id=conversation.id
+    if not conversation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conversation not found"
         )
 
+    query = select(ConversationMessage).where(ConversationMessage.conversation_id == conversation_id)
+
+    # Fetch one extra row to know if there is another page
+    if after_seq is not None:
+        messages = (await db.scalars(
+            query.where(ConversationMessage.seq > after_seq)
+            .order_by(ConversationMessage.seq.asc())
+            .limit(limit + 1)
+        )).all()
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+    else:
+        if before_seq is not None:
+            query = query.where(ConversationMessage.seq < before_seq)
+        messages = (await db.scalars(
+            query.order_by(ConversationMessage.seq.desc()).limit(limit + 1)
+        )).all()
+        has_more = len(messages) > limit
+        messages = list(reversed(messages[:limit]))
+
+    return ConversationMessagesPage(
+        conversation_id=conversation_id,
+        messages=messages,
+        has_more=has_more
+    )
+
+
+@router.post("/{agent_id}/stream")
+async def stream_message(
+    agent_id: str,
+    chat_request: ChatRequest,
+    current_user: User = Depends(get_current_user_optional),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Send a text message to an agent and stream the reply over Server-Sent Events
+
+    Events:
+        start: {"conversation_id"} - sent immediately
+        (default): {"delta"} - a chunk of the assistant reply
+        done: {"conversation_id", "response"} - the reply is complete and saved
+        error: {"detail"} - the stream failed, nothing was saved
+
+    A new conversation is only saved with the reply: if the stream fails or
+    the client disconnects first, its ID from the start event does not exist.
+    """
+    agent = await _get_chat_agent(db, agent_id, current_user)
+
+    try:
+        conversation = await _get_or_start_conversation(
+            db, agent_id, current_user, chat_request.conversation_id
+        )
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error in Vapi chat: {e}")
-        db.rollback()
+        logger.error(f"Error starting Vapi chat stream: {e}")
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error generating response from Vapi: {str(e)}"
         )
+
+    conversation_id = conversation.id
+    new_conversation = inspect(conversation).transient
+    vapi_assistant_id = agent.vapi_assistant_id
+    previous_chat_id = _get_previous_chat_id(conversation)
+
+    async def event_stream() -> AsyncIterator[str]:
+        yield _sse({"conversation_id": conversation_id}, event="start")
+
+        chunks: List[str] = []
+        vapi_chat_id = None
+        try:
+            async for chunk in vapi_service.stream_chat_message(
+                assistant_id=vapi_assistant_id,
+                message_content=chat_request.message,
+                previous_chat_id=previous_chat_id
+            ):
+                if chunk["chat_id"]:
+                    vapi_chat_id = chunk["chat_id"]
+                if chunk["delta"]:
+                    chunks.append(chunk["delta"])
+                    yield _sse({"delta": chunk["delta"]})
+
+            assistant_message = "".join(chunks)
+            if not assistant_message:
+                raise ValueError("Empty response from Vapi chat stream")
+
+            # The request session is closed once streaming starts, save with our own
+            async with AsyncSessionLocal() as stream_db:
+                await _save_exchange(
+                    stream_db,
+                    conversation if new_conversation else await stream_db.get(Conversation, conversation_id),
+                    agent_id,
+                    user_message=chat_request.message,
+                    assistant_message=assistant_message,
+                    vapi_chat_id=vapi_chat_id
+                )
+
+            logger.info(f"Chat response streamed via Vapi for agent {agent_id}")
+            yield _sse({"conversation_id": conversation_id, "response": assistant_message}, event="done")
+
+        except Exception as e:
+            logger.error(f"Error in Vapi chat stream: {e}")
+            yield _sse({"detail": f"Error generating response from Vapi: {str(e)}"}, event="error")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Disable proxy buffering (nginx) so chunks reach the client immediately
+            "X-Accel-Buffering": "no"
+        }
+    )
@@ -0,0 +1,127 @@
+"""
+Documents endpoints - Local copies of knowledge base documents and search
+
+Documents uploaded through /api/vapi/{agent_id}/upload-document are chunked
+and indexed locally (BM25 and embeddings), independently of Vapi's
+query tool.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from loguru import logger
+import time
+
+from app.core.database import get_async_db
+from app.core.security import get_current_user_optional
+from app.models.user import User
+from app.models.agent import Agent
+from app.models.document import Document
+from app.services.search_index import IndexNotReady, search_indexes
+from app.services.vector_index import vector_indexes
+
+router = APIRouter()
+
+
+async def _get_agent(db: AsyncSession, agent_id: str, user: User) -> Agent:
+    agent = await db.scalar(
+        select(Agent).where(
+            Agent.id == agent_id,
+            Agent.user_id == user.id
+        )
+    )
+    if not agent:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Agent not found"
+        )
+    return agent
+
+
+@router.get("/{agent_id}")
+async def list_documents(
+    agent_id: str,
+    current_user: User = Depends(get_current_user_optional),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    List the agent's local documents with their indexing status
+    """
+    await _get_agent(db, agent_id, current_user)
+
+    documents = await db.scalars(
+        select(Document)
+        .where(Document.agent_id == agent_id)
+        .options(selectinload(Document.shards))
+        .order_by(Document.uploaded_at.desc())
+    )
+
+    return {
+        "documents": [
+            {
+                "id": document.id,
+                "filename": document.original_filename,
+                "file_type": document.file_type,
+                "file_size": document.file_size,
+                "vapi_file_id": document.vapi_file_id,
+                # Vapi files of a document uploaded as shards, in order
+                "shard_file_ids": [shard.vapi_file_id for shard in document.shards],
+                "status": document.status,
+                "error_message": document.error_message,
+                "num_chunks": document.num_chunks,
+                "total_tokens": document.total_tokens,
+                "uploaded_at": document.uploaded_at,
+                "processed_at": document.processed_at,
+            }
+            for document in documents
+        ]
+    }
+
+
+@router.get("/{agent_id}/search")
+async def search_documents(
+    agent_id: str,
+    q: str = Query(..., min_length=1, max_length=1000, description="Search query"),
+    limit: int = Query(10, ge=1, le=100),
+    mode: str = Query("bm25", pattern="^(bm25|vector)$", description="bm25 (keywords) or vector (semantic)"),
+    document_id: Optional[List[str]] = Query(None, description="Only search these documents"),
+    current_user: User = Depends(get_current_user_optional),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Search the agent's documents: BM25 or vector similarity over their chunks
+
+    Returns:
+        Best matching chunks first, with their score
+    """
+    await _get_agent(db, agent_id, current_user)
+
+    try:
+        start = time.perf_counter()
+        # The first search of an agent waits (briefly) for its index to be built
+        indexes = vector_indexes if mode == "vector" else search_indexes
+        results = await run_in_threadpool(indexes.search, agent_id, q, limit, document_id)
+        took_ms = (time.perf_counter() - start) * 1000
+
+        return {
+            "query": q,
+            "mode": mode,
+            "results": results,
+            "took_ms": round(took_ms, 2)
+        }
+
+    except IndexNotReady as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "5"}
+        )
+    except Exception as e:
+        logger.error(f"Error searching documents of agent {agent_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to search documents: {str(e)}"
+        )
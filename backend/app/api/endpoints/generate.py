@@ -9,6 +9,7 @@ from loguru import logger
 import httpx
 
 from app.core.config import settings
+from app.core.http_client import get_http_client
 from app.core.security import get_current_user_optional
 from app.models.user import User
 
@@ -130,15 +131,15 @@ Vous êtes {{nom}}, un assistant IA. Votre mission est de {{mission}}.
             "Content-Type": "application/json"
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=openai_payload,
-                timeout=30.0
-            )
-            response.raise_for_status()
-            result = response.json()
+        client = get_http_client()
+        response = await client.post(
+            "https://api.openai.com/v1/chat/completions",
+            headers=headers,
+            json=openai_payload,
+            timeout=30.0
+        )
+        response.raise_for_status()
+        result = response.json()
 
         # Extract generated prompt
         system_prompt = result["choices"][0]["message"]["content"].strip()
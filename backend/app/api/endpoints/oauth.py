@@ -5,7 +5,9 @@ Handles OAuth authentication flows for external services
 
 from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import logging
 from datetime import datetime, timedelta
 from typing import Optional
@@ -13,11 +15,13 @@ from typing import Optional
 from google_auth_oauthlib.flow import Flow
 from google.oauth2.credentials import Credentials
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.config import settings
 from app.models.oauth_credential import OAuthCredential
 from app.models.user import User
 from app.api.endpoints.auth import get_current_user
+from app.services.google_calendar_service import calendar_clients
+from app.services.calendar_availability import busy_intervals
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +36,7 @@ GOOGLE_CALENDAR_SCOPES = [
 ]
 
 
-async def get_current_user_optional(request: Request, db: Session = Depends(get_db)) -> Optional[User]:
+async def get_current_user_optional(request: Request, db: AsyncSession = Depends(get_async_db)) -> Optional[User]:
     """Get current user or return dev user for development"""
     try:
         # Try to get authenticated user
@@ -42,7 +46,7 @@ async def get_current_user_optional(request: Request, db: Session = Depends(get_
     except:
         # In development, use dev user as fallback
         if settings.ENVIRONMENT == "development":
-            dev_user = db.query(User).filter(User.email == "dev@example.com").first()
+            dev_user = await db.scalar(select(User).where(User.email == "dev@example.com"))
             if dev_user:
                 logger.info("Using dev user for OAuth (no authentication)")
                 return dev_user
@@ -52,7 +56,7 @@ async def get_current_user_optional(request: Request, db: Session = Depends(get_
 @router.get("/google-calendar/connect")
 async def connect_google_calendar(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """
@@ -126,7 +130,7 @@ async def google_calendar_callback(
     code: Optional[str] = None,
     state: Optional[str] = None,
     error: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Handle Google Calendar OAuth callback
@@ -166,22 +170,24 @@ async def google_calendar_callback(
         flow.redirect_uri = f"{settings.API_URL}/api/oauth/google-calendar/callback"
 
         # Exchange authorization code for tokens
-        flow.fetch_token(code=code)
+        await run_in_threadpool(flow.fetch_token, code=code)
 
         # Get credentials
         credentials = flow.credentials
 
         # Get user info (from state or default)
         # For now, use default dev user
-        user = db.query(User).filter(User.email == "dev@example.com").first()
+        user = await db.scalar(select(User).where(User.email == "dev@example.com"))
         if not user:
             raise ValueError("User not found")
 
         # Check if credential already exists
-        existing_cred = db.query(OAuthCredential).filter(
-            OAuthCredential.user_id == user.id,
-            OAuthCredential.service == "google_calendar"
-        ).first()
+        existing_cred = await db.scalar(
+            select(OAuthCredential).where(
+                OAuthCredential.user_id == user.id,
+                OAuthCredential.service == "google_calendar"
+            )
+        )
 
         if existing_cred:
             # Update existing credential
@@ -206,7 +212,9 @@ async def google_calendar_callback(
             )
             db.add(new_cred)
 
-        db.commit()
+        await db.commit()
+        calendar_clients.invalidate(user.id)
+        busy_intervals.invalidate(user.id)
 
         logger.info(f"Successfully connected Google Calendar for user {user.id}")
 
@@ -216,7 +224,7 @@ async def google_calendar_callback(
         )
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error in Google Calendar OAuth callback: {str(e)}")
         return RedirectResponse(
             url=f"{settings.FRONTEND_URL}/integrations?oauth_error={str(e)}"
@@ -226,24 +234,28 @@ async def google_calendar_callback(
 @router.delete("/google-calendar/disconnect")
 async def disconnect_google_calendar(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """Disconnect Google Calendar"""
     try:
         if not current_user:
             raise HTTPException(status_code=401, detail="Authentication required")
-        credential = db.query(OAuthCredential).filter(
-            OAuthCredential.user_id == current_user.id,
-            OAuthCredential.service == "google_calendar"
-        ).first()
+        credential = await db.scalar(
+            select(OAuthCredential).where(
+                OAuthCredential.user_id == current_user.id,
+                OAuthCredential.service == "google_calendar"
+            )
+        )
 
         if not credential:
             raise HTTPException(status_code=404, detail="Google Calendar not connected")
 
         # Deactivate credential
         credential.is_active = False
-        db.commit()
+        await db.commit()
+        calendar_clients.invalidate(current_user.id)
+        busy_intervals.invalidate(current_user.id)
 
         logger.info(f"Disconnected Google Calendar for user {current_user.id}")
 
@@ -252,7 +264,7 @@ async def disconnect_google_calendar(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error disconnecting Google Calendar: {str(e)}")
         raise HTTPException(status_code=500, detail="Error disconnecting Google Calendar")
 
@@ -260,18 +272,20 @@ async def disconnect_google_calendar(
 @router.get("/google-calendar/status")
 async def google_calendar_status(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """Check Google Calendar connection status"""
     try:
         if not current_user:
             return {"connected": False, "message": "Not authenticated"}
-        credential = db.query(OAuthCredential).filter(
-            OAuthCredential.user_id == current_user.id,
-            OAuthCredential.service == "google_calendar",
-            OAuthCredential.is_active == True
-        ).first()
+        credential = await db.scalar(
+            select(OAuthCredential).where(
+                OAuthCredential.user_id == current_user.id,
+                OAuthCredential.service == "google_calendar",
+                OAuthCredential.is_active == True
+            )
+        )
 
         if not credential:
             return {
@@ -4,14 +4,14 @@ Handles function calls from Vapi for Google Calendar operations
 """
 
 from fastapi import APIRouter, HTTPException, Depends, Request
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 from loguru import logger
 
-from app.core.database import get_db
-from app.services.google_calendar_service import GoogleCalendarService
-from app.models.user import User
+from app.core.database import get_async_db
+from app.services.google_calendar_service import run_calendar_operation
+from app.services.tenant_index import tenant_index
 
 router = APIRouter()
 
@@ -25,7 +25,7 @@ class VapiToolCallRequest(BaseModel):
 @router.post("/google-calendar/create-event")
 async def create_calendar_event(
     request: VapiToolCallRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Webhook endpoint for creating Google Calendar events from Vapi
@@ -39,14 +39,8 @@ async def create_calendar_event(
         function_call = request.message.get("functionCall", {})
         parameters = function_call.get("parameters", {})
 
-        # Get user ID - For now, use dev user since we don't have authentication in Vapi calls
-        # In production, you would extract user context from the call
-        user = db.query(User).filter(User.email == "dev@example.com").first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        # Initialize Google Calendar service
-        calendar_service = GoogleCalendarService(db=db, user_id=user.id)
+        # Resolve the tenant from the call's assistant
+        tenant = await tenant_index.resolve_call(request.call or request.message.get("call", {}), db)
 
         # Extract parameters
         client_name = parameters.get("client_name") or parameters.get("clientName")
@@ -63,13 +57,16 @@ async def create_calendar_event(
             )
 
         # Create the calendar event
-        result = calendar_service.create_event(
-            client_name=client_name,
-            date=date,
-            time=time,
-            duration=duration,
-            service_type=service_type,
-            notes=notes
+        result = await run_calendar_operation(
+            tenant.user_id,
+            lambda calendar: calendar.create_event(
+                client_name=client_name,
+                date=date,
+                time=time,
+                duration=duration,
+                service_type=service_type,
+                notes=notes
+            )
         )
 
         logger.info(f"Created calendar event: {result}")
@@ -94,7 +91,7 @@ async def create_calendar_event(
 @router.post("/google-calendar/check-availability")
 async def check_availability(
     request: VapiToolCallRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Webhook endpoint for checking Google Calendar availability from Vapi
@@ -106,13 +103,8 @@ async def check_availability(
         function_call = request.message.get("functionCall", {})
         parameters = function_call.get("parameters", {})
 
-        # Get user
-        user = db.query(User).filter(User.email == "dev@example.com").first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        # Initialize Google Calendar service
-        calendar_service = GoogleCalendarService(db=db, user_id=user.id)
+        # Resolve the tenant from the call's assistant
+        tenant = await tenant_index.resolve_call(request.call or request.message.get("call", {}), db)
 
         # Extract parameters
         date = parameters.get("date")
@@ -126,10 +118,13 @@ async def check_availability(
             )
 
         # Check availability
-        is_available = calendar_service.check_availability(
-            date=date,
-            time=time,
-            duration=duration
+        is_available = await run_calendar_operation(
+            tenant.user_id,
+            lambda calendar: calendar.check_availability(
+                date=date,
+                time=time,
+                duration=duration
+            )
         )
 
         if is_available:
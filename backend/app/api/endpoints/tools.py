@@ -5,10 +5,11 @@ Manages custom tools for agents
 
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import logging
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.models.tool import Tool
 from app.models.user import User
 from app.schemas.tool import ToolCreate, ToolUpdate, ToolResponse
@@ -21,16 +22,18 @@ router = APIRouter()
 
 @router.get("/", response_model=List[ToolResponse])
 async def list_tools(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """List all tools for the current user"""
     try:
-        tools = db.query(Tool).filter(
-            Tool.user_id == current_user.id
-        ).order_by(Tool.created_at.desc()).all()
+        tools = await db.scalars(
+            select(Tool).where(
+                Tool.user_id == current_user.id
+            ).order_by(Tool.created_at.desc())
+        )
 
-        return tools
+        return tools.all()
 
     except Exception as e:
         logger.error(f"Error listing tools: {str(e)}")
@@ -40,7 +43,7 @@ async def list_tools(
 @router.post("/", response_model=ToolResponse)
 async def create_tool(
     tool_data: ToolCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Create a new custom tool"""
@@ -61,8 +64,8 @@ async def create_tool(
         )
 
         db.add(tool)
-        db.commit()
-        db.refresh(tool)
+        await db.commit()
+        await db.refresh(tool)
 
         logger.info(f"Created tool: {tool.id} for user {current_user.id}")
 
@@ -72,7 +75,7 @@ async def create_tool(
         return tool
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error creating tool: {str(e)}")
         raise HTTPException(status_code=500, detail="Error creating tool")
 
@@ -80,15 +83,17 @@ async def create_tool(
 @router.get("/{tool_id}", response_model=ToolResponse)
 async def get_tool(
     tool_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get a specific tool"""
     try:
-        tool = db.query(Tool).filter(
-            Tool.id == tool_id,
-            Tool.user_id == current_user.id
-        ).first()
+        tool = await db.scalar(
+            select(Tool).where(
+                Tool.id == tool_id,
+                Tool.user_id == current_user.id
+            )
+        )
 
         if not tool:
             raise HTTPException(status_code=404, detail="Tool not found")
@@ -106,15 +111,17 @@ async def get_tool(
 async def update_tool(
     tool_id: str,
     tool_data: ToolUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Update a tool"""
     try:
-        tool = db.query(Tool).filter(
-            Tool.id == tool_id,
-            Tool.user_id == current_user.id
-        ).first()
+        tool = await db.scalar(
+            select(Tool).where(
+                Tool.id == tool_id,
+                Tool.user_id == current_user.id
+            )
+        )
 
         if not tool:
             raise HTTPException(status_code=404, detail="Tool not found")
@@ -130,8 +137,8 @@ async def update_tool(
             else:
                 setattr(tool, field, value)
 
-        db.commit()
-        db.refresh(tool)
+        await db.commit()
+        await db.refresh(tool)
 
         logger.info(f"Updated tool: {tool.id}")
 
@@ -140,7 +147,7 @@ async def update_tool(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error updating tool {tool_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Error updating tool")
 
@@ -148,21 +155,23 @@ async def update_tool(
 @router.delete("/{tool_id}")
 async def delete_tool(
     tool_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Delete a tool"""
     try:
-        tool = db.query(Tool).filter(
-            Tool.id == tool_id,
-            Tool.user_id == current_user.id
-        ).first()
+        tool = await db.scalar(
+            select(Tool).where(
+                Tool.id == tool_id,
+                Tool.user_id == current_user.id
+            )
+        )
 
         if not tool:
             raise HTTPException(status_code=404, detail="Tool not found")
 
-        db.delete(tool)
-        db.commit()
+        await db.delete(tool)
+        await db.commit()
 
         logger.info(f"Deleted tool: {tool.id}")
 
@@ -171,6 +180,6 @@ async def delete_tool(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error deleting tool {tool_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Error deleting tool")
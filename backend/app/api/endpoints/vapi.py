@@ -2,166 +2,145 @@
 Vapi endpoints - Document upload and management via Vapi.ai
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from typing import List, Dict, Any, Optional
 from loguru import logger
+import uuid
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_async_db, upsert_statement
+from app.core.uploads import check_upload_size, hash_upload, open_upload_stream
 from app.core.security import get_current_user_optional
 from app.models.user import User
 from app.models.agent import Agent
+from app.models.document import Document, DocumentShard
+from app.models.knowledge_base_file import KnowledgeBaseFile
+from app.services.document_service import document_service
 from app.services.vapi_service import vapi_service
 
 router = APIRouter()
 
 
+async def _get_agent(db: AsyncSession, agent_id: str, user: User) -> Agent:
+    agent = await db.scalar(
+        select(Agent).where(
+            Agent.id == agent_id,
+            Agent.user_id == user.id
+        )
+    )
+    if not agent:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Agent not found"
+        )
+    return agent
+
+
 @router.post("/{agent_id}/upload-document")
 async def upload_document_to_vapi(
     agent_id: str,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    shard: Optional[bool] = None,
     current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Upload a document to Vapi for the agent's knowledge base
+
+    Supported documents are also kept locally and indexed in the background
+    for /api/documents/{agent_id}/search.
+
+    With shard=true (default: VAPI_SHARD_LARGE_DOCUMENTS), a supported
+    document over VAPI_SHARD_MAX_KB is uploaded as text shards under that
+    size instead of as a single file.
     """
 
     # Verify agent ownership
-    agent = db.query(Agent).filter(
-        Agent.id == agent_id,
-        Agent.user_id == current_user.id
-    ).first()
-
-    if not agent:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Agent not found"
-        )
+    agent = await _get_agent(db, agent_id, current_user)
 
     # Check file type
     file_ext = file.filename.split(".")[-1].lower()
-    supported_types = ["pdf", "docx", "doc", "txt", "csv", "md", "json", "xml"]
+    supported_types = ["pdf", "docx", "doc", "txt", "csv", "md", "json", "xml", "pptx", "xlsx"]
     if file_ext not in supported_types:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Unsupported file type. Supported: {', '.join(supported_types)}"
         )
 
-    # Check file size (Vapi recommends < 300KB per file)
-    file_content = await file.read()
-    file_size = len(file_content)
-    max_size = 10 * 1024 * 1024  # 10 MB absolute max
+    # Check file size (Vapi recommends < 300KB per file), from the spooled upload
+    file_size = check_upload_size(
+        file,
+        settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024,
+        detail=f"File too large. Maximum size: {settings.MAX_UPLOAD_SIZE_MB} MB"
+    )
 
-    if file_size > max_size:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File too large. Maximum size: 10 MB"
-        )
+    max_size = settings.VAPI_SHARD_MAX_KB * 1024
+    if shard is None:
+        shard = settings.VAPI_SHARD_LARGE_DOCUMENTS
+    shard = shard and file_size > max_size and file_ext in document_service.SUPPORTED_TYPES
 
-    if file_size > 300 * 1024:  # 300KB
-        logger.warning(f"File {file.filename} is {file_size/1024:.0f}KB (recommended: <300KB)")
+    if file_size > max_size and not shard:
+        logger.warning(f"File {file.filename} is {file_size/1024:.0f}KB (recommended: <{settings.VAPI_SHARD_MAX_KB}KB)")
 
     try:
-        # Upload file to Vapi
-        uploaded_file = await vapi_service.upload_file(
-            file_content=file_content,
-            filename=file.filename
+        content_sha256 = await run_in_threadpool(hash_upload, file)
+
+        if shard:
+            return await upload_document_shards(
+                db, agent, current_user.id, file, file_ext, file_size, content_sha256, background_tasks
+            )
+
+        # Same content already uploaded by this user: reuse its Vapi file
+        registered = await db.scalar(
+            select(KnowledgeBaseFile).where(
+                KnowledgeBaseFile.user_id == current_user.id,
+                KnowledgeBaseFile.content_sha256 == content_sha256
+            )
         )
 
-        file_id = uploaded_file.get("id")
-        logger.info(f"File uploaded to Vapi: {file.filename} (ID: {file_id})")
+        if registered:
+            file_id = registered.vapi_file_id
+            logger.info(f"File {file.filename} already on Vapi as {registered.filename} (ID: {file_id}), skipping upload")
+        else:
+            # Upload file to Vapi, streamed from the spooled upload
+            uploaded_file = await vapi_service.upload_file(
+                file_content=open_upload_stream(file),
+                filename=file.filename
+            )
+
+            file_id = uploaded_file.get("id")
+            logger.info(f"File uploaded to Vapi: {file.filename} (ID: {file_id})")
+            file_id = await register_uploaded_file(db, current_user.id, content_sha256, file_id, file.filename, file_size)
+            await db.commit()
 
         # Create or update Query Tool with knowledge base
-        if agent.vapi_assistant_id:
-            try:
-                # Get current assistant to check for existing toolIds
-                current_assistant = await vapi_service.get_assistant(agent.vapi_assistant_id)
-
-                # Get existing query tool ID (stored in vapi_knowledge_base_id)
-                query_tool_id = agent.vapi_knowledge_base_id
-                existing_file_ids = []
-
-                if query_tool_id:
-                    # Update existing query tool
-                    try:
-                        existing_tool = await vapi_service.get_tool(query_tool_id)
-                        # Extract existing file IDs from knowledge bases
-                        if existing_tool.get("knowledgeBases") and len(existing_tool["knowledgeBases"]) > 0:
-                            kb = existing_tool["knowledgeBases"][0]
-                            if isinstance(kb.get("fileIds"), list):
-                                existing_file_ids = kb["fileIds"]
-
-                        # Add new file (avoid duplicates)
-                        if file_id not in existing_file_ids:
-                            existing_file_ids.append(file_id)
-
-                        # Update query tool
-                        await vapi_service.update_query_tool(
-                            tool_id=query_tool_id,
-                            file_ids=existing_file_ids,
-                            description=f"Knowledge base for {agent.name}"
-                        )
-                        logger.info(f"Updated query tool {query_tool_id} with file {file_id} (total files: {len(existing_file_ids)})")
-
-                    except Exception as tool_error:
-                        logger.warning(f"Could not update existing tool: {tool_error}. Creating new one.")
-                        query_tool_id = None
-
-                if not query_tool_id:
-                    # Create new query tool
-                    query_tool = await vapi_service.create_query_tool(
-                        name=f"{agent.name.lower().replace(' ', '-')}-knowledge",
-                        file_ids=[file_id],
-                        description=f"Knowledge base for {agent.name}"
-                    )
-                    query_tool_id = query_tool.get("id")
-
-                    # Save query tool ID
-                    agent.vapi_knowledge_base_id = query_tool_id
-                    db.commit()
-
-                    logger.info(f"Created new query tool: {query_tool_id}")
-
-                # Attach query tool to assistant
-                existing_tool_ids = current_assistant.get("model", {}).get("toolIds", [])
-                if query_tool_id not in existing_tool_ids:
-                    existing_tool_ids.append(query_tool_id)
-
-                # Preserve existing model configuration
-                model_config = {
-                    "provider": current_assistant.get("model", {}).get("provider", "openai"),
-                    "model": current_assistant.get("model", {}).get("model", "gpt-4o-mini"),
-                    "toolIds": existing_tool_ids
-                }
-
-                # Preserve systemPrompt and enhance it to use documents
-                system_prompt = current_assistant.get("model", {}).get("systemPrompt", "")
-                if system_prompt and "knowledge" not in system_prompt.lower():
-                    system_prompt += "\n\nTu as accès à des documents via un outil de requête. Utilise-les pour répondre aux questions des utilisateurs de manière précise et détaillée."
-                elif not system_prompt:
-                    system_prompt = f"Tu es {agent.name}. Tu as accès à des documents via un outil de requête. Utilise-les pour répondre aux questions des utilisateurs de manière précise et détaillée."
-
-                model_config["systemPrompt"] = system_prompt
-
-                # Update assistant
-                await vapi_service.update_assistant(
-                    assistant_id=agent.vapi_assistant_id,
-                    model=model_config
-                )
-                logger.info(f"Attached query tool to assistant {agent.vapi_assistant_id}")
-
-            except Exception as attach_error:
-                # Log error but don't fail the upload - file is already on Vapi
-                logger.error(f"Failed to attach query tool to assistant: {attach_error}")
-                logger.info(f"File uploaded but not attached. Configure manually via Vapi dashboard.")
+        try:
+            await attach_files_to_agent(db, agent, [file_id])
+        except Exception as attach_error:
+            # Log error but don't fail the upload - the file is already on Vapi
+            logger.error(f"Failed to attach query tool to assistant: {attach_error}")
+            logger.info(f"File uploaded but not attached. Configure manually via Vapi dashboard.")
+        # Read before storing the document, whose failure would expire the agent
+        knowledge_base_id = agent.vapi_knowledge_base_id
+
+        document_id = None
+        if settings.DOCUMENT_INDEXING_ENABLED and file_ext in document_service.SUPPORTED_TYPES:
+            document_id = await store_document_for_indexing(
+                db, agent, file, file_ext, file_size, content_sha256, file_id, background_tasks
+            )
 
         return {
             "message": "Document uploaded successfully",
             "file_id": file_id,
+            "document_id": document_id,
             "filename": file.filename,
             "size": file_size,
-            "knowledge_base_id": agent.vapi_knowledge_base_id
+            "knowledge_base_id": knowledge_base_id,
+            "deduplicated": registered is not None
         }
 
     except Exception as e:
@@ -172,6 +151,298 @@ async def upload_document_to_vapi(
         )
 
 
+async def attach_files_to_agent(db: AsyncSession, agent: Agent, file_ids: List[str]):
+    """
+    Add Vapi files to the agent's query tool (created if needed) in a single update
+    """
+    if agent.vapi_assistant_id:
+        # Get current assistant to check for existing toolIds
+        current_assistant = await vapi_service.get_assistant(agent.vapi_assistant_id)
+
+        # Get existing query tool ID (stored in vapi_knowledge_base_id)
+        query_tool_id = agent.vapi_knowledge_base_id
+        existing_file_ids = []
+
+        if query_tool_id:
+            # Update existing query tool
+            try:
+                existing_tool = await vapi_service.get_tool(query_tool_id)
+                # Extract existing file IDs from knowledge bases
+                if existing_tool.get("knowledgeBases") and len(existing_tool["knowledgeBases"]) > 0:
+                    kb = existing_tool["knowledgeBases"][0]
+                    if isinstance(kb.get("fileIds"), list):
+                        existing_file_ids = kb["fileIds"]
+
+                # Add new files (avoid duplicates)
+                existing_file_ids += [file_id for file_id in file_ids if file_id not in existing_file_ids]
+
+                # Update query tool
+                await vapi_service.update_query_tool(
+                    tool_id=query_tool_id,
+                    file_ids=existing_file_ids,
+                    description=f"Knowledge base for {agent.name}"
+                )
+                logger.info(f"Updated query tool {query_tool_id} with {len(file_ids)} file(s) (total files: {len(existing_file_ids)})")
+
+            except Exception as tool_error:
+                logger.warning(f"Could not update existing tool: {tool_error}. Creating new one.")
+                query_tool_id = None
+
+        if not query_tool_id:
+            # Create new query tool
+            query_tool = await vapi_service.create_query_tool(
+                name=f"{agent.name.lower().replace(' ', '-')}-knowledge",
+                file_ids=list(file_ids),
+                description=f"Knowledge base for {agent.name}"
+            )
+            query_tool_id = query_tool.get("id")
+
+            # Save query tool ID
+            agent.vapi_knowledge_base_id = query_tool_id
+            await db.commit()
+
+            logger.info(f"Created new query tool: {query_tool_id}")
+
+        # Attach query tool to assistant
+        existing_tool_ids = current_assistant.get("model", {}).get("toolIds", [])
+        if query_tool_id not in existing_tool_ids:
+            existing_tool_ids.append(query_tool_id)
+
+        # Preserve existing model configuration
+        model_config = {
+            "provider": current_assistant.get("model", {}).get("provider", "openai"),
+            "model": current_assistant.get("model", {}).get("model", "gpt-4o-mini"),
+            "toolIds": existing_tool_ids
+        }
+
+        # Preserve systemPrompt and enhance it to use documents
+        system_prompt = current_assistant.get("model", {}).get("systemPrompt", "")
+        if system_prompt and "knowledge" not in system_prompt.lower():
+            system_prompt += "\n\nTu as accès à des documents via un outil de requête. Utilise-les pour répondre aux questions des utilisateurs de manière précise et détaillée."
+        elif not system_prompt:
+            system_prompt = f"Tu es {agent.name}. Tu as accès à des documents via un outil de requête. Utilise-les pour répondre aux questions des utilisateurs de manière précise et détaillée."
+
+        model_config["systemPrompt"] = system_prompt
+
+        # Update assistant
+        await vapi_service.update_assistant(
+            assistant_id=agent.vapi_assistant_id,
+            model=model_config
+        )
+        logger.info(f"Attached query tool to assistant {agent.vapi_assistant_id}")
+
+
+async def upload_document_shards(
+    db: AsyncSession,
+    agent: Agent,
+    user_id: str,
+    file: UploadFile,
+    file_ext: str,
+    file_size: int,
+    content_sha256: str,
+    background_tasks: BackgroundTasks
+) -> Dict[str, Any]:
+    """
+    Upload a large document to Vapi as text shards under VAPI_SHARD_MAX_KB
+
+    The document is stored locally and its text split on paragraph, line
+    and sentence boundaries. Shards this user already uploaded (same
+    content) are reused; the others are uploaded concurrently, all or
+    nothing, then attached to the agent's query tool in a single update.
+    Each shard's Vapi file is recorded against the local document.
+
+    If recording or attaching the shards fails, the files uploaded for
+    them are deleted from Vapi along with the local document.
+    """
+    document = await store_document(db, agent, file, file_ext, file_size, content_sha256, vapi_file_id=None)
+    document_id = document.id
+    uploaded_ids: List[str] = []
+    try:
+        # Extracting the text also caches it for indexing
+        shards = await run_in_threadpool(
+            document_service.shard_document,
+            document.file_path,
+            file_ext,
+            file.filename,
+            settings.VAPI_SHARD_MAX_KB * 1024,
+            content_sha256
+        )
+
+        hashes = {shard["content_sha256"] for shard in shards}
+        file_ids = dict((await db.execute(
+            select(KnowledgeBaseFile.content_sha256, KnowledgeBaseFile.vapi_file_id).where(
+                KnowledgeBaseFile.user_id == user_id,
+                KnowledgeBaseFile.content_sha256.in_(hashes)
+            )
+        )).all())
+        missing: Dict[str, Dict[str, Any]] = {}
+        for shard in shards:
+            if shard["content_sha256"] not in file_ids:
+                missing.setdefault(shard["content_sha256"], shard)
+
+        uploaded_files = await vapi_service.upload_files(
+            [(shard["content"], shard["filename"]) for shard in missing.values()]
+        )
+        uploaded_ids = [uploaded_file.get("id") for uploaded_file in uploaded_files]
+        logger.info(f"Uploaded {len(uploaded_files)}/{len(shards)} shards of {file.filename} to Vapi")
+
+        for shard, file_id in zip(missing.values(), list(uploaded_ids)):
+            file_ids[shard["content_sha256"]] = await register_uploaded_file(
+                db, user_id, shard["content_sha256"], file_id, shard["filename"], shard["size"]
+            )
+            if file_ids[shard["content_sha256"]] != file_id:
+                # Duplicate of a concurrent upload, already deleted
+                uploaded_ids.remove(file_id)
+
+        db.add_all([
+            DocumentShard(
+                document_id=document_id,
+                seq=seq,
+                vapi_file_id=file_ids[shard["content_sha256"]],
+                filename=shard["filename"],
+                size=shard["size"],
+                content_sha256=shard["content_sha256"],
+                start_offset=shard["start_offset"],
+                end_offset=shard["end_offset"]
+            )
+            for seq, shard in enumerate(shards)
+        ])
+        await db.commit()
+
+        shard_file_ids = [file_ids[shard["content_sha256"]] for shard in shards]
+        await attach_files_to_agent(db, agent, list(dict.fromkeys(shard_file_ids)))
+
+    except Exception:
+        await db.rollback()
+        if uploaded_ids:
+            await db.execute(
+                delete(KnowledgeBaseFile).where(KnowledgeBaseFile.vapi_file_id.in_(uploaded_ids))
+            )
+            await db.commit()
+            await vapi_service.delete_files(uploaded_ids)
+        await run_in_threadpool(document_service.remove_documents, [document_id])
+        raise
+
+    if settings.DOCUMENT_INDEXING_ENABLED:
+        background_tasks.add_task(document_service.index_document, document_id)
+
+    return {
+        "message": f"Document uploaded successfully as {len(shards)} shards",
+        "file_id": shard_file_ids[0],
+        "document_id": document_id,
+        "filename": file.filename,
+        "size": file_size,
+        "shards": [
+            {"file_id": file_id, "filename": shard["filename"], "size": shard["size"]}
+            for file_id, shard in zip(shard_file_ids, shards)
+        ],
+        "knowledge_base_id": agent.vapi_knowledge_base_id,
+        "deduplicated": not missing
+    }
+
+
+async def store_document(
+    db: AsyncSession,
+    agent: Agent,
+    file: UploadFile,
+    file_ext: str,
+    file_size: int,
+    content_sha256: str,
+    vapi_file_id: Optional[str]
+) -> Document:
+    """Keep a local copy of an uploaded document"""
+    stored_filename = f"{uuid.uuid4()}.{file_ext}"
+    file_path = await run_in_threadpool(
+        document_service.save_uploaded_file, open_upload_stream(file), stored_filename, agent.id
+    )
+
+    document = Document(
+        agent_id=agent.id,
+        filename=stored_filename,
+        original_filename=file.filename,
+        file_path=file_path,
+        file_type=file_ext,
+        file_size=file_size,
+        vapi_file_id=vapi_file_id,
+        # Identical files share their cached text and chunks
+        file_metadata={"content_sha256": content_sha256}
+    )
+    db.add(document)
+    await db.commit()
+    return document
+
+
+async def store_document_for_indexing(
+    db: AsyncSession,
+    agent: Agent,
+    file: UploadFile,
+    file_ext: str,
+    file_size: int,
+    content_sha256: str,
+    vapi_file_id: str,
+    background_tasks: BackgroundTasks
+) -> Optional[str]:
+    """
+    Keep a copy of an uploaded document and index it after the response
+
+    The upload already succeeded on Vapi, so failures are only logged.
+
+    Returns:
+        The local document ID, None if it couldn't be stored
+    """
+    try:
+        document = await store_document(db, agent, file, file_ext, file_size, content_sha256, vapi_file_id)
+        background_tasks.add_task(document_service.index_document, document.id)
+        return document.id
+
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Could not store {file.filename} for local indexing: {e}")
+        return None
+
+
+async def register_uploaded_file(
+    db: AsyncSession,
+    user_id: str,
+    content_sha256: str,
+    vapi_file_id: str,
+    filename: str,
+    file_size: int
+) -> str:
+    """
+    Record an uploaded Vapi file under its content hash (committed by the caller)
+
+    Returns:
+        The registered Vapi file ID: the one given, or the one recorded by a
+        concurrent upload of the same content that committed first (the
+        given file is then deleted)
+    """
+    await db.execute(
+        upsert_statement(db, KnowledgeBaseFile)
+        .values(
+            user_id=user_id,
+            content_sha256=content_sha256,
+            vapi_file_id=vapi_file_id,
+            filename=filename,
+            file_size=file_size
+        )
+        .on_conflict_do_nothing(index_elements=["user_id", "content_sha256"])
+    )
+    registered_id = await db.scalar(
+        select(KnowledgeBaseFile.vapi_file_id).where(
+            KnowledgeBaseFile.user_id == user_id,
+            KnowledgeBaseFile.content_sha256 == content_sha256
+        )
+    )
+    if registered_id != vapi_file_id:
+        logger.info(f"{filename} was uploaded concurrently, using {registered_id}")
+        try:
+            await vapi_service.delete_file(vapi_file_id)
+        except Exception as e:
+            logger.warning(f"Could not delete duplicate Vapi file {vapi_file_id}: {e}")
+    return registered_id
+
+
 def normalize_vapi_file(vapi_file: Dict[str, Any]) -> Dict[str, Any]:
     """
     Normalize Vapi file structure to match frontend expectations
@@ -202,7 +473,7 @@ def normalize_vapi_file(vapi_file: Dict[str, Any]) -> Dict[str, Any]:
 async def list_vapi_files(
     agent_id: str,
     current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     List all files uploaded to Vapi
@@ -212,16 +483,7 @@ async def list_vapi_files(
     """
 
     # Verify agent ownership
-    agent = db.query(Agent).filter(
-        Agent.id == agent_id,
-        Agent.user_id == current_user.id
-    ).first()
-
-    if not agent:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Agent not found"
-        )
+    agent = await _get_agent(db, agent_id, current_user)
 
     try:
         vapi_files = await vapi_service.list_files()
@@ -247,26 +509,53 @@ async def delete_vapi_file(
     agent_id: str,
     file_id: str,
     current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a file from Vapi
     """
 
     # Verify agent ownership
-    agent = db.query(Agent).filter(
-        Agent.id == agent_id,
-        Agent.user_id == current_user.id
-    ).first()
-
-    if not agent:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Agent not found"
-        )
+    agent = await _get_agent(db, agent_id, current_user)
 
     try:
         await vapi_service.delete_file(file_id)
+
+        # Later uploads of the same content must upload it again
+        await db.execute(delete(KnowledgeBaseFile).where(KnowledgeBaseFile.vapi_file_id == file_id))
+        await db.commit()
+
+        # Local copies of the file, in any of the user's agents
+        document_ids = list(await db.scalars(
+            select(Document.id).join(Agent).where(
+                Agent.user_id == current_user.id,
+                Document.vapi_file_id == file_id
+            )
+        ))
+
+        # Shards of sharded documents; a document without shards left is removed
+        sharded_ids = set(await db.scalars(
+            select(DocumentShard.document_id).join(Document).join(Agent).where(
+                Agent.user_id == current_user.id,
+                DocumentShard.vapi_file_id == file_id
+            )
+        ))
+        if sharded_ids:
+            await db.execute(
+                delete(DocumentShard).where(
+                    DocumentShard.document_id.in_(sharded_ids),
+                    DocumentShard.vapi_file_id == file_id
+                )
+            )
+            await db.commit()
+            sharded_ids -= set(await db.scalars(
+                select(DocumentShard.document_id).where(DocumentShard.document_id.in_(sharded_ids))
+            ))
+            document_ids += sharded_ids
+
+        # Index and file cleanup is blocking
+        await run_in_threadpool(document_service.remove_documents, document_ids)
+
         return {"message": "File deleted successfully", "file_id": file_id}
 
     except Exception as e:
@@ -281,23 +570,14 @@ async def delete_vapi_file(
 async def get_vapi_assistant_details(
     agent_id: str,
     current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get the full Vapi assistant configuration for an agent
     """
 
     # Verify agent ownership
-    agent = db.query(Agent).filter(
-        Agent.id == agent_id,
-        Agent.user_id == current_user.id
-    ).first()
-
-    if not agent:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Agent not found"
-        )
+    agent = await _get_agent(db, agent_id, current_user)
 
     if not agent.vapi_assistant_id:
         raise HTTPException(
@@ -4,38 +4,42 @@ Handles tool calls from Vapi
 """
 
 from fastapi import APIRouter, HTTPException, Depends, Request
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import logging
 from typing import Dict, Any
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.schemas.tool import ToolCallRequest, ToolCallResponse, ToolCallResultItem
-from app.services.google_calendar_service import GoogleCalendarService
-from app.models.user import User
+from app.services.google_calendar_service import run_calendar_operation
+from app.services.tenant_index import tenant_index, AssistantTenant
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-def get_user_from_call(call_data: Dict[str, Any], db: Session) -> User:
+async def get_tenant_from_call(call_data: Dict[str, Any], db: AsyncSession) -> AssistantTenant:
     """
-    Extract user from call data
+    Resolve the agent and user owning a call from its assistant ID
 
-    In production, you would identify the user from the call metadata,
-    assistant ID, or organization ID passed by Vapi
+    Served from the in-memory tenant index; the dev user is used in
+    development when the assistant is unknown.
     """
-    # For now, use default dev user
-    user = db.query(User).filter(User.email == "dev@example.com").first()
-    if not user:
-        raise ValueError("User not found")
-    return user
+    return await tenant_index.resolve_call(call_data, db)
+
+
+async def has_calendar_credentials(tenant: AssistantTenant) -> bool:
+    """Check the user has connected Google Calendar, from memory when known"""
+    if tenant.calendar_credential_id:
+        return True
+    creds = await run_calendar_operation(tenant.user_id, lambda calendar: calendar.get_credentials())
+    return creds is not None
 
 
 @router.post("/tools/book-appointment")
 async def book_appointment_webhook(
     request: ToolCallRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Webhook for booking appointments via Google Calendar
@@ -81,15 +85,11 @@ async def book_appointment_webhook(
         if not all([client_name, date, time]):
             raise ValueError("Missing required fields: client_name, date, time")
 
-        # Get user from call data
-        user = get_user_from_call(request.message.get("call", {}), db)
-
-        # Initialize Google Calendar service
-        calendar_service = GoogleCalendarService(db, user.id)
+        # Resolve the tenant from the call's assistant
+        tenant = await get_tenant_from_call(request.message.get("call", {}), db)
 
         # Check if credentials exist
-        creds = calendar_service.get_credentials()
-        if not creds:
+        if not await has_calendar_credentials(tenant):
             result_message = (
                 "❌ Google Calendar n'est pas connecté. "
                 "Veuillez vous connecter à Google Calendar dans les paramètres."
@@ -102,7 +102,9 @@ async def book_appointment_webhook(
             ])
 
         # Check availability (optional)
-        is_available = calendar_service.check_availability(date, time, duration)
+        is_available = await run_calendar_operation(
+            tenant.user_id, lambda calendar: calendar.check_availability(date, time, duration)
+        )
         if not is_available:
             result_message = (
                 f"⚠️ Le créneau demandé ({date} à {time}) n'est pas disponible. "
@@ -116,13 +118,16 @@ async def book_appointment_webhook(
             ])
 
         # Create calendar event
-        event_result = calendar_service.create_event(
-            client_name=client_name,
-            date=date,
-            time=time,
-            duration=duration,
-            service_type=service,
-            notes=notes
+        event_result = await run_calendar_operation(
+            tenant.user_id,
+            lambda calendar: calendar.create_event(
+                client_name=client_name,
+                date=date,
+                time=time,
+                duration=duration,
+                service_type=service,
+                notes=notes
+            )
         )
 
         # Build success message
@@ -164,7 +169,7 @@ async def book_appointment_webhook(
 @router.post("/tools/check-availability")
 async def check_availability_webhook(
     request: ToolCallRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Webhook for checking calendar availability
@@ -188,15 +193,11 @@ async def check_availability_webhook(
         if not all([date, time]):
             raise ValueError("Missing required fields: date, time")
 
-        # Get user
-        user = get_user_from_call(request.message.get("call", {}), db)
-
-        # Initialize Google Calendar service
-        calendar_service = GoogleCalendarService(db, user.id)
+        # Resolve the tenant from the call's assistant
+        tenant = await get_tenant_from_call(request.message.get("call", {}), db)
 
         # Check credentials
-        creds = calendar_service.get_credentials()
-        if not creds:
+        if not await has_calendar_credentials(tenant):
             return ToolCallResponse(results=[
                 ToolCallResultItem(
                     toolCallId=tool_call_id,
@@ -205,7 +206,9 @@ async def check_availability_webhook(
             ])
 
         # Check availability
-        is_available = calendar_service.check_availability(date, time, duration)
+        is_available = await run_calendar_operation(
+            tenant.user_id, lambda calendar: calendar.check_availability(date, time, duration)
+        )
 
         if is_available:
             result_message = f"✅ Le créneau du {date} à {time} est disponible."
@@ -232,7 +235,7 @@ async def check_availability_webhook(
 @router.post("/tools/list-appointments")
 async def list_appointments_webhook(
     request: ToolCallRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Webhook for listing upcoming appointments
@@ -249,15 +252,11 @@ async def list_appointments_webhook(
 
         max_results = arguments.get("max_results", 10)
 
-        # Get user
-        user = get_user_from_call(request.message.get("call", {}), db)
-
-        # Initialize Google Calendar service
-        calendar_service = GoogleCalendarService(db, user.id)
+        # Resolve the tenant from the call's assistant
+        tenant = await get_tenant_from_call(request.message.get("call", {}), db)
 
         # Check credentials
-        creds = calendar_service.get_credentials()
-        if not creds:
+        if not await has_calendar_credentials(tenant):
             return ToolCallResponse(results=[
                 ToolCallResultItem(
                     toolCallId=tool_call_id,
@@ -266,7 +265,9 @@ async def list_appointments_webhook(
             ])
 
         # List upcoming events
-        events = calendar_service.list_upcoming_events(max_results)
+        events = await run_calendar_operation(
+            tenant.user_id, lambda calendar: calendar.list_upcoming_events(max_results)
+        )
 
         if not events:
             result_message = "Aucun rendez-vous à venir."
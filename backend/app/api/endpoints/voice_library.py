@@ -3,11 +3,11 @@ Voice Library endpoints for managing ElevenLabs voices
 """
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Response
-from sqlalchemy.orm import Session
 from typing import List, Optional
 from loguru import logger
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.uploads import check_upload_size
 from app.core.security import get_current_user_optional
 from app.models.user import User
 from app.services.elevenlabs_service import elevenlabs_service
@@ -21,8 +21,7 @@ async def get_voices(
     language: Optional[str] = None,
     gender: Optional[str] = None,
     category: Optional[str] = None,
-    current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_optional)
 ):
     """
     Get all available voices from ElevenLabs
@@ -67,8 +66,7 @@ async def get_voices(
 async def get_voice_preview(
     voice_id: str,
     text: Optional[str] = None,
-    current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_optional)
 ):
     """
     Generate an audio preview for a specific voice using ElevenLabs TTS
@@ -109,8 +107,7 @@ async def clone_voice(
     name: str = Form(...),
     description: Optional[str] = Form(None),
     files: List[UploadFile] = File(...),
-    current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_optional)
 ):
     """
     Clone a voice using ElevenLabs Instant Voice Cloning
@@ -125,28 +122,24 @@ async def clone_voice(
     """
     try:
         # Validate files
-        if len(files) < 1 or len(files) > 25:
+        if len(files) < 1 or len(files) > settings.VOICE_CLONE_MAX_FILES:
             raise HTTPException(
                 status_code=400,
-                detail="Veuillez fournir entre 1 et 25 fichiers audio"
+                detail=f"Veuillez fournir entre 1 et {settings.VOICE_CLONE_MAX_FILES} fichiers audio"
             )
 
         # Validate file sizes and types
-        max_size = 25 * 1024 * 1024  # 25MB per file
+        max_size = settings.VOICE_CLONE_MAX_FILE_SIZE_MB * 1024 * 1024
         allowed_types = ["audio/mpeg", "audio/wav", "audio/x-wav", "audio/mp4", "audio/x-m4a", "audio/mp3"]
 
         total_duration = 0
         for file in files:
-            # Read file to check size
-            content = await file.read()
-            if len(content) > max_size:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Le fichier {file.filename} dépasse la limite de 25MB"
-                )
-
-            # Reset file pointer
-            await file.seek(0)
+            # Size of the spooled upload, without reading it into memory
+            check_upload_size(
+                file,
+                max_size,
+                detail=f"Le fichier {file.filename} dépasse la limite de {settings.VOICE_CLONE_MAX_FILE_SIZE_MB}MB"
+            )
 
         # Clone voice using ElevenLabs service
         result = await elevenlabs_service.clone_voice(
@@ -175,8 +168,7 @@ async def clone_voice(
 @router.delete("/voices/{voice_id}")
 async def delete_voice(
     voice_id: str,
-    current_user: User = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_optional)
 ):
     """
     Delete a cloned voice from ElevenLabs
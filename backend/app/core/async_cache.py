@@ -0,0 +1,135 @@
+"""
+Async cache - In-process TTL/LRU cache for async loaders
+
+Used in front of read-heavy remote lookups (e.g. Vapi assistants and tools).
+Concurrent misses on the same key share a single in-flight load, and
+invalidation guarantees a load started before a write is never cached.
+
+Invalidation only reaches the process it runs in: with several workers, a
+write made through another one is seen here once the entry expires, so the
+TTL is the bound on cross-worker staleness.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from collections import OrderedDict
+import asyncio
+import copy
+import time
+
+
+class AsyncTTLCache:
+    """
+    TTL + LRU cache with single-flight loading
+
+    Values are deep-copied on the way out so callers can freely mutate what
+    they get back (e.g. append to an assistant's toolIds) without corrupting
+    the cached entry.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        # key -> (expires_at, value), ordered from least to most recently used
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        # key -> future of the load currently in flight
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a cached value (None if missing or expired)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entries if full"""
+        if not self.enabled:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Get a value from the cache, loading it on a miss
+
+        Concurrent callers missing on the same key wait for the same load
+        instead of each hitting the remote API. Errors are not cached.
+
+        Args:
+            key: Cache key
+            loader: Coroutine function fetching the value
+
+        Returns:
+            A copy of the cached or freshly loaded value
+        """
+        if not self.enabled:
+            return await loader()
+
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        future = self._loading.get(key)
+        if future is None:
+            self.misses += 1
+            future = asyncio.get_running_loop().create_future()
+            self._loading[key] = future
+
+            try:
+                value = await loader()
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                # Mark the exception as retrieved in case nobody else is waiting
+                future.exception()
+                raise
+            finally:
+                # An invalidation during the load replaces or drops our future
+                current = self._loading.get(key) is future
+                if current:
+                    del self._loading[key]
+
+            if current:
+                self.set(key, value)
+            future.set_result(value)
+            return copy.deepcopy(value)
+
+        try:
+            value = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # The caller that was loading got cancelled, not us: load again
+            if future.cancelled():
+                return await self.get_or_load(key, loader)
+            raise
+        return copy.deepcopy(value)
+
+    def invalidate(self, key: Hashable):
+        """Drop a key, including any load in flight for it (in this process only)"""
+        self._entries.pop(key, None)
+        self._loading.pop(key, None)
+
+    def clear(self):
+        """Drop every entry"""
+        self._entries.clear()
+        self._loading.clear()
@@ -1,8 +1,21 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from typing import Union
 from app.core.config import settings
 
+
+def get_async_database_url(url: str) -> str:
+    """Map a sync database URL to its asyncio driver (asyncpg, aiosqlite)"""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
 # Create database engine
 engine = create_engine(
     settings.DATABASE_URL,
@@ -13,6 +26,16 @@ engine = create_engine(
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for endpoints that must not block the event loop
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL or get_async_database_url(settings.DATABASE_URL),
+    pool_pre_ping=True,
+    echo=settings.DEBUG
+)
+
+# Objects stay usable after commit (no implicit refresh, which would need an await)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Create base class for models
 Base = declarative_base()
 
@@ -26,7 +49,22 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Dependency for async database sessions"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def upsert_statement(db: Union[Session, AsyncSession], model):
+    """INSERT ... ON CONFLICT for the session's database (PostgreSQL, or SQLite locally)"""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
+
 def init_db():
     """Initialize database tables"""
-    from app.models import user, agent, document, conversation, oauth_credential
+    from app.models import user, agent, document, conversation, oauth_credential, call, knowledge_base_file
     Base.metadata.create_all(bind=engine)
@@ -0,0 +1,73 @@
+"""
+Shared HTTP client - Process-wide pooled httpx.AsyncClient for outbound API calls
+
+Vapi, ElevenLabs and OpenAI requests all go through the same client so TCP/TLS
+connections are kept alive and reused instead of being re-established per call.
+"""
+
+from typing import Optional
+import httpx
+from loguru import logger
+
+from app.core.config import settings
+
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    """Check if the optional h2 package required by httpx for HTTP/2 is installed"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _build_client() -> httpx.AsyncClient:
+    """Create a pooled client from settings"""
+    http2 = settings.HTTP2_ENABLED and _http2_available()
+    if settings.HTTP2_ENABLED and not http2:
+        logger.warning("HTTP2_ENABLED is set but 'h2' is not installed, falling back to HTTP/1.1")
+
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+    )
+
+    # Default timeout - individual requests override it with their own per-endpoint value
+    timeout = httpx.Timeout(settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT)
+
+    logger.info(f"Shared HTTP client created (http2={http2}, max_connections={settings.HTTP_MAX_CONNECTIONS})")
+    return httpx.AsyncClient(http2=http2, limits=limits, timeout=timeout)
+
+
+async def init_http_client() -> httpx.AsyncClient:
+    """Open the shared client (called on application startup)"""
+    return get_http_client()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the shared HTTP client
+
+    The client is created lazily so services keep working outside the FastAPI
+    app (e.g. maintenance scripts) where the startup hook never runs.
+
+    Returns:
+        Shared httpx.AsyncClient instance
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_http_client():
+    """Close the shared client and release pooled connections (called on shutdown)"""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("Shared HTTP client closed")
+    _client = None
@@ -1,19 +1,43 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Dict, Any, Hashable
+from concurrent.futures import ThreadPoolExecutor
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select, event, inspect
+from sqlalchemy.orm import ORMExecuteState, Session, make_transient_to_detached
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
 import uuid
 
+from app.core.async_cache import AsyncTTLCache
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.models.user import User
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is CPU-bound: run it off the event loop, with a bounded number of
+# threads so a burst of logins queues up instead of starving everything else
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_MAX_WORKERS,
+    thread_name_prefix="password-hash",
+)
+
+# Authenticated users by ("id", user_id) or ("email", email), stored as plain
+# column values so every request gets its own instance. Writes through this
+# process's sessions invalidate it; a user deactivated or deleted by another
+# worker or directly in the database stays authenticated here for up to
+# AUTH_PRINCIPAL_CACHE_TTL_SECONDS
+principal_cache = AsyncTTLCache(
+    ttl_seconds=settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS,
+    max_entries=settings.AUTH_PRINCIPAL_CACHE_MAX_ENTRIES,
+)
+
+DEV_USER_EMAIL = "dev@example.com"
+
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
@@ -28,6 +52,18 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in the password hashing thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password in the password hashing thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -53,9 +89,62 @@ def decode_access_token(token: str) -> Optional[str]:
         return None
 
 
+def _user_columns(user: User) -> Dict[str, Any]:
+    return {column.key: getattr(user, column.key) for column in User.__table__.columns}
+
+
+async def _get_principal(db: AsyncSession, key: Hashable, statement) -> Optional[User]:
+    """
+    Load a user through the principal cache
+
+    On a hit no query is run: the cached columns are merged into the
+    request's session as an already-persistent, unmodified instance.
+    """
+    async def load() -> Optional[Dict[str, Any]]:
+        user = await db.scalar(statement)
+        return _user_columns(user) if user is not None else None
+
+    columns = await principal_cache.get_or_load(key, load)
+    if columns is None:
+        return None
+
+    user = User(**columns)
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
+
+async def get_user_by_id(db: AsyncSession, user_id: str) -> Optional[User]:
+    """Get a user by id, cached for AUTH_PRINCIPAL_CACHE_TTL_SECONDS"""
+    return await _get_principal(db, ("id", user_id), select(User).where(User.id == user_id))
+
+
+def invalidate_principal(user: User):
+    """Drop a user from the principal cache (deactivation, email change, deletion)"""
+    principal_cache.invalidate(("id", user.id))
+    principal_cache.invalidate(("email", user.email))
+
+    # During a flush the old email is still in the attribute history
+    for email in inspect(user).attrs.email.history.deleted or ():
+        principal_cache.invalidate(("email", email))
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_principal_on_write(mapper, connection, user: User):
+    invalidate_principal(user)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _invalidate_principals_on_bulk_write(orm_execute_state: ORMExecuteState):
+    # update(User) / delete(User) statements skip the mapper events and may
+    # match any number of users: drop them all
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper is inspect(User):
+        principal_cache.clear()
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """Get the current authenticated user"""
     credentials_exception = HTTPException(
@@ -68,7 +157,7 @@ async def get_current_user(
     if user_id is None:
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await get_user_by_id(db, user_id)
     if user is None:
         raise credentials_exception
 
@@ -93,7 +182,7 @@ http_bearer = HTTPBearer(auto_error=False)
 
 async def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(http_bearer),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """
     Get current user (optional authentication for development)
@@ -107,13 +196,15 @@ async def get_current_user_optional(
         user_id = decode_access_token(token)
 
         if user_id:
-            user = db.query(User).filter(User.id == user_id).first()
+            user = await get_user_by_id(db, user_id)
             if user and user.is_active:
                 return user
 
     # Development mode: use existing dev user
     if settings.ENVIRONMENT == "development":
-        dev_user = db.query(User).filter(User.email == "dev@example.com").first()
+        dev_user = await _get_principal(
+            db, ("email", DEV_USER_EMAIL), select(User).where(User.email == DEV_USER_EMAIL)
+        )
 
         if dev_user:
             return dev_user
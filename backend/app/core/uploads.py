@@ -0,0 +1,200 @@
+"""
+Uploads - Size limits and streaming helpers for file uploads
+
+Starlette spools multipart file parts to a temporary file on disk (past
+1 MB), so uploads are never meant to be held in memory: the limits below
+are enforced while the body is received, sizes are read from the spooled
+file, and the spooled file itself is handed to httpx, which streams it to
+the upstream API in chunks. Files are hashed while they are spooled, so
+the content hash does not take another pass over the file.
+"""
+
+from tempfile import SpooledTemporaryFile
+from typing import Dict, Optional
+import hashlib
+import json
+import os
+import re
+
+from fastapi import HTTPException, UploadFile, status
+from starlette import formparsers
+
+
+# Read size when hashing a spooled upload that was not hashed as received
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Room for multipart boundaries, headers and form fields around the files
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject request bodies over a per-route limit while they are received
+
+    Requests announcing a larger Content-Length are refused before reading
+    anything; others are cut off as soon as the received bytes pass the
+    limit, before the rest is spooled to disk.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        # path regex -> max body size in bytes
+        self.limits = [(re.compile(pattern), max_bytes) for pattern, max_bytes in limits.items()]
+
+    def _limit_for(self, path: str) -> Optional[int]:
+        for pattern, max_bytes in self.limits:
+            if pattern.match(path):
+                return max_bytes
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = self._limit_for(scope["path"])
+        if max_bytes is None:
+            await self.app(scope, receive, send)
+            return
+
+        too_large = HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Upload too large. Maximum size: {max_bytes // (1024 * 1024)} MB"
+        )
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+            await self._send_error(send, too_large)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    # Re-raised by FastAPI's body parsing, turned into a 413 response
+                    raise too_large
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    @staticmethod
+    async def _send_error(send, error: HTTPException):
+        body = json.dumps({"detail": error.detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": error.status_code,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class HashingSpooledTemporaryFile(SpooledTemporaryFile):
+    """
+    Spooled file hashing the bytes appended to it
+
+    The multipart parser only appends, so once a part is received its
+    SHA-256 is known. Any other write (after a seek) drops the hash.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._digest = hashlib.sha256()
+        # Bytes hashed so far, None once a write did not append
+        self._hashed: Optional[int] = 0
+
+    def write(self, s):
+        if self._hashed is not None:
+            if self.tell() == self._hashed:
+                self._digest.update(s)
+                self._hashed += len(s)
+            else:
+                self._hashed = None
+        return super().write(s)
+
+    def writelines(self, iterable):
+        for line in iterable:
+            self.write(line)
+
+    def hexdigest(self) -> Optional[str]:
+        """SHA-256 hex digest of the content, or None if it was not written in one pass"""
+        if self._hashed is None:
+            return None
+        position = self.tell()
+        size = self.seek(0, os.SEEK_END)
+        self.seek(position)
+        return self._digest.hexdigest() if size == self._hashed else None
+
+
+def install_upload_hashing():
+    """
+    Spool uploaded files to HashingSpooledTemporaryFile
+
+    Starlette's multipart parser creates the spooled file of each part
+    itself, so the class is replaced in its module.
+    """
+    formparsers.SpooledTemporaryFile = HashingSpooledTemporaryFile
+
+
+def get_upload_size(file: UploadFile) -> int:
+    """Size of an uploaded file, read from the spooled file without loading it"""
+    if file.size is not None:
+        return file.size
+
+    spooled = file.file
+    position = spooled.tell()
+    spooled.seek(0, os.SEEK_END)
+    size = spooled.tell()
+    spooled.seek(position)
+    return size
+
+
+def check_upload_size(file: UploadFile, max_bytes: int, detail: Optional[str] = None) -> int:
+    """
+    Check an uploaded file against a size limit
+
+    Returns:
+        The file size in bytes
+
+    Raises:
+        HTTPException: 400 if the file is larger than max_bytes
+    """
+    size = get_upload_size(file)
+    if size > max_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail or f"File too large. Maximum size: {max_bytes // (1024 * 1024)} MB"
+        )
+    return size
+
+
+def open_upload_stream(file: UploadFile):
+    """Rewind an uploaded file and return its spooled file object, for streaming to httpx"""
+    file.file.seek(0)
+    return file.file
+
+
+def hash_upload(file: UploadFile) -> str:
+    """
+    SHA-256 hex digest of an uploaded file
+
+    Taken from the hash computed while the file was spooled; otherwise the
+    spooled file is read in chunks, which blocks on disk reads: call it in
+    a threadpool for large files.
+    """
+    spooled = file.file
+    if isinstance(spooled, HashingSpooledTemporaryFile):
+        content_sha256 = spooled.hexdigest()
+        if content_sha256 is not None:
+            return content_sha256
+
+    digest = hashlib.sha256()
+    spooled.seek(0)
+    for chunk in iter(lambda: spooled.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    spooled.seek(0)
+    return digest.hexdigest()
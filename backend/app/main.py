@@ -3,8 +3,10 @@ from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
 
 from app.core.config import settings
-from app.core.database import init_db
-from app.api.endpoints import auth, agents, vapi, chat, generate, templates, tools, vapi_webhooks, oauth, tool_webhooks, agent_tools, analytics, voice_library
+from app.core.database import init_db, async_engine
+from app.core.http_client import init_http_client, close_http_client
+from app.core.uploads import UploadSizeLimitMiddleware, MULTIPART_OVERHEAD, install_upload_hashing
+from app.api.endpoints import auth, agents, vapi, chat, generate, templates, tools, vapi_webhooks, oauth, tool_webhooks, agent_tools, analytics, voice_library, documents
 
 # Create FastAPI app
 app = FastAPI(
@@ -23,6 +25,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Cap upload bodies while they are received, before they are spooled to disk
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    limits={
+        r"^/api/vapi/[^/]+/upload-document$": settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024 + MULTIPART_OVERHEAD,
+        r"^/api/voice-library/voices/clone$": (
+            settings.VOICE_CLONE_MAX_FILES * settings.VOICE_CLONE_MAX_FILE_SIZE_MB * 1024 * 1024 + MULTIPART_OVERHEAD
+        ),
+    },
+)
+
+# Hash uploaded files while they are spooled
+install_upload_hashing()
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(agents.router, prefix="/api/agents", tags=["Agents"])
@@ -37,6 +53,7 @@ app.include_router(tool_webhooks.router, prefix="/api/tool-webhooks", tags=["Too
 app.include_router(agent_tools.router, prefix="/api/agent-tools", tags=["Agent Tools"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
 app.include_router(voice_library.router, prefix="/api/voice-library", tags=["Voice Library"])
+app.include_router(documents.router, prefix="/api/documents", tags=["Documents"])
 
 
 @app.on_event("startup")
@@ -49,6 +66,9 @@ async def startup_event():
     init_db()
     logger.info("Database initialized")
 
+    # Open the shared outbound HTTP client (connection pool for Vapi/ElevenLabs/OpenAI)
+    await init_http_client()
+
     # Create dev user in development mode
     if settings.ENVIRONMENT == "development":
         from app.core.database import SessionLocal
@@ -79,9 +99,49 @@ async def startup_event():
         finally:
             db.close()
 
+    # Route Vapi webhooks to their tenant from memory
+    from app.core.database import SessionLocal
+    from app.services.tenant_index import tenant_index
+
+    db = SessionLocal()
+    try:
+        tenant_index.warm(db)
+    except Exception as e:
+        logger.error(f"Could not warm tenant index: {e}")
+    finally:
+        db.close()
+
+    # Start background sync of Vapi calls used by analytics
+    if settings.CALL_SYNC_ENABLED and settings.VAPI_API_KEY:
+        from app.services.call_sync_service import call_sync_service
+        call_sync_service.start()
+
+    # Renew Google tokens ahead of expiry so webhooks never refresh inline
+    if settings.GOOGLE_CLIENT_ID and settings.GOOGLE_CLIENT_SECRET:
+        from app.services.oauth_refresh_service import oauth_refresh_service
+        oauth_refresh_service.start()
+
     logger.info("✅ Application startup complete")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release shared resources on shutdown"""
+    logger.info("Shutting down application...")
+
+    from app.services.call_sync_service import call_sync_service
+    await call_sync_service.stop()
+
+    from app.services.oauth_refresh_service import oauth_refresh_service
+    await oauth_refresh_service.stop()
+
+    from app.services.pdf_extraction import shutdown_pdf_pool
+    shutdown_pdf_pool()
+
+    await close_http_client()
+    await async_engine.dispose()
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
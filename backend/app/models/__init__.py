@@ -1,7 +1,9 @@
 from app.models.user import User
 from app.models.agent import Agent
-from app.models.document import Document
-from app.models.conversation import Conversation
+from app.models.document import Document, DocumentChunk, DocumentShard
+from app.models.conversation import Conversation, ConversationMessage
 from app.models.oauth_credential import OAuthCredential
+from app.models.call import Call, CallSyncState, CallDailyRollup, CallDailyEndReason, CallDailyBucket
+from app.models.knowledge_base_file import KnowledgeBaseFile
 
-__all__ = ["User", "Agent", "Document", "Conversation", "OAuthCredential"]
+__all__ = ["User", "Agent", "Document", "DocumentChunk", "DocumentShard", "Conversation", "ConversationMessage", "OAuthCredential", "Call", "CallSyncState", "CallDailyRollup", "CallDailyEndReason", "CallDailyBucket", "KnowledgeBaseFile"]
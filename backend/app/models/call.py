@@ -0,0 +1,108 @@
+"""
+Call Model
+Local copy of Vapi call records used to answer analytics queries
+"""
+
+from sqlalchemy import Column, String, Float, Integer, Date, DateTime, JSON, Index
+from datetime import datetime
+
+from app.core.database import Base
+
+
+class Call(Base):
+    """Call record synced from Vapi"""
+    __tablename__ = "calls"
+
+    id = Column(String, primary_key=True)  # Vapi call ID
+    assistant_id = Column(String(255), nullable=False)  # Vapi assistant ID
+
+    # Call info
+    type = Column(String(50), nullable=True)  # webCall, inboundPhoneCall, outboundPhoneCall
+    status = Column(String(50), nullable=True)  # queued, ringing, in-progress, ended
+    ended_reason = Column(String(255), nullable=True)
+
+    # Metrics
+    duration = Column(Float, default=0.0)  # in seconds
+    cost = Column(Float, default=0.0)
+
+    # Summary of the Vapi call payload (heavy fields like transcripts are dropped)
+    data = Column(JSON, nullable=True)
+
+    # Timestamps (naive UTC, as reported by Vapi)
+    created_at = Column(DateTime, nullable=False)
+    ended_at = Column(DateTime, nullable=True)
+    synced_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("idx_calls_assistant_created", "assistant_id", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<Call(id={self.id}, assistant_id={self.assistant_id}, status={self.status})>"
+
+
+class CallSyncState(Base):
+    """Incremental sync cursor per Vapi assistant"""
+    __tablename__ = "call_sync_state"
+
+    assistant_id = Column(String(255), primary_key=True)
+
+    # createdAt of the newest call ingested so far
+    last_created_at = Column(DateTime, nullable=True)
+    last_synced_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<CallSyncState(assistant_id={self.assistant_id}, last_created_at={self.last_created_at})>"
+
+
+class CallDailyRollup(Base):
+    """Pre-aggregated call metrics per assistant and per day, maintained on ingestion"""
+    __tablename__ = "call_daily_rollups"
+
+    assistant_id = Column(String(255), primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC day of the call's createdAt
+
+    calls = Column(Integer, default=0)
+    successful_calls = Column(Integer, default=0)  # status == "ended"
+    duration = Column(Float, default=0.0)  # summed, in seconds
+    duration_count = Column(Integer, default=0)  # calls with a non-zero duration
+    cost = Column(Float, default=0.0)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CallDailyRollup(assistant_id={self.assistant_id}, day={self.day}, calls={self.calls})>"
+
+
+class CallDailyEndReason(Base):
+    """Count of calls per end reason, per assistant and per day"""
+    __tablename__ = "call_daily_end_reasons"
+
+    assistant_id = Column(String(255), primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC day of the call's createdAt
+    reason = Column(String(255), primary_key=True)  # endedReason, "unknown" if missing
+
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CallDailyEndReason(assistant_id={self.assistant_id}, day={self.day}, reason={self.reason})>"
+
+
+class CallDailyBucket(Base):
+    """
+    Histogram of call durations and costs per assistant and per day
+
+    Counts of calls per log-spaced bucket (see call_analytics.sketch_bucket),
+    summed over days and assistants to compute percentiles.
+    """
+    __tablename__ = "call_daily_buckets"
+
+    assistant_id = Column(String(255), primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC day of the call's createdAt
+    metric = Column(String(20), primary_key=True)  # duration (calls with one) or cost
+    bucket = Column(Integer, primary_key=True)
+
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CallDailyBucket(assistant_id={self.assistant_id}, day={self.day}, metric={self.metric}, bucket={self.bucket})>"
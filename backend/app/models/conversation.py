@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey, JSON, Integer
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, JSON, Integer, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -17,10 +17,13 @@ class Conversation(Base):
     title = Column(String(500), nullable=True)  # Auto-generated from first message
     channel = Column(String(50), default="chat")  # chat, voice, whatsapp, email
 
-    # Messages stored as JSON array
+    # Legacy JSON array of messages, superseded by the conversation_messages table
     # Format: [{"role": "user", "content": "...", "timestamp": "..."}, ...]
     messages = Column(JSON, default=list)
 
+    # Latest Vapi chat ID, passed as previousChatId on the next turn
+    vapi_chat_id = Column(String(255), nullable=True)
+
     # Metadata
     extra_metadata = Column(JSON, nullable=True)  # Additional context, tags, etc.
 
@@ -40,3 +43,37 @@ class Conversation(Base):
     # Relationships
     agent = relationship("Agent", back_populates="conversations")
     user = relationship("User", back_populates="conversations")
+    conversation_messages = relationship(
+        "ConversationMessage",
+        back_populates="conversation",
+        cascade="all, delete-orphan",
+        order_by="ConversationMessage.seq",
+        # Never loaded as a whole, rows are removed by ON DELETE CASCADE
+        lazy="write_only",
+        passive_deletes=True
+    )
+
+
+class ConversationMessage(Base):
+    """Single message of a conversation, appended in seq order"""
+    __tablename__ = "conversation_messages"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    conversation_id = Column(String, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
+    seq = Column(Integer, nullable=False)  # 0-based position in the conversation
+
+    role = Column(String(50), nullable=False)  # user, assistant, system
+    content = Column(Text, nullable=False)
+    vapi_chat_id = Column(String(255), nullable=True)  # Set on assistant replies
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    conversation = relationship("Conversation", back_populates="conversation_messages")
+
+    __table_args__ = (
+        Index("idx_conversation_messages_conversation_seq", "conversation_id", "seq", unique=True),
+    )
+
+    def __repr__(self):
+        return f"<ConversationMessage(conversation_id={self.conversation_id}, seq={self.seq}, role={self.role})>"
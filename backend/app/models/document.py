@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -18,6 +18,7 @@ class Document(Base):
     file_path = Column(String(1000), nullable=False)
     file_type = Column(String(50), nullable=False)  # pdf, docx, txt, etc.
     file_size = Column(Integer, nullable=False)  # in bytes
+    vapi_file_id = Column(String(255), nullable=True, index=True)  # File uploaded to Vapi (None when uploaded as shards)
 
     # Processing Info
     status = Column(String(50), default="pending")  # pending, processing, completed, failed
@@ -36,3 +37,58 @@ class Document(Base):
 
     # Relationships
     agent = relationship("Agent", back_populates="documents")
+    chunks = relationship("DocumentChunk", back_populates="document", cascade="all, delete-orphan", passive_deletes=True)
+    shards = relationship(
+        "DocumentShard", back_populates="document", cascade="all, delete-orphan", passive_deletes=True,
+        order_by="DocumentShard.seq"
+    )
+
+
+class DocumentChunk(Base):
+    """Text chunk of a processed document, indexed for local search"""
+    __tablename__ = "document_chunks"
+    __table_args__ = (
+        UniqueConstraint("document_id", "seq", name="uq_document_chunks_document_seq"),
+    )
+
+    # Integer key: chunks are numerous and indexes refer to them by ID
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    document_id = Column(String, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    agent_id = Column(String, nullable=False, index=True)  # Denormalized, indexes are loaded per agent
+
+    seq = Column(Integer, nullable=False)  # Position within the document
+    content = Column(Text, nullable=False)
+
+    # Source of the chunk in the extracted text
+    page = Column(Integer, nullable=True)  # Page or slide it starts on (paged documents)
+    start_offset = Column(Integer, nullable=True)  # Character offsets
+    end_offset = Column(Integer, nullable=True)
+
+    # Relationships
+    document = relationship("Document", back_populates="chunks")
+
+
+class DocumentShard(Base):
+    """Part of a large document, uploaded to Vapi as a separate text file"""
+    __tablename__ = "document_shards"
+    __table_args__ = (
+        UniqueConstraint("document_id", "seq", name="uq_document_shards_document_seq"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    document_id = Column(String, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    seq = Column(Integer, nullable=False)  # Position within the document
+    vapi_file_id = Column(String(255), nullable=False, index=True)
+    filename = Column(String(500), nullable=False)
+    size = Column(Integer, nullable=False)  # in bytes
+    content_sha256 = Column(String(64), nullable=False)
+
+    # Span of the document's extracted text
+    start_offset = Column(Integer, nullable=False)
+    end_offset = Column(Integer, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    document = relationship("Document", back_populates="shards")
@@ -0,0 +1,31 @@
+"""
+Knowledge Base File Model
+Content-addressed registry of the files uploaded to Vapi, used to skip
+re-uploading a document a user already sent
+"""
+
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, UniqueConstraint
+from datetime import datetime
+import uuid
+
+from app.core.database import Base
+
+
+class KnowledgeBaseFile(Base):
+    """Vapi file uploaded by a user, keyed by the SHA-256 of its content"""
+    __tablename__ = "knowledge_base_files"
+    __table_args__ = (
+        UniqueConstraint("user_id", "content_sha256", name="uq_knowledge_base_files_user_sha256"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+
+    content_sha256 = Column(String(64), nullable=False)  # hex digest
+    vapi_file_id = Column(String(255), nullable=False, index=True)
+
+    # File info (of the first upload)
+    filename = Column(String(500), nullable=False)
+    file_size = Column(Integer, nullable=False)  # in bytes
+
+    created_at = Column(DateTime, default=datetime.utcnow)
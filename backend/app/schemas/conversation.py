@@ -32,3 +32,20 @@ class ConversationResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ConversationMessageResponse(BaseModel):
+    seq: int
+    role: str
+    content: str
+    vapi_chat_id: Optional[str]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ConversationMessagesPage(BaseModel):
+    conversation_id: str
+    messages: List[ConversationMessageResponse]
+    has_more: bool  # More messages exist beyond this page in the requested direction
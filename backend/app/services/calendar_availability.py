@@ -0,0 +1,257 @@
+"""
+Calendar Availability - Cached busy intervals per Google Calendar user
+
+Availability checks are answered from memory instead of listing events on
+every slot the assistant asks about. Each user's calendar keeps:
+- the busy events of a rolling window, listed with timeMin/timeMax and
+  keyed by event ID
+- the sync token of that listing, so later refreshes only fetch what changed
+- the events we create ourselves, recorded locally as soon as they exist
+
+The cache is refreshed when older than CALENDAR_BUSY_MAX_STALENESS_SECONDS.
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, date, timedelta, timezone
+import bisect
+import logging
+import threading
+import time
+
+from googleapiclient.errors import HttpError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Only the fields needed to track busy time
+SYNC_FIELDS = "nextPageToken,nextSyncToken,items(id,status,transparency,start,end)"
+SYNC_PAGE_SIZE = 2500
+
+# Reload the window at least this often, whatever the sync tokens say
+FULL_RELOAD_SECONDS = 3600
+
+
+def parse_google_time(value: Dict[str, str]) -> Optional[datetime]:
+    """Parse an event start/end ({"dateTime": ...} or all-day {"date": ...}) as aware UTC"""
+    if value.get("dateTime"):
+        parsed = datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00"))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.astimezone(timezone.utc)
+    if value.get("date"):
+        return datetime.combine(date.fromisoformat(value["date"]), datetime.min.time(), tzinfo=timezone.utc)
+    return None
+
+
+class IntervalIndex:
+    """
+    Intervals sorted by start, with O(log n + k) overlap queries
+
+    Intervals may overlap. A query only scans intervals starting between
+    (start - longest interval) and end. Keyed intervals (calendar events)
+    can be replaced or removed; anonymous ones can't.
+    """
+
+    def __init__(self):
+        self._starts: List[datetime] = []
+        self._intervals: List[Tuple[datetime, datetime, Optional[str]]] = []
+        self._keys: Dict[str, Tuple[datetime, datetime]] = {}
+        self._max_length = timedelta(0)
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def add(self, start: datetime, end: datetime, key: Optional[str] = None):
+        if key is not None:
+            self.remove(key)
+            self._keys[key] = (start, end)
+
+        i = bisect.bisect_right(self._starts, start)
+        self._starts.insert(i, start)
+        self._intervals.insert(i, (start, end, key))
+        self._max_length = max(self._max_length, end - start)
+
+    def remove(self, key: str):
+        interval = self._keys.pop(key, None)
+        if interval is None:
+            return
+
+        i = bisect.bisect_left(self._starts, interval[0])
+        while i < len(self._intervals) and self._starts[i] == interval[0]:
+            if self._intervals[i][2] == key:
+                del self._starts[i]
+                del self._intervals[i]
+                return
+            i += 1
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        """Check if any interval intersects [start, end)"""
+        lo = bisect.bisect_left(self._starts, start - self._max_length)
+        hi = bisect.bisect_left(self._starts, end)
+        for i in range(lo, hi):
+            if self._intervals[i][1] > start:
+                return True
+        return False
+
+
+class UserCalendar:
+    """Busy intervals of one user's primary calendar"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index: Optional[IntervalIndex] = None
+        self.window_start: Optional[datetime] = None
+        self.window_end: Optional[datetime] = None
+        self.sync_token: Optional[str] = None
+        self.loaded_at = 0.0  # monotonic
+        self.synced_at = 0.0  # monotonic
+
+
+class BusyIntervalCache:
+    """Per-user busy intervals, shared by every calendar operation in the process"""
+
+    def __init__(self, window_days: int, max_staleness_seconds: float):
+        self.window = timedelta(days=window_days)
+        self.max_staleness_seconds = max_staleness_seconds
+        self._calendars: Dict[str, UserCalendar] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_staleness_seconds > 0 and self.window > timedelta(0)
+
+    def _calendar_for(self, user_id: str) -> UserCalendar:
+        with self._lock:
+            calendar = self._calendars.get(user_id)
+            if calendar is None:
+                calendar = self._calendars[user_id] = UserCalendar()
+            return calendar
+
+    def is_busy(self, user_id: str, service, http, start: datetime, end: datetime) -> Optional[bool]:
+        """
+        Check if [start, end) overlaps a busy interval
+
+        Refreshes the user's intervals first if they are stale. Concurrent
+        checks for the same user wait for a single refresh.
+
+        Args:
+            user_id: User owning the calendar
+            service: Built Calendar client
+            http: Connection to execute requests with
+            start: Aware UTC start of the slot
+            end: Aware UTC end of the slot
+
+        Returns:
+            True/False, or None if the slot is outside the cached window
+        """
+        calendar = self._calendar_for(user_id)
+        with calendar.lock:
+            now = datetime.now(timezone.utc)
+            if (
+                calendar.index is None
+                or calendar.window_end - now < self.window / 2
+                or time.monotonic() - calendar.loaded_at > FULL_RELOAD_SECONDS
+            ):
+                self._load(calendar, service, http, now)
+            elif time.monotonic() - calendar.synced_at > self.max_staleness_seconds:
+                self._sync(calendar, service, http, now)
+
+            if start < calendar.window_start or end > calendar.window_end:
+                return None
+            return calendar.index.overlaps(start, end)
+
+    def record_event(self, user_id: str, event: Dict[str, Any]):
+        """Add an event we just created, without waiting for the next sync"""
+        with self._lock:
+            calendar = self._calendars.get(user_id)
+        if calendar is None:
+            return
+
+        with calendar.lock:
+            if calendar.index is not None:
+                self._apply_event(calendar, event)
+
+    def invalidate(self, user_id: str):
+        """Drop a user's intervals (calendar connected or disconnected)"""
+        with self._lock:
+            self._calendars.pop(user_id, None)
+
+    def _load(self, calendar: UserCalendar, service, http, now: datetime):
+        """Full load: list the events of a fresh window, keeping the listing's sync token"""
+        window_end = now + self.window
+        # Bounded by the window, not the calendar's history; changes made
+        # after this listing are replayed from its sync token
+        events, sync_token = self._list_events(
+            service, http, timeMin=now.isoformat(), timeMax=window_end.isoformat()
+        )
+
+        calendar.index = IntervalIndex()
+        for event in events:
+            self._apply_event(calendar, event)
+
+        calendar.sync_token = sync_token
+        calendar.window_start = now
+        calendar.window_end = window_end
+        calendar.loaded_at = calendar.synced_at = time.monotonic()
+        logger.info(f"Loaded {len(calendar.index)} busy events until {window_end.date()}")
+
+    def _sync(self, calendar: UserCalendar, service, http, now: datetime):
+        """Incremental sync; falls back to a full load when the sync token expired"""
+        if calendar.sync_token is None:
+            self._load(calendar, service, http, now)
+            return
+
+        try:
+            events, next_token = self._list_events(service, http, syncToken=calendar.sync_token)
+        except HttpError as e:
+            if getattr(e.resp, "status", None) == 410:
+                # Sync token expired
+                self._load(calendar, service, http, now)
+                return
+            raise
+
+        for event in events:
+            self._apply_event(calendar, event)
+
+        calendar.sync_token = next_token or calendar.sync_token
+        calendar.synced_at = time.monotonic()
+
+    @staticmethod
+    def _apply_event(calendar: UserCalendar, event: Dict[str, Any]):
+        """Apply a created/changed/cancelled event, by event ID"""
+        event_id = event.get("id")
+        if not event_id:
+            return
+
+        start = parse_google_time(event.get("start", {}))
+        end = parse_google_time(event.get("end", {}))
+        if event.get("status") == "cancelled" or event.get("transparency") == "transparent" or not start or not end:
+            calendar.index.remove(event_id)
+        else:
+            calendar.index.add(start, end, key=event_id)
+
+    @staticmethod
+    def _list_events(service, http, **params) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """All pages of an events listing, and the sync token of its last page"""
+        request = service.events().list(
+            calendarId="primary", singleEvents=True, maxResults=SYNC_PAGE_SIZE, fields=SYNC_FIELDS, **params
+        )
+        events = []
+        sync_token = None
+        while request is not None:
+            response = request.execute(http=http)
+            events.extend(response.get("items", []))
+            sync_token = response.get("nextSyncToken", sync_token)
+            request = service.events().list_next(request, response)
+        return events, sync_token
+
+
+# Global instance
+busy_intervals = BusyIntervalCache(
+    window_days=settings.CALENDAR_BUSY_WINDOW_DAYS,
+    max_staleness_seconds=settings.CALENDAR_BUSY_MAX_STALENESS_SECONDS,
+)
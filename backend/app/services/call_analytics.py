@@ -0,0 +1,144 @@
+"""
+Call Analytics - Percentile sketches and the analytics payload of call metrics
+"""
+
+from typing import Dict, Any, List, Iterable, Mapping, Optional, Sequence
+import math
+
+import numpy as np
+
+
+# Percentiles reported for call duration and cost
+PERCENTILES = (50, 90, 99)
+
+# Daily rollups count durations and costs in log-spaced buckets (as in
+# DDSketch): histograms of any days and assistants merge by adding counts,
+# and percentiles read from them are within SKETCH_ACCURACY (relative)
+SKETCH_ACCURACY = 0.01
+SKETCH_GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+# Bucket 0 counts zeros; the others are offset to stay positive (down to ~1e-9)
+SKETCH_OFFSET = 1000
+_LOG_GAMMA = math.log(SKETCH_GAMMA)
+
+
+def sketch_bucket(value: float) -> int:
+    """Histogram bucket of a duration or cost"""
+    if not value or value <= 0:
+        return 0
+    return max(1, math.ceil(math.log(value) / _LOG_GAMMA) + SKETCH_OFFSET)
+
+
+def sketch_value(bucket: int) -> float:
+    """Value representing a bucket (within SKETCH_ACCURACY of every value in it)"""
+    if bucket <= 0:
+        return 0.0
+    return 2 * SKETCH_GAMMA ** (bucket - SKETCH_OFFSET) / (SKETCH_GAMMA + 1)
+
+
+def percentiles_from_buckets(
+    duration_buckets: Mapping[int, int],
+    cost_buckets: Mapping[int, int],
+    percentiles: Sequence[int] = PERCENTILES
+) -> Dict[str, Dict[str, float]]:
+    """
+    Compute duration and cost percentiles from bucket counts
+
+    Percentiles interpolate linearly between ranks, like numpy.percentile
+    over the calls counted, within SKETCH_ACCURACY. Calls without a
+    duration are left out of the duration percentiles, so calls that never
+    connected don't drag the median to 0.
+
+    Args:
+        duration_buckets: Count of calls per duration bucket (sketch_bucket)
+        cost_buckets: Count of calls per cost bucket
+
+    Returns:
+        {"duration_seconds": {"p50": ..., ...}, "cost": {"p50": ..., ...}}
+    """
+    def summarize(buckets: Mapping[int, int], digits: int) -> Dict[str, float]:
+        counted = sorted((bucket, count) for bucket, count in buckets.items() if count > 0)
+        if not counted:
+            return {f"p{p}": 0 for p in percentiles}
+        values = np.array([sketch_value(bucket) for bucket, _ in counted])
+        cumulative = np.cumsum([count for _, count in counted])
+
+        result = {}
+        for p in percentiles:
+            rank = p / 100 * (cumulative[-1] - 1)
+            lower, upper = np.searchsorted(cumulative, [math.floor(rank), math.ceil(rank)], side="right")
+            value = values[lower] + (values[upper] - values[lower]) * (rank - math.floor(rank))
+            result[f"p{p}"] = round(float(value), digits)
+        return result
+
+    return {
+        "duration_seconds": summarize({bucket: count for bucket, count in duration_buckets.items() if bucket > 0}, 2),
+        "cost": summarize(cost_buckets, 4)
+    }
+
+
+def build_analytics_result(
+    total_calls: int,
+    total_minutes: float,
+    total_cost: float,
+    successful_calls: int,
+    end_reasons: Dict[str, int],
+    daily_data: Iterable[Dict[str, Any]],
+    assistant_durations: Dict[str, Dict[str, float]],
+    recent_calls: List[Dict[str, Any]],
+    percentiles: Optional[Dict[str, Dict[str, float]]] = None
+) -> Dict[str, Any]:
+    """
+    Build the analytics payload returned by the analytics endpoints
+
+    Args:
+        total_calls: Number of calls
+        total_minutes: Summed call duration in minutes
+        total_cost: Summed call cost
+        successful_calls: Number of calls with status "ended"
+        end_reasons: Count of calls per end reason
+        daily_data: Per-day dicts with date, calls, minutes and cost
+        assistant_durations: Per-assistant dicts with total_minutes and count
+        recent_calls: Most recent call records, newest first
+        percentiles: Duration and cost percentiles (see percentiles_from_buckets)
+
+    Returns:
+        Analytics data including metrics and time series data
+    """
+    time_series = []
+    for day in sorted(daily_data, key=lambda x: x["date"]):
+        day = {
+            "date": day["date"],
+            "calls": day["calls"],
+            "minutes": round(day["minutes"], 2),
+            "cost": round(day["cost"], 2),
+            "avg_cost": round(day["cost"] / day["calls"], 4) if day["calls"] > 0 else 0
+        }
+        time_series.append(day)
+
+    # Calculate average duration by assistant
+    avg_duration_by_assistant = {}
+    for assistant_id, data in assistant_durations.items():
+        if data["count"] > 0:
+            avg_duration_by_assistant[assistant_id] = round(
+                data["total_minutes"] / data["count"], 2
+            )
+
+    avg_cost_per_call = total_cost / total_calls if total_calls > 0 else 0
+    avg_duration = total_minutes / total_calls if total_calls > 0 else 0
+
+    result = {
+        "total_calls": total_calls,
+        "total_minutes": round(total_minutes, 2),
+        "total_cost": round(total_cost, 2),
+        "avg_cost_per_call": round(avg_cost_per_call, 4),
+        "avg_duration_minutes": round(avg_duration, 2),
+        "successful_calls": successful_calls,
+        "success_rate": round((successful_calls / total_calls * 100), 2) if total_calls > 0 else 0,
+        "end_reasons": end_reasons,
+        "time_series": time_series,
+        "avg_duration_by_assistant": avg_duration_by_assistant,
+        "calls": recent_calls
+    }
+    if percentiles is not None:
+        result["percentiles"] = percentiles
+    return result
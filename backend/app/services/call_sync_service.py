@@ -0,0 +1,532 @@
+"""
+Call Sync Service - Incremental sync of Vapi calls into the local calls table
+
+Analytics are answered from the local table instead of hitting Vapi's /call
+endpoint on every dashboard load. Per-assistant daily rollups (totals, and
+duration/cost histograms for percentiles) are maintained as calls are
+ingested so aggregate queries cost O(days x agents), not O(calls).
+"""
+
+from typing import Dict, Any, List, Optional, Set, Tuple
+from datetime import datetime, date, timedelta, timezone
+from collections import Counter
+import asyncio
+import time
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, upsert_statement
+from app.models.call import Call, CallSyncState, CallDailyRollup, CallDailyEndReason, CallDailyBucket
+from app.services.call_analytics import build_analytics_result, percentiles_from_buckets, sketch_bucket
+from app.services.vapi_service import vapi_service
+
+
+# Fields of the Vapi call payload kept locally (transcripts, messages and
+# recordings are dropped to keep rows small)
+CALL_SUMMARY_FIELDS = [
+    "id", "assistantId", "phoneNumberId", "type", "status", "endedReason",
+    "createdAt", "updatedAt", "startedAt", "endedAt", "duration", "cost", "customer"
+]
+
+# Re-read a small overlap before the cursor; rows are upserted so it's harmless
+SYNC_OVERLAP = timedelta(minutes=1)
+
+RECENT_CALLS_LIMIT = 100
+
+# Summed columns of CallDailyRollup, incremented by the rollup deltas
+ROLLUP_SUMS = ("calls", "successful_calls", "duration", "duration_count", "cost")
+
+
+def parse_vapi_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Parse a Vapi ISO 8601 timestamp into a naive UTC datetime"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class CallSyncService:
+    """Service keeping the local calls table in sync with Vapi"""
+
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._task: Optional[asyncio.Task] = None
+        # Background syncs requested by the analytics endpoints
+        self._requested: Set[str] = set()
+        self._request_tasks: Set[asyncio.Task] = set()
+        # Last sync (monotonic) and last error of each assistant, in this process
+        self._synced_at: Dict[str, float] = {}
+        self.sync_errors: Dict[str, Exception] = {}
+
+    def _lock_for(self, assistant_id: str) -> asyncio.Lock:
+        lock = self._locks.get(assistant_id)
+        if lock is None:
+            lock = self._locks[assistant_id] = asyncio.Lock()
+        return lock
+
+    async def sync_assistant(
+        self,
+        db: AsyncSession,
+        assistant_id: str,
+        force: bool = False
+    ) -> int:
+        """
+        Pull calls created since the last sync for an assistant
+
+        Calls that were not finished at the previous sync are re-fetched so
+        their final status, duration and cost are picked up. Concurrent syncs
+        of the same assistant are collapsed into one.
+
+        Args:
+            db: Database session
+            assistant_id: Vapi assistant ID
+            force: Sync even if the last sync is within the staleness bound
+
+        Returns:
+            Number of calls ingested
+        """
+        async with self._lock_for(assistant_id):
+            state = await db.get(CallSyncState, assistant_id)
+            now = datetime.utcnow()
+
+            if (
+                not force
+                and state
+                and state.last_synced_at
+                and now - state.last_synced_at < timedelta(seconds=settings.CALL_SYNC_STALE_SECONDS)
+            ):
+                return 0
+
+            backfill_start = now - timedelta(days=settings.CALL_SYNC_BACKFILL_DAYS)
+            since = state.last_created_at if state and state.last_created_at else backfill_start
+
+            oldest_pending = await db.scalar(
+                select(func.min(Call.created_at)).where(
+                    Call.assistant_id == assistant_id,
+                    Call.status != "ended",
+                    Call.created_at > backfill_start
+                )
+            )
+            if oldest_pending and oldest_pending < since:
+                since = oldest_pending
+
+            ingested = 0
+            newest = state.last_created_at if state else None
+
+            async for page in vapi_service.iter_calls(
+                assistant_id=assistant_id,
+                created_at_gt=(since - SYNC_OVERLAP).isoformat(),
+                created_at_lt=now.isoformat()
+            ):
+                # The upsert/rollup logic is shared with the sync rebuild path
+                rows = await db.run_sync(self._upsert_calls, assistant_id, page)
+                await db.commit()
+                ingested += len(rows)
+
+                for row in rows:
+                    if newest is None or row.created_at > newest:
+                        newest = row.created_at
+
+            if state is None:
+                state = CallSyncState(assistant_id=assistant_id)
+                db.add(state)
+            state.last_created_at = newest
+            state.last_synced_at = now
+            await db.commit()
+
+            if ingested:
+                logger.info(f"Synced {ingested} calls for assistant {assistant_id}")
+            return ingested
+
+    def _upsert_calls(
+        self,
+        db: Session,
+        assistant_id: str,
+        calls: List[Dict[str, Any]]
+    ) -> List[Call]:
+        """Insert new calls and update existing ones from a page of Vapi calls"""
+        # Deduplicate by ID, keeping the last occurrence
+        calls = list({
+            call["id"]: call for call in calls if call.get("id") and call.get("createdAt")
+        }.values())
+        if not calls:
+            return []
+
+        # Locked (PostgreSQL) so a call updated by two syncs is withdrawn from its rollup once
+        existing = {
+            row.id: row
+            for row in db.query(Call).filter(Call.id.in_([call["id"] for call in calls])).with_for_update().all()
+        }
+
+        rows = []
+        rollup_deltas: Dict[Tuple[str, date], Dict[str, Any]] = {}
+        for call in calls:
+            created_at = parse_vapi_datetime(call.get("createdAt"))
+            if created_at is None:
+                continue
+
+            row = existing.get(call["id"])
+            if row is None:
+                row = Call(id=call["id"], assistant_id=call.get("assistantId") or assistant_id)
+                db.add(row)
+            else:
+                # Withdraw the previous version of the call from its rollup
+                self._add_rollup_delta(rollup_deltas, row, -1)
+
+            row.type = call.get("type")
+            row.status = call.get("status")
+            row.ended_reason = call.get("endedReason")
+            row.duration = call.get("duration") or 0.0
+            row.cost = call.get("cost") or 0.0
+            row.created_at = created_at
+            row.ended_at = parse_vapi_datetime(call.get("endedAt"))
+            row.data = {key: call[key] for key in CALL_SUMMARY_FIELDS if key in call}
+            rows.append(row)
+
+            self._add_rollup_delta(rollup_deltas, row, 1)
+
+        self._apply_rollup_deltas(db, rollup_deltas)
+        return rows
+
+    @staticmethod
+    def _add_rollup_delta(
+        deltas: Dict[Tuple[str, date], Dict[str, Any]],
+        row: Call,
+        sign: int
+    ):
+        """Add (sign=1) or withdraw (sign=-1) a call's contribution to its day rollup"""
+        key = (row.assistant_id, row.created_at.date())
+        delta = deltas.get(key)
+        if delta is None:
+            delta = deltas[key] = {
+                "calls": 0,
+                "successful_calls": 0,
+                "duration": 0.0,
+                "duration_count": 0,
+                "cost": 0.0,
+                "end_reasons": Counter(),
+                "buckets": Counter()  # (metric, bucket) -> calls
+            }
+
+        delta["calls"] += sign
+        if row.status == "ended":
+            delta["successful_calls"] += sign
+        if row.duration:
+            delta["duration"] += sign * row.duration
+            delta["duration_count"] += sign
+        delta["cost"] += sign * (row.cost or 0.0)
+        delta["end_reasons"][row.ended_reason or "unknown"] += sign
+        if row.duration:
+            delta["buckets"]["duration", sketch_bucket(row.duration)] += sign
+        delta["buckets"]["cost", sketch_bucket(row.cost or 0.0)] += sign
+
+    @staticmethod
+    def _increment(db: Session, model, keys: List[str], rows: List[Dict[str, Any]], counters: List[str]):
+        """Insert rows, or add their counters to the existing ones (in SQL, so concurrent syncs add up)"""
+        if not rows:
+            return
+        statement = upsert_statement(db, model)
+        updates = {column: getattr(model, column) + getattr(statement.excluded, column) for column in counters}
+        if "updated_at" in model.__table__.columns:
+            updates["updated_at"] = statement.excluded.updated_at
+        db.execute(statement.on_conflict_do_update(index_elements=keys, set_=updates), rows)
+
+    def _apply_rollup_deltas(
+        self,
+        db: Session,
+        deltas: Dict[Tuple[str, date], Dict[str, Any]]
+    ):
+        """Apply accumulated deltas to the daily rollup, end reason and histogram rows"""
+        now = datetime.utcnow()
+        self._increment(db, CallDailyRollup, ["assistant_id", "day"], [
+            {"assistant_id": assistant_id, "day": day, "updated_at": now, **{column: delta[column] for column in ROLLUP_SUMS}}
+            for (assistant_id, day), delta in deltas.items()
+        ], list(ROLLUP_SUMS))
+        self._increment(db, CallDailyEndReason, ["assistant_id", "day", "reason"], [
+            {"assistant_id": assistant_id, "day": day, "reason": reason, "count": count}
+            for (assistant_id, day), delta in deltas.items()
+            for reason, count in delta["end_reasons"].items()
+            if count
+        ], ["count"])
+        self._increment(db, CallDailyBucket, ["assistant_id", "day", "metric", "bucket"], [
+            {"assistant_id": assistant_id, "day": day, "metric": metric, "bucket": bucket, "count": count}
+            for (assistant_id, day), delta in deltas.items()
+            for (metric, bucket), count in delta["buckets"].items()
+            if count
+        ], ["count"])
+
+    def rebuild_rollups(self, db: Session, assistant_id: Optional[str] = None) -> int:
+        """
+        Recompute daily rollups from the calls table
+
+        Used to backfill rollups for calls ingested before they existed.
+
+        Args:
+            db: Database session
+            assistant_id: Only rebuild this assistant (all assistants if None)
+
+        Returns:
+            Number of calls replayed
+        """
+        call_query = db.query(Call)
+        if assistant_id:
+            call_query = call_query.filter(Call.assistant_id == assistant_id)
+
+        deltas: Dict[Tuple[str, date], Dict[str, Any]] = {}
+        replayed = 0
+        for row in call_query.yield_per(1000):
+            self._add_rollup_delta(deltas, row, 1)
+            replayed += 1
+
+        # Replace the existing rollups, dropping days that no longer have calls
+        for model in (CallDailyRollup, CallDailyEndReason, CallDailyBucket):
+            statement = delete(model)
+            if assistant_id:
+                statement = statement.where(model.assistant_id == assistant_id)
+            db.execute(statement)
+
+        self._apply_rollup_deltas(db, deltas)
+        db.commit()
+
+        logger.info(f"Rebuilt {len(deltas)} daily rollups from {replayed} calls")
+        return replayed
+
+    async def get_analytics(
+        self,
+        db: AsyncSession,
+        assistant_ids: List[str],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Compute analytics from the daily rollups
+
+        Day-granular: the range covers whole UTC days, from the day of
+        start_date to the day of end_date included, for every metric
+        (totals, percentiles and recent calls alike). Metrics are summed over
+        the rollup rows of those days and percentiles read from the summed
+        daily histograms, so the cost does not depend on call volume.
+
+        Args:
+            db: Database session
+            assistant_ids: Vapi assistant IDs to include
+            start_date: Start date (ISO 8601), only its day is used
+            end_date: End date (ISO 8601), only its day is used
+
+        Returns:
+            Analytics data including metrics and time series data
+        """
+        start = parse_vapi_datetime(start_date)
+        end = parse_vapi_datetime(end_date)
+
+        def day_filters(model) -> list:
+            filters = [model.assistant_id.in_(assistant_ids)]
+            if start:
+                filters.append(model.day >= start.date())
+            if end:
+                filters.append(model.day <= end.date())
+            return filters
+
+        call_filters = [Call.assistant_id.in_(assistant_ids)]
+        if start:
+            call_filters.append(Call.created_at >= datetime.combine(start.date(), datetime.min.time()))
+        if end:
+            call_filters.append(Call.created_at < datetime.combine(end.date() + timedelta(days=1), datetime.min.time()))
+
+        total_calls = 0
+        total_duration = 0.0
+        total_cost = 0.0
+        successful_calls = 0
+        end_reasons: Counter = Counter()
+        daily_data: Dict[str, Dict[str, Any]] = {}
+        assistant_durations: Dict[str, Dict[str, float]] = {}
+
+        for rollup in await db.scalars(select(CallDailyRollup).where(*day_filters(CallDailyRollup))):
+            if not rollup.calls:
+                continue
+
+            total_calls += rollup.calls
+            total_duration += rollup.duration
+            total_cost += rollup.cost
+            successful_calls += rollup.successful_calls
+
+            date_key = rollup.day.isoformat()
+            day = daily_data.setdefault(date_key, {"date": date_key, "calls": 0, "minutes": 0.0, "cost": 0.0})
+            day["calls"] += rollup.calls
+            day["minutes"] += rollup.duration / 60
+            day["cost"] += rollup.cost
+
+            if rollup.duration_count:
+                durations = assistant_durations.setdefault(
+                    rollup.assistant_id, {"total_minutes": 0.0, "count": 0}
+                )
+                durations["total_minutes"] += rollup.duration / 60
+                durations["count"] += rollup.duration_count
+
+        for reason, count in await db.execute(
+            select(CallDailyEndReason.reason, func.sum(CallDailyEndReason.count))
+            .where(*day_filters(CallDailyEndReason))
+            .group_by(CallDailyEndReason.reason)
+        ):
+            if count:
+                end_reasons[reason] = int(count)
+
+        recent_calls = list(await db.scalars(
+            select(Call.data)
+            .where(*call_filters)
+            .order_by(Call.created_at.desc())
+            .limit(RECENT_CALLS_LIMIT)
+        ))
+
+        # Histograms summed in the database: one row per (metric, bucket)
+        buckets: Dict[str, Dict[int, int]] = {"duration": {}, "cost": {}}
+        for metric, bucket, count in await db.execute(
+            select(CallDailyBucket.metric, CallDailyBucket.bucket, func.sum(CallDailyBucket.count))
+            .where(*day_filters(CallDailyBucket))
+            .group_by(CallDailyBucket.metric, CallDailyBucket.bucket)
+        ):
+            buckets.setdefault(metric, {})[bucket] = int(count or 0)
+        percentiles = percentiles_from_buckets(buckets["duration"], buckets["cost"])
+
+        return build_analytics_result(
+            total_calls=total_calls,
+            total_minutes=total_duration / 60,
+            total_cost=total_cost,
+            successful_calls=successful_calls,
+            end_reasons=dict(end_reasons),
+            daily_data=daily_data.values(),
+            assistant_durations=assistant_durations,
+            recent_calls=recent_calls,
+            percentiles=percentiles
+        )
+
+    async def sync_assistants(
+        self,
+        assistant_ids: List[str],
+        max_concurrency: Optional[int] = None,
+        force: bool = False
+    ) -> Dict[str, Exception]:
+        """
+        Sync several assistants concurrently
+
+        Each sync runs in its own database session under a bounded semaphore,
+        and a failure for one assistant doesn't affect the others. The last
+        error of each assistant is kept in sync_errors until it syncs again.
+
+        Args:
+            assistant_ids: Vapi assistant IDs to sync
+            max_concurrency: Maximum number of assistants synced at once
+            force: Sync even the assistants synced within the staleness bound
+
+        Returns:
+            Errors keyed by assistant ID (empty if every sync succeeded)
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or settings.VAPI_MAX_CONCURRENT_REQUESTS)
+
+        async def sync_one(assistant_id: str):
+            async with semaphore:
+                async with AsyncSessionLocal() as db:
+                    try:
+                        await self.sync_assistant(db, assistant_id, force=force)
+                    except Exception:
+                        await db.rollback()
+                        raise
+
+        results = await asyncio.gather(
+            *(sync_one(assistant_id) for assistant_id in assistant_ids),
+            return_exceptions=True
+        )
+
+        errors = {}
+        for assistant_id, result in zip(assistant_ids, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error syncing calls for assistant {assistant_id}: {result}")
+                errors[assistant_id] = self.sync_errors[assistant_id] = result
+            else:
+                self.sync_errors.pop(assistant_id, None)
+                self._synced_at[assistant_id] = time.monotonic()
+        return errors
+
+    def request_sync(self, assistant_ids: List[str]):
+        """
+        Sync assistants whose local calls are stale, in the background
+
+        Called by the analytics endpoints, which answer from the local
+        tables right away: a dashboard load never waits for Vapi. Assistants
+        synced within CALL_SYNC_STALE_SECONDS, or already being synced on
+        request, are skipped.
+        """
+        now = time.monotonic()
+        stale = [
+            assistant_id for assistant_id in dict.fromkeys(assistant_ids)
+            if assistant_id not in self._requested
+            and now - self._synced_at.get(assistant_id, float("-inf")) >= settings.CALL_SYNC_STALE_SECONDS
+        ]
+        if not stale:
+            return
+
+        self._requested.update(stale)
+
+        async def run():
+            try:
+                await self.sync_assistants(stale)
+            finally:
+                self._requested.difference_update(stale)
+
+        task = asyncio.create_task(run())
+        self._request_tasks.add(task)
+        task.add_done_callback(self._request_tasks.discard)
+
+    async def sync_all(self):
+        """Sync calls for every agent linked to a Vapi assistant"""
+        from app.models.agent import Agent
+
+        async with AsyncSessionLocal() as db:
+            assistant_ids = list(await db.scalars(
+                select(Agent.vapi_assistant_id).where(Agent.vapi_assistant_id.isnot(None))
+            ))
+
+        await self.sync_assistants(assistant_ids, force=True)
+
+    async def _run(self):
+        """Background loop syncing calls periodically"""
+        while True:
+            try:
+                await self.sync_all()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Call sync job failed: {e}")
+            await asyncio.sleep(settings.CALL_SYNC_INTERVAL_SECONDS)
+
+    def start(self):
+        """Start the background sync job (called on application startup)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Call sync job started (every {settings.CALL_SYNC_INTERVAL_SECONDS}s)")
+
+    async def stop(self):
+        """Stop the background sync job (called on shutdown)"""
+        for task in list(self._request_tasks):
+            task.cancel()
+        await asyncio.gather(*self._request_tasks, return_exceptions=True)
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global instance
+call_sync_service = CallSyncService()
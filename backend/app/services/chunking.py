@@ -0,0 +1,264 @@
+"""
+Chunking - Recursive text splitter that keeps source offsets
+
+Same algorithm as langchain's RecursiveCharacterTextSplitter (separators
+kept at the start of the following split, whitespace stripped): text is
+split on the first separator of the hierarchy it contains, splits that
+are still too long are split again with the next separators, and
+consecutive splits are merged into chunks of up to chunk_size, each chunk
+starting with up to chunk_overlap of the previous one.
+
+Splits are (start, end) positions in the text rather than strings, so
+every chunk knows where it comes from: character offsets in the document
+text and, for paged documents, the page it starts on. Lengths are
+characters, or tokens with count_tokens.
+"""
+
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from bisect import bisect_right
+import hashlib
+import re
+
+from loguru import logger
+
+
+DEFAULT_SEPARATORS = ("\n\n", "\n", ". ", " ", "")
+
+# Bump when a change to the algorithm changes chunks (invalidates cached chunks)
+CHUNKER_VERSION = 1
+
+# Characters of streamed text split at a time
+STREAM_WINDOW = 64 * 1024
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+try:
+    import tiktoken
+except ImportError:  # Optional: token counts are estimated without it
+    tiktoken = None
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Number of tokens of a text
+
+    tiktoken's cl100k_base encoding when installed, otherwise an estimate:
+    words and punctuation marks, long words counting one token per 4
+    characters.
+    """
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text, disallowed_special=()))
+    return sum((len(token) + 3) // 4 for token in TOKEN_PATTERN.findall(text))
+
+
+def utf8_length(text: str) -> int:
+    """Size of a text in UTF-8 bytes"""
+    return len(text.encode("utf-8"))
+
+
+class Chunk(NamedTuple):
+    """Chunk text and where it is in the document text"""
+    text: str
+    start: int  # Offset of its first character
+    end: int  # Offset after its last character
+    page: int  # 1-based index of the streamed piece (page, slide...) it starts in
+
+
+Span = Tuple[int, int]
+
+
+class TextChunker:
+    """Recursive splitter over text positions"""
+
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        separators: Sequence[str] = DEFAULT_SEPARATORS,
+        length_function: Optional[Callable[[str], int]] = None
+    ):
+        """
+        Args:
+            chunk_size: Max chunk length (longer only when text can't be split further)
+            chunk_overlap: Max length repeated from the end of the previous chunk
+            separators: Separators tried in order, "" splitting between characters
+            length_function: Length of a text, e.g. count_tokens (default: characters)
+        """
+        if chunk_overlap >= chunk_size:
+            raise ValueError(f"Chunk overlap ({chunk_overlap}) must be smaller than chunk size ({chunk_size})")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = tuple(separators)
+        self.length_function = length_function
+
+    @property
+    def key(self) -> str:
+        """Identifies the chunker configuration (cached chunks are kept apart)"""
+        if self.length_function is None:
+            unit = "characters"
+        elif self.length_function is count_tokens:
+            unit = "tiktoken" if tiktoken is not None else "token-estimate"
+        else:
+            unit = getattr(self.length_function, "__qualname__", repr(self.length_function))
+        config = f"{CHUNKER_VERSION}|{self.chunk_size}|{self.chunk_overlap}|{unit}|{self.separators!r}"
+        return hashlib.sha256(config.encode()).hexdigest()[:16]
+
+    def _length(self, text: str, start: int, end: int) -> int:
+        if self.length_function is None:
+            return end - start
+        return self.length_function(text[start:end])
+
+    def _splits(self, text: str, start: int, end: int, separator: str) -> Iterator[Span]:
+        """Non-empty pieces of text[start:end], each separator starting the piece after it"""
+        if not separator:
+            for position in range(start, end):
+                yield position, position + 1
+            return
+        piece_start = start
+        position = text.find(separator, start, end)
+        while position != -1:
+            if position > piece_start:
+                yield piece_start, position
+            piece_start = position
+            position = text.find(separator, position + len(separator), end)
+        if end > piece_start:
+            yield piece_start, end
+
+    def _merge(self, splits: List[Tuple[int, int, int]], chunks: List[Span]):
+        """Merge consecutive (start, end, length) splits into chunks with overlap"""
+        current: List[Tuple[int, int, int]] = []
+        first = 0  # current[first:] is the chunk being built
+        total = 0
+        for split in splits:
+            length = split[2]
+            if total + length > self.chunk_size and len(current) > first:
+                if total > self.chunk_size:
+                    logger.debug(f"Created a chunk of size {total}, longer than {self.chunk_size}")
+                chunks.append((current[first][0], current[-1][1]))
+                # Keep the end of the chunk as the overlap of the next one
+                while total > self.chunk_overlap or (total + length > self.chunk_size and total > 0):
+                    total -= current[first][2]
+                    first += 1
+            current.append(split)
+            total += length
+        if len(current) > first:
+            chunks.append((current[first][0], current[-1][1]))
+
+    def _split(self, text: str, start: int, end: int, separators: Sequence[str], chunks: List[Span]):
+        """Append the chunk spans of text[start:end] to chunks"""
+        separator, remaining = separators[-1], ()
+        for position, candidate in enumerate(separators):
+            if not candidate:
+                separator = candidate
+                break
+            if text.find(candidate, start, end) != -1:
+                separator, remaining = candidate, separators[position + 1:]
+                break
+
+        if not separator and self.length_function is None:
+            # Between characters, chunks are fixed windows (what merging single characters gives)
+            while end - start > self.chunk_size:
+                chunks.append((start, start + self.chunk_size))
+                start += self.chunk_size - self.chunk_overlap
+            chunks.append((start, end))
+            return
+
+        short: List[Tuple[int, int, int]] = []
+        for split_start, split_end in self._splits(text, start, end, separator):
+            length = self._length(text, split_start, split_end)
+            if length < self.chunk_size:
+                short.append((split_start, split_end, length))
+                continue
+            if short:
+                self._merge(short, chunks)
+                short = []
+            if remaining:
+                self._split(text, split_start, split_end, remaining, chunks)
+            else:
+                chunks.append((split_start, split_end))
+        if short:
+            self._merge(short, chunks)
+
+    def spans(self, text: str) -> List[Span]:
+        """(start, end) of each chunk of text, surrounding whitespace excluded"""
+        raw: List[Span] = []
+        self._split(text, 0, len(text), self.separators, raw)
+        spans = []
+        for start, end in raw:
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end - 1].isspace():
+                end -= 1
+            if end > start:
+                spans.append((start, end))
+        return spans
+
+    def split_text(self, text: str) -> List[str]:
+        """Chunks of text, as strings"""
+        return [text[start:end] for start, end in self.spans(text)]
+
+    def stream(self, pieces: Iterable[str], window: int = STREAM_WINDOW) -> Iterator[Chunk]:
+        """
+        Chunk a document streamed in pieces (pages, slides, blocks of lines...)
+
+        The document text is the pieces joined by newlines; offsets refer to
+        it and page is the index of the piece a chunk starts in. Text is
+        split `window` characters at a time: the last chunk of a window is
+        split again with the following text, so only about one window is
+        held in memory.
+        """
+        pending: List[str] = []
+        pending_size = 0
+        carried = ""  # Text of the previous window from its last chunk on
+        base = 0  # Document offset of carried
+        piece_starts: List[int] = []
+        length = 0
+
+        def chunk(text: str, start: int, end: int) -> Chunk:
+            offset = base + start
+            return Chunk(text[start:end], offset, base + end, bisect_right(piece_starts, offset))
+
+        for piece in pieces:
+            if piece_starts:
+                pending.append("\n")
+                length += 1
+            piece_starts.append(length)
+            pending.append(piece)
+            length += len(piece)
+            pending_size += len(piece) + 1
+
+            if pending_size >= window:
+                text = carried + "".join(pending)
+                pending, pending_size = [], 0
+                spans = self.spans(text)
+                for start, end in spans[:-1]:
+                    yield chunk(text, start, end)
+                # Without a chunk (whitespace only), nothing needs to be kept
+                cut = spans[-1][0] if spans else len(text)
+                carried = text[cut:]
+                base += cut
+
+        text = carried + "".join(pending)
+        for start, end in self.spans(text):
+            yield chunk(text, start, end)
+
+
+def create_chunker(chunk_size: int, chunk_overlap: int, unit: str = "characters") -> TextChunker:
+    """
+    Chunker measuring lengths in characters or tokens
+
+    Raises:
+        ValueError: If the unit is neither characters nor tokens
+    """
+    if unit not in ("characters", "tokens"):
+        raise ValueError(f"Unknown chunk length unit: {unit}")
+    return TextChunker(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=count_tokens if unit == "tokens" else None,
+    )
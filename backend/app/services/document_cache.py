@@ -0,0 +1,140 @@
+"""
+Document Cache - Extracted text and chunks of documents, by content hash
+
+Two layers, both gzip-compressed JSON lines files under DOCUMENT_CACHE_DIR:
+- text/<sha256>.<type>.v<extraction version>.jsonl.gz: the streamed text
+  pieces (pages, slides, blocks) of a file, so changing the chunker
+  settings doesn't extract documents again
+- chunks/<sha256>.<type>.<chunker key>.jsonl.gz: the chunks and stats of a
+  file for one chunker configuration, so processing the same file again
+  (re-indexing, or the same file uploaded for another agent) is a single
+  read
+
+Entries are written to a temporary file and renamed when complete, so a
+reader never sees a partial entry and concurrent writers of the same
+entry are harmless. Entries are never modified: files are addressed by
+their content hash.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import gzip
+import hashlib
+import json
+import os
+import uuid
+
+from loguru import logger
+
+from app.core.config import settings
+from app.services.chunking import Chunk
+
+
+# Read size when hashing a stored file
+HASH_CHUNK_SIZE = 1024 * 1024
+# Fast compression: entries are written once per document, on the indexing path
+COMPRESS_LEVEL = 1
+
+
+def hash_file(file_path: str) -> str:
+    """SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DocumentCache:
+    """Compressed text pieces and chunk sets of files, keyed by content hash"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, layer: str, name: str) -> str:
+        return os.path.join(self.directory, layer, name[:2], name)
+
+    def text_path(self, content_sha256: str, file_type: str, version: int) -> str:
+        return self._path("text", f"{content_sha256}.{file_type}.v{version}.jsonl.gz")
+
+    def chunks_path(self, content_sha256: str, file_type: str, chunker_key: str) -> str:
+        return self._path("chunks", f"{content_sha256}.{file_type}.{chunker_key}.jsonl.gz")
+
+    @staticmethod
+    def _write(path: str, lines: Iterable[Any]) -> Iterator[Any]:
+        """
+        Write items as JSON lines while passing them through
+
+        The entry only appears once every item was written; if the
+        consumer stops early or an item raises, it is discarded.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with gzip.open(temporary, "wt", encoding="utf-8", compresslevel=COMPRESS_LEVEL) as file:
+                for item in lines:
+                    file.write(json.dumps(item, ensure_ascii=False))
+                    file.write("\n")
+                    yield item
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    @staticmethod
+    def _read(path: str) -> Iterator[Any]:
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            for line in file:
+                yield json.loads(line)
+
+    def iter_text(self, content_sha256: str, file_type: str, version: int) -> Optional[Iterator[str]]:
+        """Cached text pieces of a file, None if not cached"""
+        path = self.text_path(content_sha256, file_type, version)
+        if not os.path.exists(path):
+            return None
+        return self._read(path)
+
+    def store_text(self, content_sha256: str, file_type: str, version: int, pieces: Iterable[str]) -> Iterator[str]:
+        """Pass text pieces through, caching them once they were all read"""
+        return self._write(self.text_path(content_sha256, file_type, version), pieces)
+
+    def get_chunks(
+        self,
+        content_sha256: str,
+        file_type: str,
+        chunker_key: str
+    ) -> Optional[Tuple[Dict[str, Any], List[Chunk]]]:
+        """
+        Cached (stats, chunks) of a file for a chunker configuration, None if not cached
+
+        Finding the entry is a single path lookup, but a hit reads and
+        decompresses the whole entry: cost grows with the document's size.
+        """
+        path = self.chunks_path(content_sha256, file_type, chunker_key)
+        try:
+            rows = self._read(path)
+            stats = next(rows)
+            chunks = [Chunk(*row) for row in rows]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # A corrupt entry is rebuilt
+            logger.warning(f"Ignoring unreadable document cache entry {path}: {e}")
+            return None
+        return stats, chunks
+
+    def put_chunks(
+        self,
+        content_sha256: str,
+        file_type: str,
+        chunker_key: str,
+        stats: Dict[str, Any],
+        chunks: List[Chunk]
+    ):
+        """Cache the stats and chunks of a file (first line stats, then one chunk per line)"""
+        path = self.chunks_path(content_sha256, file_type, chunker_key)
+        for _ in self._write(path, [stats, *(list(chunk) for chunk in chunks)]):
+            pass
+
+
+# Global instance
+document_cache = DocumentCache(settings.DOCUMENT_CACHE_DIR)
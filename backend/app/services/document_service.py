@@ -2,101 +2,82 @@
 Document Service - Extract text from files and chunk for RAG
 """
 
+import hashlib
 import os
-from typing import List, Dict, Any
+import shutil
+from typing import List, Dict, Any, Optional, Union, BinaryIO, Iterable, Iterator
+import numpy as np
+from datetime import datetime
 from pathlib import Path
-import PyPDF2
-from docx import Document as DocxDocument
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from sqlalchemy.orm import Session
 from loguru import logger
 
 from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.document import Document, DocumentChunk, DocumentShard
+from app.services.chunking import Chunk, TextChunker, count_tokens, create_chunker, utf8_length
+from app.services.document_cache import document_cache, hash_file
+from app.services.embeddings import embedding_service
+from app.services.search_index import search_indexes
+from app.services.text_extraction import EXTRACTION_VERSION, EXTRACTORS, PAGED_TYPES, iter_file_text
+from app.services.vector_index import vector_indexes
 
 
 class DocumentService:
     """Service for processing documents"""
 
+    # File types text can be extracted from
+    SUPPORTED_TYPES = tuple(EXTRACTORS)
+
     def __init__(self):
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-            separators=["\n\n", "\n", ". ", " ", ""]
-        )
+        self.chunker = create_chunker(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, settings.CHUNK_LENGTH_UNIT)
 
-    def extract_text(self, file_path: str, file_type: str) -> str:
+    def iter_text(self, file_path: str, file_type: str) -> Iterator[str]:
         """
-        Extract text from a file
+        Stream the text of a file, piece by piece (pages, slides, blocks of rows or lines)
 
         Args:
             file_path: Path to the file
-            file_type: File extension (pdf, docx, txt, etc.)
+            file_type: File extension (one of SUPPORTED_TYPES)
 
         Returns:
-            Extracted text content
+            Generator of text pieces, read from the file as it is consumed
         """
-        try:
-            if file_type == "pdf":
-                return self._extract_pdf(file_path)
-            elif file_type == "docx":
-                return self._extract_docx(file_path)
-            elif file_type == "txt":
-                return self._extract_txt(file_path)
-            else:
-                raise ValueError(f"Unsupported file type: {file_type}")
-        except Exception as e:
-            logger.error(f"Error extracting text from {file_path}: {e}")
-            raise
-
-    def _extract_pdf(self, file_path: str) -> str:
-        """Extract text from PDF"""
-        text = ""
-        try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-            logger.info(f"Extracted text from PDF: {len(text)} characters")
-            return text.strip()
-        except Exception as e:
-            logger.error(f"Error reading PDF: {e}")
-            raise
-
-    def _extract_docx(self, file_path: str) -> str:
-        """Extract text from DOCX including tables"""
-        try:
-            doc = DocxDocument(file_path)
+        return iter_file_text(file_path, file_type)
 
-            # Extract paragraphs
-            paragraphs = [paragraph.text for paragraph in doc.paragraphs]
+    def iter_document_text(self, file_path: str, file_type: str, content_sha256: Optional[str] = None) -> Iterator[str]:
+        """
+        Stream the text of a file, from the document cache when possible
 
-            # Extract tables
-            table_texts = []
-            for table in doc.tables:
-                for row in table.rows:
-                    row_text = " | ".join([cell.text.strip() for cell in row.cells])
-                    if row_text.strip():  # Only add non-empty rows
-                        table_texts.append(row_text)
+        With the file's content hash, cached text pieces are read instead of
+        extracting the file, and pieces extracted are cached once all were read.
+        """
+        if content_sha256:
+            cached = document_cache.iter_text(content_sha256, file_type, EXTRACTION_VERSION)
+            if cached is not None:
+                return cached
+            return document_cache.store_text(
+                content_sha256, file_type, EXTRACTION_VERSION, self.iter_text(file_path, file_type)
+            )
+        return self.iter_text(file_path, file_type)
 
-            # Combine paragraphs and tables
-            all_text = paragraphs + table_texts
-            text = "\n".join(all_text)
+    def extract_text(self, file_path: str, file_type: str) -> str:
+        """
+        Extract text from a file
 
-            logger.info(f"Extracted text from DOCX: {len(text)} characters ({len(paragraphs)} paragraphs, {len(table_texts)} table rows)")
-            return text.strip()
-        except Exception as e:
-            logger.error(f"Error reading DOCX: {e}")
-            raise
+        Args:
+            file_path: Path to the file
+            file_type: File extension (pdf, docx, txt, etc.)
 
-    def _extract_txt(self, file_path: str) -> str:
-        """Extract text from TXT"""
+        Returns:
+            Extracted text content
+        """
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                text = file.read()
-            logger.info(f"Extracted text from TXT: {len(text)} characters")
-            return text.strip()
+            text = "\n".join(self.iter_text(file_path, file_type)).strip()
+            logger.info(f"Extracted text from {file_type.upper()}: {len(text)} characters")
+            return text
         except Exception as e:
-            logger.error(f"Error reading TXT: {e}")
+            logger.error(f"Error extracting text from {file_path}: {e}")
             raise
 
     def chunk_text(self, text: str) -> List[str]:
@@ -110,63 +91,260 @@ class DocumentService:
             List of text chunks
         """
         try:
-            chunks = self.text_splitter.split_text(text)
+            chunks = self.chunker.split_text(text)
             logger.info(f"Split text into {len(chunks)} chunks")
             return chunks
         except Exception as e:
             logger.error(f"Error chunking text: {e}")
             raise
 
+    def chunk_stream(self, pieces: Iterable[str]) -> Iterator[Chunk]:
+        """
+        Split streamed text into chunks as it arrives
+
+        Returns:
+            Generator of chunks with their offsets in the document text and
+            the index of the piece they start in
+        """
+        return self.chunker.stream(pieces)
+
     def process_document(
         self,
         file_path: str,
-        file_type: str
+        file_type: str,
+        content_sha256: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Process a document: extract text and chunk it
 
+        The text is streamed from the file into the chunker, never held as a
+        whole. With the file's content hash, the result is cached: the same
+        file is then chunked once per chunker configuration, and extracted
+        once.
+
         Args:
             file_path: Path to the file
             file_type: File extension
+            content_sha256: SHA-256 of the file, to use the document cache
 
         Returns:
-            Dict with text, chunks, and metadata
+            Dict with chunks (text, offsets and page), stats and whether they were cached
         """
         try:
-            # Extract text
-            text = self.extract_text(file_path, file_type)
-
-            if not text:
+            if content_sha256:
+                cached = document_cache.get_chunks(content_sha256, file_type, self.chunker.key)
+                if cached is not None:
+                    stats, chunks = cached
+                    logger.info(f"Document {content_sha256[:12]} found in cache: {len(chunks)} chunks")
+                    return {"chunks": chunks, **stats, "cached": True}
+
+            total_chars = 0
+            total_tokens = 0
+
+            def pieces() -> Iterator[str]:
+                nonlocal total_chars, total_tokens
+                for piece in self.iter_document_text(file_path, file_type, content_sha256):
+                    total_chars += len(piece)
+                    total_tokens += count_tokens(piece)
+                    yield piece
+
+            chunks = list(self.chunk_stream(pieces()))
+
+            if not chunks:
                 raise ValueError("No text extracted from document")
 
-            # Chunk text
-            chunks = self.chunk_text(text)
-
             # Calculate stats
-            total_chars = len(text)
-            avg_chunk_size = total_chars / len(chunks) if chunks else 0
+            avg_chunk_size = sum(len(chunk.text) for chunk in chunks) / len(chunks)
 
-            result = {
-                "text": text,
-                "chunks": chunks,
+            stats = {
                 "num_chunks": len(chunks),
                 "total_chars": total_chars,
+                "total_tokens": total_tokens,
                 "avg_chunk_size": int(avg_chunk_size),
             }
+            if content_sha256:
+                document_cache.put_chunks(content_sha256, file_type, self.chunker.key, stats, chunks)
 
             logger.info(f"Document processed: {len(chunks)} chunks from {total_chars} characters")
-            return result
+            return {"chunks": chunks, **stats, "cached": False}
 
         except Exception as e:
             logger.error(f"Error processing document: {e}")
             raise
 
-    def save_uploaded_file(self, file_content: bytes, filename: str, agent_id: str) -> str:
+    def shard_document(
+        self,
+        file_path: str,
+        file_type: str,
+        filename: str,
+        max_bytes: int,
+        content_sha256: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Split the text of a document into text files of at most max_bytes
+
+        Shards are cut on the chunker's separators (paragraphs, then lines,
+        then sentences), without overlap. Each starts with a line naming the
+        document and its part, so a retrieved shard can be traced back.
+
+        Args:
+            file_path: Path to the file
+            file_type: File extension (one of SUPPORTED_TYPES)
+            filename: Original filename, used to name the shards
+            max_bytes: Max size of a shard file
+            content_sha256: SHA-256 of the file, to use the document cache
+
+        Returns:
+            List of dicts with filename, content (UTF-8 bytes), size,
+            content_sha256 and the start/end offsets in the document text
+
+        Raises:
+            ValueError: If no text is extracted from the document
+        """
+        # Room for the header line (filenames are up to 255 bytes)
+        header_reserve = min(1024, max_bytes // 4)
+        chunker = TextChunker(
+            chunk_size=max_bytes - header_reserve,
+            chunk_overlap=0,
+            length_function=utf8_length
+        )
+        parts = list(chunker.stream(self.iter_document_text(file_path, file_type, content_sha256), window=4 * max_bytes))
+        if not parts:
+            raise ValueError("No text extracted from document")
+
+        stem = Path(filename).stem
+        shards = []
+        for index, part in enumerate(parts, start=1):
+            shard_filename = f"{stem}.part-{index:02d}-of-{len(parts):02d}.txt"
+            content = f"{filename} - part {index} of {len(parts)}\n\n{part.text}\n".encode("utf-8")
+            shards.append({
+                "filename": shard_filename,
+                "content": content,
+                "size": len(content),
+                "content_sha256": hashlib.sha256(content).hexdigest(),
+                "start_offset": part.start,
+                "end_offset": part.end,
+            })
+
+        logger.info(f"Split {filename} into {len(shards)} shards of up to {max_bytes // 1024}KB")
+        return shards
+
+    def embed_chunks(self, chunks: List[str]) -> np.ndarray:
+        """
+        Embed chunks for vector search, with the configured embedder (EMBEDDING_PROVIDER)
+
+        Batched, and cached on disk by text hash.
+
+        Returns:
+            (len(chunks), EMBEDDING_DIMENSION) array of normalized float32 vectors
+        """
+        return embedding_service.embed_documents(chunks)
+
+    def index_document(self, document_id: str):
+        """
+        Process a stored document and index its chunks for local search (BM25 and vectors)
+
+        Runs as a background task with its own session. Chunks from a
+        previous processing are replaced; the document ends up completed or
+        failed.
+        """
+        db = SessionLocal()
+        try:
+            document = db.get(Document, document_id)
+            if document is None:
+                return
+
+            document.status = "processing"
+            document.error_message = None
+            db.commit()
+
+            try:
+                # Documents stored before their hash was recorded are hashed once
+                metadata = dict(document.file_metadata or {})
+                if not metadata.get("content_sha256"):
+                    metadata["content_sha256"] = hash_file(document.file_path)
+                result = self.process_document(document.file_path, document.file_type, metadata["content_sha256"])
+            except Exception as e:
+                document.status = "failed"
+                document.error_message = str(e)
+                db.commit()
+                return
+
+            db.query(DocumentChunk).filter(DocumentChunk.document_id == document.id).delete(synchronize_session=False)
+            paged = document.file_type in PAGED_TYPES
+            chunks = [
+                DocumentChunk(
+                    document_id=document.id,
+                    agent_id=document.agent_id,
+                    seq=seq,
+                    content=chunk.text,
+                    page=chunk.page if paged else None,
+                    start_offset=chunk.start,
+                    end_offset=chunk.end
+                )
+                for seq, chunk in enumerate(result["chunks"])
+            ]
+            db.add_all(chunks)
+            document.num_chunks = result["num_chunks"]
+            document.total_tokens = result["total_tokens"]
+            metadata["total_chars"] = result["total_chars"]
+            document.file_metadata = metadata
+            document.status = "completed"
+            document.processed_at = datetime.utcnow()
+            # Chunk IDs are assigned on flush; read everything before the commit expires the objects
+            db.flush()
+            agent_id, filename = document.agent_id, document.original_filename
+            rows = [(chunk.id, chunk.content) for chunk in chunks]
+            db.commit()
+
+            search_indexes.update_document(db, agent_id, document_id, rows)
+            logger.info(f"Indexed document {filename}: {len(rows)} chunks")
+
+            try:
+                vectors = self.embed_chunks([content for _, content in rows])
+                vector_indexes.update_document(
+                    db, agent_id, document_id, [chunk_id for chunk_id, _ in rows], vectors
+                )
+            except Exception as e:
+                # Keyword search still works; vectors are retried when the agent's index loads
+                logger.error(f"Could not embed document {filename}: {e}")
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error indexing document {document_id}: {e}")
+        finally:
+            db.close()
+
+    def remove_document(self, db: Session, document: Document):
+        """Delete a document, its chunks, shards and file, and drop it from the search index"""
+        agent_id, document_id, file_path = document.agent_id, document.id, document.file_path
+        db.query(DocumentChunk).filter(DocumentChunk.document_id == document_id).delete(synchronize_session=False)
+        db.query(DocumentShard).filter(DocumentShard.document_id == document_id).delete(synchronize_session=False)
+        db.delete(document)
+        db.commit()
+        search_indexes.remove_document(db, agent_id, document_id)
+        vector_indexes.remove_document(db, agent_id, document_id)
+        self.delete_file(file_path)
+
+    def remove_documents(self, document_ids: List[str]):
+        """
+        Delete documents by ID in a session of their own (blocking, run it in a threadpool)
+        """
+        db = SessionLocal()
+        try:
+            for document_id in document_ids:
+                document = db.get(Document, document_id)
+                if document is not None:
+                    self.remove_document(db, document)
+        finally:
+            db.close()
+
+    def save_uploaded_file(self, file_content: Union[bytes, BinaryIO], filename: str, agent_id: str) -> str:
         """
         Save uploaded file to disk
 
         Args:
-            file_content: File bytes
+            file_content: File bytes, or a file object copied in chunks
             filename: Original filename
             agent_id: Agent ID for organization
 
@@ -181,7 +359,10 @@ class DocumentService:
             # Save file
             file_path = agent_dir / filename
             with open(file_path, 'wb') as f:
-                f.write(file_content)
+                if isinstance(file_content, bytes):
+                    f.write(file_content)
+                else:
+                    shutil.copyfileobj(file_content, f)
 
             logger.info(f"File saved: {file_path}")
             return str(file_path)
@@ -8,6 +8,8 @@ from loguru import logger
 from fastapi import UploadFile
 
 from app.core.config import settings
+from app.core.http_client import get_http_client
+from app.core.uploads import open_upload_stream
 
 
 class ElevenLabsService:
@@ -20,6 +22,10 @@ class ElevenLabsService:
 
         self.base_url = "https://api.elevenlabs.io/v1"
 
+    def client(self) -> httpx.AsyncClient:
+        """Get the shared pooled HTTP client (do not close it)"""
+        return get_http_client()
+
     @property
     def headers(self):
         """Get headers with current API key"""
@@ -38,42 +44,43 @@ class ElevenLabsService:
         all_voices = []
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    "https://api.elevenlabs.io/v2/voices",
-                    headers={"xi-api-key": self.api_key}
-                )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    api_voices = data.get("voices", [])
-
-                    # Transform API voices to our format
-                    for voice in api_voices:
-                        labels = voice.get("labels", {})
-
-                        # Extract language and accent
-                        language = self._extract_language(voice)
-                        accent = labels.get("accent", "")
-
-                        transformed_voice = {
-                            "id": voice.get("voice_id"),
-                            "name": voice.get("name"),
-                            "provider": "11labs",
-                            "language": language,
-                            "gender": labels.get("gender", self._detect_gender_from_description(voice.get("description", ""))),
-                            "accent": accent,
-                            "age": self._estimate_age(labels, voice.get("description", "")),
-                            "description": voice.get("description", ""),
-                            "use_case": labels.get("use case", labels.get("use_case", "")),
-                            "category": voice.get("category", "premade"),
-                            "previewUrl": voice.get("preview_url", ""),
-                        }
-                        all_voices.append(transformed_voice)
-
-                    logger.info(f"Fetched {len(all_voices)} voices from ElevenLabs API v2")
-                else:
-                    logger.error(f"ElevenLabs API returned {response.status_code}: {response.text}")
+            client = self.client()
+            response = await client.get(
+                "https://api.elevenlabs.io/v2/voices",
+                headers={"xi-api-key": self.api_key},
+                timeout=30.0
+            )
+
+            if response.status_code == 200:
+                data = response.json()
+                api_voices = data.get("voices", [])
+
+                # Transform API voices to our format
+                for voice in api_voices:
+                    labels = voice.get("labels", {})
+
+                    # Extract language and accent
+                    language = self._extract_language(voice)
+                    accent = labels.get("accent", "")
+
+                    transformed_voice = {
+                        "id": voice.get("voice_id"),
+                        "name": voice.get("name"),
+                        "provider": "11labs",
+                        "language": language,
+                        "gender": labels.get("gender", self._detect_gender_from_description(voice.get("description", ""))),
+                        "accent": accent,
+                        "age": self._estimate_age(labels, voice.get("description", "")),
+                        "description": voice.get("description", ""),
+                        "use_case": labels.get("use case", labels.get("use_case", "")),
+                        "category": voice.get("category", "premade"),
+                        "previewUrl": voice.get("preview_url", ""),
+                    }
+                    all_voices.append(transformed_voice)
+
+                logger.info(f"Fetched {len(all_voices)} voices from ElevenLabs API v2")
+            else:
+                logger.error(f"ElevenLabs API returned {response.status_code}: {response.text}")
 
         except Exception as e:
             logger.error(f"Error fetching voices from ElevenLabs API: {str(e)}")
@@ -163,25 +170,26 @@ class ElevenLabsService:
             Audio data as bytes (MP3 format)
         """
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/text-to-speech/{voice_id}",
-                    headers=self.headers,
-                    json={
-                        "text": text,
-                        "model_id": "eleven_multilingual_v2",
-                        "voice_settings": {
-                            "stability": 0.5,
-                            "similarity_boost": 0.75,
-                        }
+            client = self.client()
+            response = await client.post(
+                f"{self.base_url}/text-to-speech/{voice_id}",
+                headers=self.headers,
+                json={
+                    "text": text,
+                    "model_id": "eleven_multilingual_v2",
+                    "voice_settings": {
+                        "stability": 0.5,
+                        "similarity_boost": 0.75,
                     }
-                )
+                },
+                timeout=30.0
+            )
 
-                if response.status_code != 200:
-                    logger.error(f"ElevenLabs TTS error: {response.status_code} - {response.text}")
-                    raise Exception(f"Failed to generate preview: {response.text}")
+            if response.status_code != 200:
+                logger.error(f"ElevenLabs TTS error: {response.status_code} - {response.text}")
+                raise Exception(f"Failed to generate preview: {response.text}")
 
-                return response.content
+            return response.content
 
         except Exception as e:
             logger.error(f"Error generating preview: {str(e)}")
@@ -218,42 +226,41 @@ class ElevenLabsService:
             if labels:
                 form_data["labels"] = str(labels)
 
-            # Prepare files for upload
-            files_data = []
-            for file in files:
-                content = await file.read()
-                files_data.append(
-                    ("files", (file.filename, content, file.content_type))
-                )
+            # Prepare files for upload, streamed from the spooled uploads
+            files_data = [
+                ("files", (file.filename, open_upload_stream(file), file.content_type))
+                for file in files
+            ]
 
             # Remove Content-Type from headers for multipart
             headers = {
                 "xi-api-key": self.api_key
             }
 
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/voices/add",
-                    headers=headers,
-                    data=form_data,
-                    files=files_data
-                )
-
-                if response.status_code not in [200, 201]:
-                    logger.error(f"ElevenLabs clone error: {response.status_code} - {response.text}")
-                    raise Exception(f"Failed to clone voice: {response.text}")
-
-                result = response.json()
-                logger.info(f"Successfully cloned voice: {result.get('voice_id')}")
-
-                return {
-                    "voice_id": result.get("voice_id"),
-                    "name": name,
-                    "provider": "11labs",
-                    "category": "cloned",
-                    "description": description,
-                    "labels": labels,
-                }
+            client = self.client()
+            response = await client.post(
+                f"{self.base_url}/voices/add",
+                headers=headers,
+                data=form_data,
+                files=files_data,
+                timeout=60.0
+            )
+
+            if response.status_code not in [200, 201]:
+                logger.error(f"ElevenLabs clone error: {response.status_code} - {response.text}")
+                raise Exception(f"Failed to clone voice: {response.text}")
+
+            result = response.json()
+            logger.info(f"Successfully cloned voice: {result.get('voice_id')}")
+
+            return {
+                "voice_id": result.get("voice_id"),
+                "name": name,
+                "provider": "11labs",
+                "category": "cloned",
+                "description": description,
+                "labels": labels,
+            }
 
         except Exception as e:
             logger.error(f"Error cloning voice: {str(e)}")
@@ -270,18 +277,19 @@ class ElevenLabsService:
             True if successful
         """
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.delete(
-                    f"{self.base_url}/voices/{voice_id}",
-                    headers=self.headers
-                )
+            client = self.client()
+            response = await client.delete(
+                f"{self.base_url}/voices/{voice_id}",
+                headers=self.headers,
+                timeout=30.0
+            )
 
-                if response.status_code not in [200, 204]:
-                    logger.error(f"ElevenLabs delete error: {response.status_code} - {response.text}")
-                    return False
+            if response.status_code not in [200, 204]:
+                logger.error(f"ElevenLabs delete error: {response.status_code} - {response.text}")
+                return False
 
-                logger.info(f"Successfully deleted voice: {voice_id}")
-                return True
+            logger.info(f"Successfully deleted voice: {voice_id}")
+            return True
 
         except Exception as e:
             logger.error(f"Error deleting voice: {str(e)}")
@@ -298,17 +306,18 @@ class ElevenLabsService:
             Voice settings object
         """
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    f"{self.base_url}/voices/{voice_id}/settings",
-                    headers=self.headers
-                )
-
-                if response.status_code != 200:
-                    logger.error(f"ElevenLabs settings error: {response.status_code}")
-                    return {}
-
-                return response.json()
+            client = self.client()
+            response = await client.get(
+                f"{self.base_url}/voices/{voice_id}/settings",
+                headers=self.headers,
+                timeout=30.0
+            )
+
+            if response.status_code != 200:
+                logger.error(f"ElevenLabs settings error: {response.status_code}")
+                return {}
+
+            return response.json()
 
         except Exception as e:
             logger.error(f"Error fetching voice settings: {str(e)}")
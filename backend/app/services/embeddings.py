@@ -0,0 +1,271 @@
+"""
+Embeddings - Pluggable text embedders with a persistent cache
+
+Providers (EMBEDDING_PROVIDER):
+- hashing: deterministic feature hashing of the search index terms, local
+  and offline (no model, no API key)
+- openai / voyage: embeddings API, called in batches of EMBEDDING_BATCH_SIZE
+
+Every vector is L2-normalized float32, so a dot product is a cosine
+similarity. Document embeddings are cached on disk (SQLite) by provider,
+model and SHA-256 of the text: re-indexing a document, or indexing the
+same document for another agent, doesn't embed it again.
+"""
+
+from typing import Dict, List, Optional, Sequence
+from abc import ABC, abstractmethod
+from collections import Counter
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import zlib
+
+import httpx
+import numpy as np
+from loguru import logger
+
+from app.core.config import settings
+from app.services.search_index import tokenize
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row in place (zero rows are left as is)"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors /= norms
+    return vectors
+
+
+class Embedder(ABC):
+    """Turns texts into normalized float32 vectors"""
+
+    name = "embedder"
+
+    def __init__(self, dimension: int, model: str = ""):
+        self.dimension = dimension
+        self.model = model
+
+    @property
+    def key(self) -> str:
+        """Identifies the vector space (cache entries and index files are kept apart)"""
+        return f"{self.name}-{self.model}-{self.dimension}" if self.model else f"{self.name}-{self.dimension}"
+
+    @abstractmethod
+    def embed(self, texts: List[str], input_type: str = "document") -> np.ndarray:
+        """
+        Embed a batch of texts
+
+        Args:
+            texts: Texts to embed
+            input_type: "document" for indexed chunks, "query" for searches
+
+        Returns:
+            (len(texts), dimension) float32 array of normalized vectors
+        """
+
+
+class HashingEmbedder(Embedder):
+    """
+    Feature hashing of terms and term bigrams into a fixed number of dimensions
+
+    Deterministic across processes and machines (CRC32, not hash()), so
+    vectors can be cached and stored. Captures lexical overlap only.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dimension: int):
+        super().__init__(dimension)
+        self._buckets: Dict[str, int] = {}
+
+    def _bucket(self, feature: str) -> int:
+        """Signed bucket of a feature: index + 1, negated for half of the hashes"""
+        bucket = self._buckets.get(feature)
+        if bucket is None:
+            digest = zlib.crc32(feature.encode())
+            bucket = digest % self.dimension + 1
+            if (digest >> 31) & 1:
+                bucket = -bucket
+            if len(self._buckets) < 500_000:
+                self._buckets[feature] = bucket
+        return bucket
+
+    def embed(self, texts: List[str], input_type: str = "document") -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            terms = tokenize(text)
+            features = Counter(terms)
+            features.update(f"{a} {b}" for a, b in zip(terms, terms[1:]))
+            for feature, count in features.items():
+                bucket = self._bucket(feature)
+                weight = 1.0 + math.log(count)
+                if bucket > 0:
+                    vectors[row, bucket - 1] += weight
+                else:
+                    vectors[row, -bucket - 1] -= weight
+        return normalize_rows(vectors)
+
+
+class APIEmbedder(Embedder):
+    """Embeddings API with the OpenAI request format (OpenAI, Voyage)"""
+
+    def __init__(self, name: str, url: str, api_key: str, model: str, dimension: int):
+        super().__init__(dimension, model)
+        self.name = name
+        self.url = url
+        self.api_key = api_key
+        # Called from worker threads: a sync client, separate from the shared async one
+        self._client = httpx.Client(timeout=settings.HTTP_TIMEOUT)
+
+    def _payload(self, texts: List[str], input_type: str) -> Dict:
+        payload = {"model": self.model, "input": texts}
+        if self.name == "openai" and self.model.startswith("text-embedding-3"):
+            payload["dimensions"] = self.dimension
+        if self.name == "voyage":
+            payload["input_type"] = input_type
+        return payload
+
+    def embed(self, texts: List[str], input_type: str = "document") -> np.ndarray:
+        response = self._client.post(
+            self.url,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json=self._payload(texts, input_type)
+        )
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+
+        vectors = np.array([item["embedding"] for item in data], dtype=np.float32)
+        if vectors.shape != (len(texts), self.dimension):
+            raise ValueError(
+                f"{self.name} returned {vectors.shape} embeddings, expected ({len(texts)}, {self.dimension}): "
+                f"check EMBEDDING_MODEL and EMBEDDING_DIMENSION"
+            )
+        return normalize_rows(vectors)
+
+
+def create_embedder() -> Embedder:
+    """Embedder configured by EMBEDDING_PROVIDER"""
+    provider = settings.EMBEDDING_PROVIDER.lower()
+    if provider == "hashing":
+        return HashingEmbedder(settings.EMBEDDING_DIMENSION)
+    if provider == "openai":
+        return APIEmbedder(
+            "openai", "https://api.openai.com/v1/embeddings",
+            settings.OPENAI_API_KEY, settings.EMBEDDING_MODEL, settings.EMBEDDING_DIMENSION
+        )
+    if provider == "voyage":
+        return APIEmbedder(
+            "voyage", "https://api.voyageai.com/v1/embeddings",
+            settings.VOYAGE_API_KEY, settings.EMBEDDING_MODEL, settings.EMBEDDING_DIMENSION
+        )
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER: {settings.EMBEDDING_PROVIDER}")
+
+
+class EmbeddingCache:
+    """Vectors on disk (SQLite), keyed by embedder and text hash"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread (SQLite connections can't be shared)
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "embedder TEXT NOT NULL, text_sha256 TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (embedder, text_sha256)) WITHOUT ROWID"
+            )
+            self._local.connection = connection
+        return connection
+
+    def get_many(self, embedder: str, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        connection = self._connection()
+        found = {}
+        for start in range(0, len(hashes), 500):
+            batch = list(hashes[start:start + 500])
+            rows = connection.execute(
+                f"SELECT text_sha256, vector FROM embeddings WHERE embedder = ? "
+                f"AND text_sha256 IN ({', '.join('?' * len(batch))})",
+                [embedder, *batch]
+            )
+            for text_hash, vector in rows:
+                found[text_hash] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def put_many(self, embedder: str, vectors: Dict[str, np.ndarray]):
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (embedder, text_sha256, vector) VALUES (?, ?, ?)",
+                [(embedder, text_hash, vector.astype(np.float32).tobytes()) for text_hash, vector in vectors.items()]
+            )
+
+
+class EmbeddingService:
+    """Batched, cached embedding of document chunks and queries"""
+
+    def __init__(self, cache_path: str, batch_size: int):
+        self.cache = EmbeddingCache(cache_path)
+        self.batch_size = batch_size
+        self._embedder: Optional[Embedder] = None
+
+    @property
+    def embedder(self) -> Embedder:
+        if self._embedder is None:
+            self._embedder = create_embedder()
+        return self._embedder
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed document chunks (blocking)
+
+        Cached vectors are reused; the others are embedded in batches and
+        added to the cache. Identical texts are embedded once.
+
+        Returns:
+            (len(texts), dimension) float32 array, in the order of texts
+        """
+        embedder = self.embedder
+        vectors = np.zeros((len(texts), embedder.dimension), dtype=np.float32)
+        if not texts:
+            return vectors
+
+        hashes = [hashlib.sha256(text.encode()).hexdigest() for text in texts]
+        cached = self.cache.get_many(embedder.key, list(set(hashes)))
+
+        missing: Dict[str, str] = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in cached:
+                missing[text_hash] = text
+
+        if missing:
+            missing_hashes = list(missing)
+            for start in range(0, len(missing_hashes), self.batch_size):
+                batch = missing_hashes[start:start + self.batch_size]
+                embedded = embedder.embed([missing[text_hash] for text_hash in batch])
+                new_vectors = dict(zip(batch, embedded))
+                self.cache.put_many(embedder.key, new_vectors)
+                cached.update(new_vectors)
+            logger.info(f"Embedded {len(missing)} chunks with {embedder.key} ({len(texts) - len(missing)} cached)")
+
+        for row, text_hash in enumerate(hashes):
+            vectors[row] = cached[text_hash]
+        return vectors
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed a search query (not cached)"""
+        return self.embedder.embed([text], input_type="query")[0]
+
+
+# Global instance
+embedding_service = EmbeddingService(
+    cache_path=os.path.join(settings.VECTOR_INDEX_DIR, "embeddings.sqlite3"),
+    batch_size=settings.EMBEDDING_BATCH_SIZE,
+)
@@ -4,18 +4,206 @@ Handles Google Calendar API integration
 """
 
 import logging
-from typing import Optional, Dict, Any
-from datetime import datetime, timedelta
+import threading
+import time as time_module
+from typing import Optional, Dict, Any, Callable, TypeVar, NamedTuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+import httplib2
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
 from googleapiclient.errors import HttpError
+from sqlalchemy import text
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
+from app.core.config import settings
+from app.core.database import SessionLocal
 from app.models.oauth_credential import OAuthCredential
+from app.services.calendar_availability import busy_intervals
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Discovery document bundled with google-api-python-client, read once
+_discovery_document: Optional[str] = None
+
+
+def get_discovery_document() -> str:
+    """Get the Calendar v3 discovery document without any network call"""
+    global _discovery_document
+    if _discovery_document is None:
+        _discovery_document = get_static_doc("calendar", "v3")
+    return _discovery_document
+
+
+class CachedCalendarClient(NamedTuple):
+    credentials: Credentials
+    service: Any
+    expires_at: float
+
+
+class CalendarClientCache:
+    """
+    Built Calendar clients per user, shared by every webhook in the process
+
+    Skips the credential query and the client build on each tool call.
+    Entries expire after GOOGLE_CALENDAR_CLIENT_TTL_SECONDS so a disconnect
+    made in another worker is eventually picked up. Requests are executed
+    with a per-thread HTTP connection (httplib2 is not thread-safe), which
+    also keeps the TLS connection to Google alive between calls.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._clients: Dict[str, CachedCalendarClient] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def get(self, user_id: str) -> Optional[CachedCalendarClient]:
+        """Get a usable client (None if missing, stale or its token expired)"""
+        with self._lock:
+            client = self._clients.get(user_id)
+            if client is None:
+                return None
+            if client.expires_at <= time_module.monotonic() or client.credentials.expired:
+                del self._clients[user_id]
+                return None
+            return client
+
+    def set(self, user_id: str, credentials: Credentials, service: Any):
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._clients[user_id] = CachedCalendarClient(
+                credentials, service, time_module.monotonic() + self.ttl_seconds
+            )
+
+    def invalidate(self, user_id: str):
+        """Drop a user's client (credentials refreshed, connected or disconnected)"""
+        with self._lock:
+            self._clients.pop(user_id, None)
+
+    def http_for(self, user_id: str, credentials: Credentials) -> AuthorizedHttp:
+        """Get this thread's authorized connection for a user's credentials"""
+        https = getattr(self._local, "https", None)
+        if https is None:
+            https = self._local.https = {}
+
+        http = https.get(user_id)
+        if http is None or http.credentials is not credentials:
+            http = https[user_id] = AuthorizedHttp(credentials, http=httplib2.Http())
+        return http
+
+
+# Global instance
+calendar_clients = CalendarClientCache(settings.GOOGLE_CALENDAR_CLIENT_TTL_SECONDS)
+
+
+GOOGLE_TOKEN_URI = "https://oauth2.googleapis.com/token"
+
+# One refresh at a time per credential in this process (advisory lock for other workers)
+_refresh_locks: Dict[str, threading.Lock] = {}
+_refresh_locks_guard = threading.Lock()
+
+
+def _as_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """google-auth compares expiry with a naive UTC now"""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(dt_timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def build_google_credentials(oauth_cred: OAuthCredential) -> Credentials:
+    """Build google-auth credentials from a stored OAuth credential"""
+    return Credentials(
+        token=oauth_cred.access_token,
+        refresh_token=oauth_cred.refresh_token,
+        token_uri=GOOGLE_TOKEN_URI,
+        client_id=settings.GOOGLE_CLIENT_ID or None,
+        client_secret=settings.GOOGLE_CLIENT_SECRET or None,
+        scopes=oauth_cred.scopes,
+        expiry=_as_naive_utc(oauth_cred.expires_at)
+    )
+
+
+def _acquire_refresh_advisory_lock(db: Session, credential_id: str, wait: bool) -> bool:
+    """Transaction-level PostgreSQL advisory lock on a credential (no-op on other databases)"""
+    if db.get_bind().dialect.name != "postgresql":
+        return True
+
+    key = {"key": f"oauth_refresh:{credential_id}"}
+    if wait:
+        db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), key)
+        return True
+    return bool(db.execute(text("SELECT pg_try_advisory_xact_lock(hashtext(:key))"), key).scalar())
+
+
+def refresh_oauth_credential(
+    db: Session,
+    credential_id: str,
+    margin_seconds: float = 0,
+    wait: bool = True
+) -> Optional[OAuthCredential]:
+    """
+    Refresh a credential's access token if it expires within margin_seconds
+
+    Single-flight per credential, within the process and across workers: the
+    row is re-read under the lock, so whoever gets it second finds a fresh
+    token and doesn't call Google again.
+
+    Args:
+        db: Database session
+        credential_id: OAuthCredential to refresh
+        margin_seconds: Refresh tokens expiring within this delay
+        wait: Wait for a refresh in progress (False: give up and return None)
+
+    Returns:
+        The up-to-date credential (None if missing, or busy and wait is False)
+    """
+    with _refresh_locks_guard:
+        lock = _refresh_locks.setdefault(credential_id, threading.Lock())
+    if not lock.acquire(blocking=wait):
+        return None
+
+    try:
+        if not _acquire_refresh_advisory_lock(db, credential_id, wait):
+            db.rollback()
+            return None
+
+        oauth_cred = db.get(OAuthCredential, credential_id, populate_existing=True)
+        if oauth_cred is None or not oauth_cred.is_active or not oauth_cred.refresh_token:
+            db.rollback()
+            return oauth_cred
+
+        expires_at = _as_naive_utc(oauth_cred.expires_at)
+        if expires_at is not None and expires_at > datetime.utcnow() + timedelta(seconds=margin_seconds):
+            # Refreshed by someone else meanwhile
+            db.rollback()
+            return oauth_cred
+
+        creds = build_google_credentials(oauth_cred)
+        creds.refresh(Request())
+
+        oauth_cred.access_token = creds.token
+        oauth_cred.expires_at = creds.expiry
+        if creds.refresh_token:
+            oauth_cred.refresh_token = creds.refresh_token
+        db.commit()
+
+        calendar_clients.invalidate(oauth_cred.user_id)
+        logger.info(f"Refreshed Google Calendar token for user {oauth_cred.user_id}")
+        return oauth_cred
+
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        lock.release()
+
 
 class GoogleCalendarService:
     """Service for interacting with Google Calendar API"""
@@ -29,9 +217,14 @@ class GoogleCalendarService:
         self.db = db
         self.user_id = user_id
         self.service = None
+        self.credentials: Optional[Credentials] = None
 
     def get_credentials(self) -> Optional[Credentials]:
         """Get Google OAuth credentials for user"""
+        cached = calendar_clients.get(self.user_id)
+        if cached:
+            return cached.credentials
+
         try:
             oauth_cred = self.db.query(OAuthCredential).filter(
                 OAuthCredential.user_id == self.user_id,
@@ -44,26 +237,14 @@ class GoogleCalendarService:
                 return None
 
             # Create credentials object
-            creds = Credentials(
-                token=oauth_cred.access_token,
-                refresh_token=oauth_cred.refresh_token,
-                token_uri="https://oauth2.googleapis.com/token",
-                client_id=None,  # Will be set from config
-                client_secret=None,  # Will be set from config
-                scopes=oauth_cred.scopes
-            )
+            creds = build_google_credentials(oauth_cred)
 
-            # Refresh token if expired
+            # Tokens are renewed ahead of time by the background refresher; only
+            # one that already expired (e.g. right after startup) is refreshed here
             if creds.expired and creds.refresh_token:
                 try:
-                    creds.refresh(Request())
-
-                    # Update credentials in database
-                    oauth_cred.access_token = creds.token
-                    oauth_cred.expires_at = creds.expiry
-                    self.db.commit()
-
-                    logger.info(f"Refreshed Google Calendar token for user {self.user_id}")
+                    oauth_cred = refresh_oauth_credential(self.db, oauth_cred.id)
+                    creds = build_google_credentials(oauth_cred)
                 except Exception as e:
                     logger.error(f"Error refreshing Google Calendar token: {str(e)}")
                     return None
@@ -79,17 +260,29 @@ class GoogleCalendarService:
         if self.service:
             return self.service
 
+        cached = calendar_clients.get(self.user_id)
+        if cached:
+            self.credentials = cached.credentials
+            self.service = cached.service
+            return self.service
+
         creds = self.get_credentials()
         if not creds:
             raise ValueError("No valid Google Calendar credentials found")
 
         try:
-            self.service = build('calendar', 'v3', credentials=creds)
+            self.service = build_from_document(get_discovery_document(), credentials=creds)
+            self.credentials = creds
+            calendar_clients.set(self.user_id, creds, self.service)
             return self.service
         except Exception as e:
             logger.error(f"Error building Google Calendar service: {str(e)}")
             raise
 
+    def _http(self) -> AuthorizedHttp:
+        """Connection to execute requests with, reused by this worker thread"""
+        return calendar_clients.http_for(self.user_id, self.credentials)
+
     def create_event(
         self,
         client_name: str,
@@ -159,10 +352,16 @@ class GoogleCalendarService:
             created_event = service.events().insert(
                 calendarId='primary',
                 body=event
-            ).execute()
+            ).execute(http=self._http())
 
             logger.info(f"Created calendar event: {created_event.get('id')}")
 
+            # Our own booking is busy time right away, no need to wait for a sync
+            try:
+                busy_intervals.record_event(self.user_id, created_event)
+            except Exception as e:
+                logger.warning(f"Could not record created event as busy: {str(e)}")
+
             return {
                 'success': True,
                 'event_id': created_event.get('id'),
@@ -205,6 +404,21 @@ class GoogleCalendarService:
             start_datetime = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
             end_datetime = start_datetime + timedelta(minutes=duration)
 
+            # Answer from the cached busy intervals when the slot is in their window
+            if busy_intervals.enabled:
+                try:
+                    is_busy = busy_intervals.is_busy(
+                        self.user_id,
+                        service,
+                        self._http(),
+                        start_datetime.replace(tzinfo=dt_timezone.utc),
+                        end_datetime.replace(tzinfo=dt_timezone.utc)
+                    )
+                    if is_busy is not None:
+                        return not is_busy
+                except Exception as e:
+                    logger.warning(f"Busy interval cache unavailable, querying events: {str(e)}")
+
             # Query for events in this time range
             events_result = service.events().list(
                 calendarId='primary',
@@ -212,7 +426,7 @@ class GoogleCalendarService:
                 timeMax=end_datetime.isoformat() + 'Z',
                 singleEvents=True,
                 orderBy='startTime'
-            ).execute()
+            ).execute(http=self._http())
 
             events = events_result.get('items', [])
 
@@ -243,7 +457,7 @@ class GoogleCalendarService:
                 maxResults=max_results,
                 singleEvents=True,
                 orderBy='startTime'
-            ).execute()
+            ).execute(http=self._http())
 
             events = events_result.get('items', [])
 
@@ -261,3 +475,27 @@ class GoogleCalendarService:
         except Exception as e:
             logger.error(f"Error listing events: {str(e)}")
             return []
+
+
+async def run_calendar_operation(user_id: str, operation: Callable[[GoogleCalendarService], T]) -> T:
+    """
+    Run a Google Calendar operation without blocking the event loop
+
+    The Google API client and the credential refresh are synchronous, so the
+    operation runs in a worker thread with its own database session.
+
+    Args:
+        user_id: User whose Google credentials are used
+        operation: Function receiving a GoogleCalendarService
+
+    Returns:
+        The operation's result
+    """
+    def run() -> T:
+        db = SessionLocal()
+        try:
+            return operation(GoogleCalendarService(db, user_id))
+        finally:
+            db.close()
+
+    return await run_in_threadpool(run)
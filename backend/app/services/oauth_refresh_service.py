@@ -0,0 +1,110 @@
+"""
+OAuth Refresh Service - Renews Google tokens before they expire
+
+Webhooks run while a caller is on the line, so they should never wait for a
+token refresh. This job renews every active Google Calendar credential
+expiring within GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS. Refreshes are
+single-flight per credential, across workers too (see
+refresh_oauth_credential).
+"""
+
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+import asyncio
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+from loguru import logger
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, SessionLocal
+from app.models.oauth_credential import OAuthCredential
+from app.services.google_calendar_service import refresh_oauth_credential
+
+# Parallel refreshes per run (each one is a blocking call to Google in a thread)
+REFRESH_CONCURRENCY = 4
+
+
+class OAuthRefreshService:
+    """Background renewal of Google Calendar access tokens"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def get_due_credentials(self) -> List[str]:
+        """IDs of active credentials expiring within the refresh margin"""
+        threshold = datetime.now(timezone.utc) + timedelta(seconds=settings.GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS)
+
+        async with AsyncSessionLocal() as db:
+            return list(await db.scalars(
+                select(OAuthCredential.id).where(
+                    OAuthCredential.service == "google_calendar",
+                    OAuthCredential.is_active == True,
+                    OAuthCredential.refresh_token.isnot(None),
+                    OAuthCredential.expires_at.isnot(None),
+                    OAuthCredential.expires_at < threshold
+                )
+            ))
+
+    @staticmethod
+    def _refresh(credential_id: str) -> bool:
+        db = SessionLocal()
+        try:
+            # Don't wait on a refresh already running elsewhere, it covers this one
+            return refresh_oauth_credential(
+                db,
+                credential_id,
+                margin_seconds=settings.GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS,
+                wait=False
+            ) is not None
+        finally:
+            db.close()
+
+    async def refresh_due(self) -> int:
+        """Refresh every credential about to expire, returns how many were handled"""
+        credential_ids = await self.get_due_credentials()
+        if not credential_ids:
+            return 0
+
+        semaphore = asyncio.Semaphore(REFRESH_CONCURRENCY)
+
+        async def refresh(credential_id: str) -> bool:
+            async with semaphore:
+                try:
+                    return await run_in_threadpool(self._refresh, credential_id)
+                except Exception as e:
+                    logger.error(f"Could not refresh OAuth credential {credential_id}: {e}")
+                    return False
+
+        results = await asyncio.gather(*(refresh(credential_id) for credential_id in credential_ids))
+        return sum(results)
+
+    async def _run(self):
+        """Background loop refreshing tokens periodically"""
+        while True:
+            try:
+                await self.refresh_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"OAuth refresh job failed: {e}")
+            await asyncio.sleep(settings.GOOGLE_TOKEN_REFRESH_INTERVAL_SECONDS)
+
+    def start(self):
+        """Start the background refresh job (called on application startup)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"OAuth refresh job started (every {settings.GOOGLE_TOKEN_REFRESH_INTERVAL_SECONDS}s)")
+
+    async def stop(self):
+        """Stop the background refresh job (called on shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global instance
+oauth_refresh_service = OAuthRefreshService()
@@ -0,0 +1,157 @@
+"""
+PDF Extraction - Page-sharded, parallel text extraction
+
+PyPDF2 text extraction is pure-Python and CPU-bound, so large documents are
+split into page ranges and extracted in a process pool. Page texts are
+streamed back in order as a generator, and callers join them once.
+
+Every worker opens the document itself (xref table and page tree) and only
+parses the content streams of its page range. A worker keeps its last
+document open, so the shards of a document it handles in a row share one
+reader: a document is opened at most once per worker, not once per shard.
+
+A document that exceeds its timeout recycles the pool: the workers are
+terminated, so shards already running don't keep them busy. Shards of
+other documents caught by the recycle are resubmitted to the new pool.
+"""
+
+from typing import Any, Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, Future, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import io
+import multiprocessing
+import os
+import threading
+import time
+
+import PyPDF2
+from loguru import logger
+
+from app.core.config import settings
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+# In a pool worker: ((path, mtime, size), reader) of the last document opened
+_worker_reader: Optional[Tuple[Tuple[str, int, int], Any]] = None
+
+
+def get_pdf_pool() -> ProcessPoolExecutor:
+    """Get the shared extraction pool, started on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs an event loop and threads is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PDF_EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"PDF extraction pool started ({settings.PDF_EXTRACTION_WORKERS} workers)")
+        return _pool
+
+
+def recycle_pdf_pool(pool: ProcessPoolExecutor):
+    """Terminate a pool's workers, running shards included; the next use starts a new pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    for process in list((pool._processes or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+    logger.warning("PDF extraction pool recycled")
+
+
+def shutdown_pdf_pool():
+    """Stop the extraction pool (called on shutdown)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def count_pdf_pages(file_path: str) -> int:
+    with open(file_path, "rb") as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def extract_page_range(file_path: str, start: int, end: int) -> List[str]:
+    """Extract the text of pages [start, end) (runs in a pool worker)"""
+    global _worker_reader
+    stat = os.stat(file_path)
+    key = (file_path, stat.st_mtime_ns, stat.st_size)
+    if _worker_reader is None or _worker_reader[0] != key:
+        # Replaces the previous document's reader
+        _worker_reader = None
+        with open(file_path, "rb") as file:
+            _worker_reader = (key, PyPDF2.PdfReader(io.BytesIO(file.read())))
+    reader = _worker_reader[1]
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def iter_pdf_pages(
+    file_path: str,
+    timeout: Optional[float] = None,
+    pages_per_shard: Optional[int] = None
+) -> Iterator[str]:
+    """
+    Stream the text of each page of a PDF, in page order
+
+    Documents over one shard are split into page ranges extracted in the
+    process pool; smaller ones (or all of them with PDF_EXTRACTION_WORKERS=1)
+    are read on the calling thread.
+
+    Args:
+        file_path: Path to the PDF
+        timeout: Seconds allowed for the whole document (PDF_EXTRACTION_TIMEOUT_SECONDS)
+        pages_per_shard: Pages per pool task (PDF_PAGES_PER_SHARD)
+
+    Raises:
+        TimeoutError: If the document takes longer than the timeout
+    """
+    timeout = settings.PDF_EXTRACTION_TIMEOUT_SECONDS if timeout is None else timeout
+    pages_per_shard = pages_per_shard or settings.PDF_PAGES_PER_SHARD
+    deadline = time.monotonic() + timeout
+
+    page_count = count_pdf_pages(file_path)
+
+    if settings.PDF_EXTRACTION_WORKERS <= 1 or page_count <= pages_per_shard:
+        with open(file_path, "rb") as file:
+            reader = PyPDF2.PdfReader(file)
+            for page in reader.pages:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"PDF extraction exceeded {timeout}s")
+                yield page.extract_text() or ""
+        return
+
+    ranges = [(start, min(start + pages_per_shard, page_count)) for start in range(0, page_count, pages_per_shard)]
+    pool = get_pdf_pool()
+    futures: List[Future] = [pool.submit(extract_page_range, file_path, start, end) for start, end in ranges]
+
+    try:
+        for i, (start, end) in enumerate(ranges):
+            try:
+                try:
+                    pages = futures[i].result(timeout=max(0.0, deadline - time.monotonic()))
+                except BrokenProcessPool:
+                    # Recycled for another document (or a worker died): resubmit the remaining shards once
+                    recycle_pdf_pool(pool)
+                    pool = get_pdf_pool()
+                    futures[i:] = [pool.submit(extract_page_range, file_path, *shard) for shard in ranges[i:]]
+                    pages = futures[i].result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                # Kill the running shards instead of letting them hold the workers
+                recycle_pdf_pool(pool)
+                raise TimeoutError(f"PDF extraction exceeded {timeout}s")
+            yield from pages
+    finally:
+        # Pending shards are dropped (the caller stopped reading or failed)
+        for future in futures:
+            future.cancel()
+
+
+def extract_pdf_text(file_path: str, timeout: Optional[float] = None) -> str:
+    """Extract the text of a PDF, pages separated by newlines"""
+    return "\n".join(iter_pdf_pages(file_path, timeout=timeout)).strip()
@@ -0,0 +1,660 @@
+"""
+Search Index - Local BM25 retrieval over agent documents
+
+Document chunks are stored in the document_chunks table. Each agent's chunks
+are loaded into an in-memory inverted index when it is first searched, then
+kept up to date as documents are indexed or removed. Postings are NumPy arrays, so a
+query scores all the chunks containing a term in one vector operation instead
+of a Python loop per posting.
+
+Indexes live in each process, built in background threads: changes made
+by another worker are applied within SEARCH_INDEX_MAX_STALENESS_SECONDS.
+"""
+
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Set, Tuple
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import math
+import re
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.document import Document, DocumentChunk
+
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Accented letters folded to ASCII, so "réservation" matches "reservation"
+ACCENT_FOLDING = str.maketrans({
+    **dict.fromkeys("àáâãäå", "a"),
+    **dict.fromkeys("èéêë", "e"),
+    **dict.fromkeys("ìíîï", "i"),
+    **dict.fromkeys("òóôõö", "o"),
+    **dict.fromkeys("ùúûü", "u"),
+    **dict.fromkeys("ýÿ", "y"),
+    "ç": "c",
+    "ñ": "n",
+    "œ": "oe",
+    "æ": "ae",
+    "ß": "ss",
+})
+
+# French and English stopwords, accent-folded (elided articles like l' or qu'
+# are split off by the tokenizer and dropped here)
+STOPWORDS = frozenset("""
+a about after all also am an and any are as at be been being but by can could did do does
+for from had has have he her his how i if in into is it its just me more my no not of on
+only or our out over she so than that the their them then there these they this those to
+too up us was we were what when where which while who why will with would you your
+ai au aux avec avez avoir avons c ca ce ces cet cette d dans de des du elle elles en est et
+ete etre eu eux il ils j je jusqu l la le les leur leurs lorsqu lui m ma mais me meme mes
+moi mon n ne nos notre nous on ont ou par pas peu plus pour qu que quel quelle qui s sa sans
+se ses si son sont sur t ta te tes toi ton tu un une vos votre vous y
+""".split())
+
+# Token -> term memo, bounded so unusual corpora can't grow it forever
+MAX_CACHED_TERMS = 200_000
+_terms: Dict[str, str] = {}
+
+
+def _normalize(token: str) -> str:
+    """Index term of a lowercased, folded token ("" to drop it)"""
+    if token in STOPWORDS or (len(token) == 1 and not token.isdigit()):
+        return ""
+    # Light plural stripping, shared by French and English
+    # (reservations -> reservation, prix -> pri, but not status or class)
+    if len(token) > 3 and token[-1] in "sx" and token[-2] not in "su":
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a text into index terms
+
+    Lowercased and accent-folded words, without French/English stopwords and
+    with plurals stripped. Used for both chunks and queries.
+    """
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower().translate(ACCENT_FOLDING)):
+        term = _terms.get(token)
+        if term is None:
+            term = _normalize(token)
+            if len(_terms) < MAX_CACHED_TERMS:
+                _terms[token] = term
+        if term:
+            terms.append(term)
+    return terms
+
+
+def _grow(array: np.ndarray, needed: int) -> np.ndarray:
+    """Return an array with room for `needed` items (capacity doubled), same contents"""
+    if needed <= len(array):
+        return array
+    grown = np.zeros(max(needed, 2 * len(array)), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class _Postings:
+    """Chunk slots containing a term, with the term frequency in each"""
+    __slots__ = ("slots", "tfs", "size")
+
+    def __init__(self):
+        self.slots = np.zeros(4, dtype=np.int32)
+        self.tfs = np.zeros(4, dtype=np.float32)
+        self.size = 0
+
+    def extend(self, slots: Sequence[int], tfs: Sequence[int]):
+        end = self.size + len(slots)
+        self.slots = _grow(self.slots, end)
+        self.tfs = _grow(self.tfs, end)
+        self.slots[self.size:end] = slots
+        self.tfs[self.size:end] = tfs
+        self.size = end
+
+
+class BM25Index:
+    """
+    Inverted index of text chunks scored with Okapi BM25
+
+    Chunks are stored in slots. Removing a document only marks its slots
+    dead; they are compacted away once they make up a quarter of the index.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.Lock()
+        self._postings: Dict[str, _Postings] = {}
+        self._chunk_ids = np.zeros(1024, dtype=np.int64)
+        self._lengths = np.zeros(1024, dtype=np.float32)
+        self._alive = np.zeros(1024, dtype=bool)
+        self._slot_documents: List[str] = []
+        self._documents: Dict[str, List[int]] = {}
+        self._size = 0
+        self._live = 0
+        self._total_length = 0.0
+        self._norm: Optional[np.ndarray] = None  # Length normalization per slot
+
+    def __len__(self) -> int:
+        """Number of live chunks"""
+        return self._live
+
+    @property
+    def documents(self) -> Set[str]:
+        """IDs of the indexed documents"""
+        with self.lock:
+            return set(self._documents)
+
+    def add(self, document_id: str, chunks: Iterable[Tuple[int, str]]) -> int:
+        """Add (or replace) a document's chunks, given as (chunk_id, text)"""
+        return self.add_many((chunk_id, document_id, text) for chunk_id, text in chunks)
+
+    def add_many(self, rows: Iterable[Tuple[int, str, str]]) -> int:
+        """
+        Add chunks given as (chunk_id, document_id, text)
+
+        Documents already in the index are replaced. Terms are counted
+        outside the lock, and each term's postings are extended once.
+
+        Returns:
+            Number of chunks added
+        """
+        chunk_ids: List[int] = []
+        documents: List[str] = []
+        lengths: List[int] = []
+        batch: Dict[str, Tuple[List[int], List[int]]] = {}
+
+        for chunk_id, document_id, text in rows:
+            offset = len(chunk_ids)
+            terms = tokenize(text)
+            for term, tf in Counter(terms).items():
+                entry = batch.get(term)
+                if entry is None:
+                    entry = batch[term] = ([], [])
+                entry[0].append(offset)
+                entry[1].append(tf)
+            chunk_ids.append(chunk_id)
+            documents.append(document_id)
+            lengths.append(len(terms))
+
+        if not chunk_ids:
+            return 0
+
+        with self.lock:
+            for document_id in set(documents):
+                self._remove(document_id)
+
+            base = self._size
+            end = base + len(chunk_ids)
+            self._chunk_ids = _grow(self._chunk_ids, end)
+            self._lengths = _grow(self._lengths, end)
+            self._alive = _grow(self._alive, end)
+            self._chunk_ids[base:end] = chunk_ids
+            self._lengths[base:end] = lengths
+            self._alive[base:end] = True
+
+            for term, (offsets, tfs) in batch.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = _Postings()
+                postings.extend(np.asarray(offsets, dtype=np.int32) + base, tfs)
+
+            for slot, document_id in enumerate(documents, start=base):
+                self._documents.setdefault(document_id, []).append(slot)
+            self._slot_documents.extend(documents)
+
+            self._size = end
+            self._live += len(chunk_ids)
+            self._total_length += sum(lengths)
+            self._norm = None
+
+        return len(chunk_ids)
+
+    def remove(self, document_id: str) -> int:
+        """Remove a document's chunks, returns how many were removed"""
+        with self.lock:
+            removed = self._remove(document_id)
+            if self._size - self._live > max(1024, self._size // 4):
+                self._compact()
+            return removed
+
+    def _remove(self, document_id: str) -> int:
+        slots = self._documents.pop(document_id, None)
+        if not slots:
+            return 0
+        self._alive[slots] = False
+        self._live -= len(slots)
+        self._total_length -= float(self._lengths[slots].sum())
+        self._norm = None
+        return len(slots)
+
+    def _compact(self):
+        """Drop dead slots and renumber the live ones"""
+        keep = self._alive[:self._size]
+        remap = (np.cumsum(keep) - 1).astype(np.int32)
+
+        for term in list(self._postings):
+            postings = self._postings[term]
+            slots = postings.slots[:postings.size]
+            live = keep[slots]
+            if not live.any():
+                del self._postings[term]
+                continue
+            postings.slots = remap[slots[live]]
+            postings.tfs = postings.tfs[:postings.size][live]
+            postings.size = len(postings.slots)
+
+        self._chunk_ids = self._chunk_ids[:self._size][keep]
+        self._lengths = self._lengths[:self._size][keep]
+        self._alive = np.ones(self._live, dtype=bool)
+        self._slot_documents = [
+            document_id for document_id, alive in zip(self._slot_documents, keep) if alive
+        ]
+        self._documents = {}
+        for slot, document_id in enumerate(self._slot_documents):
+            self._documents.setdefault(document_id, []).append(slot)
+        self._size = self._live
+        self._norm = None
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        document_ids: Optional[Iterable[str]] = None
+    ) -> List[Tuple[int, str, float]]:
+        """
+        Best chunks for a query
+
+        Args:
+            query: Free text query
+            limit: Max number of results
+            document_ids: Only search these documents
+
+        Returns:
+            (chunk_id, document_id, score) tuples, best first
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self.lock:
+            size = self._size
+            if self._live == 0:
+                return []
+
+            if self._norm is None:
+                average_length = max(self._total_length / self._live, 1.0)
+                self._norm = self.k1 * (1 - self.b + self.b * self._lengths[:size] / average_length)
+            norm = self._norm
+            alive = self._alive[:size]
+            has_dead = self._live < size
+
+            scores = np.zeros(size, dtype=np.float32)
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                slots = postings.slots[:postings.size]
+                tfs = postings.tfs[:postings.size]
+                df = int(np.count_nonzero(alive[slots])) if has_dead else postings.size
+                if df == 0:
+                    continue
+                idf = math.log(1 + (self._live - df + 0.5) / (df + 0.5))
+                # Slots are unique within a term's postings, so += is safe
+                scores[slots] += idf * tfs * (self.k1 + 1) / (tfs + norm[slots])
+
+            if has_dead:
+                scores[~alive] = 0
+            if document_ids is not None:
+                allowed = np.zeros(size, dtype=bool)
+                for document_id in document_ids:
+                    allowed[self._documents.get(document_id, [])] = True
+                scores[~allowed] = 0
+
+            candidates = np.flatnonzero(scores)
+            if len(candidates) > limit:
+                candidates = candidates[np.argpartition(scores[candidates], -limit)[-limit:]]
+            best = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+            return [
+                (int(self._chunk_ids[slot]), self._slot_documents[slot], float(scores[slot]))
+                for slot in best
+            ]
+
+
+class IndexNotReady(Exception):
+    """The agent's index is still being built: retry the search shortly"""
+
+
+class AgentIndexEntry:
+    """Loaded index of one agent, with the chunk table signature it matches"""
+
+    def __init__(self):
+        self.lock = threading.Lock()  # Guards the fields below, held briefly
+        self.write_lock = threading.Lock()  # Serializes changes to the index
+        self.index = None
+        self.signature: Optional[Tuple[int, Optional[int]]] = None  # (chunk count, max chunk id), None: rebuild
+        self.max_chunk_id = 0  # Chunks with a higher ID are applied as a delta
+        self.checked_at = 0.0  # monotonic
+        self.refresh: Optional[Future] = None  # Build or refresh in progress
+
+
+def fetch_chunk_results(db: Session, hits: List[Tuple[int, str, float]]) -> List[Dict[str, Any]]:
+    """Search hits (chunk_id, document_id, score) with their document, position and content"""
+    if not hits:
+        return []
+
+    rows = {
+        row.id: row for row in db.execute(
+            select(
+                DocumentChunk.id, DocumentChunk.seq, DocumentChunk.content, DocumentChunk.page,
+                DocumentChunk.start_offset, DocumentChunk.end_offset, Document.original_filename
+            )
+            .join(Document, Document.id == DocumentChunk.document_id)
+            .where(DocumentChunk.id.in_([chunk_id for chunk_id, _, _ in hits]))
+        )
+    }
+    return [
+        {
+            "chunk_id": chunk_id,
+            "document_id": document_id,
+            "filename": rows[chunk_id].original_filename,
+            "seq": rows[chunk_id].seq,
+            "page": rows[chunk_id].page,
+            "start_offset": rows[chunk_id].start_offset,
+            "end_offset": rows[chunk_id].end_offset,
+            "score": round(score, 4),
+            "content": rows[chunk_id].content,
+        }
+        for chunk_id, document_id, score in hits
+        # Deleted since the index was loaded
+        if chunk_id in rows
+    ]
+
+
+class AgentIndexRegistry(ABC):
+    """
+    Indexes of the agents searched recently, built from document_chunks
+
+    Indexes are built and refreshed in the background (index_executor),
+    never in a search: a search uses the loaded index, and schedules a
+    refresh when it hasn't been checked for max_staleness_seconds. Only
+    the first search of an agent waits for its index, at most
+    cold_wait_seconds (then IndexNotReady).
+
+    A refresh applies chunks added since the index was loaded (by chunk ID)
+    and drops removed documents. The index is rebuilt, while the previous
+    one keeps serving searches, only when the delta doesn't account for
+    the table's chunk count.
+
+    Subclasses implement _load (full build) and _apply (delta).
+    """
+
+    name = "agent"
+
+    def __init__(
+        self,
+        max_agents: int,
+        max_staleness_seconds: float,
+        cold_wait_seconds: float,
+        executor: ThreadPoolExecutor
+    ):
+        self.max_agents = max_agents
+        self.max_staleness_seconds = max_staleness_seconds
+        self.cold_wait_seconds = cold_wait_seconds
+        self.executor = executor
+        self._agents: "OrderedDict[str, AgentIndexEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _signature(db: Session, agent_id: str) -> Tuple[int, Optional[int]]:
+        """Changes whenever chunks are added (max id) or removed (count)"""
+        count, max_id = db.execute(
+            select(func.count(DocumentChunk.id), func.max(DocumentChunk.id))
+            .where(DocumentChunk.agent_id == agent_id)
+        ).one()
+        return count, max_id
+
+    @abstractmethod
+    def _load(self, db: Session, agent_id: str):
+        """Build the index of an agent from its chunks"""
+
+    @abstractmethod
+    def _apply(self, db: Session, agent_id: str, index, added: Dict[str, List[int]], removed: Set[str]) -> bool:
+        """
+        Apply chunks added by other workers (chunk IDs by document, whole
+        documents) and remove deleted documents
+
+        Returns:
+            False if the index must be rebuilt instead
+        """
+
+    def _entry(self, agent_id: str, create: bool) -> Optional[AgentIndexEntry]:
+        with self._lock:
+            entry = self._agents.get(agent_id)
+            if entry is not None:
+                self._agents.move_to_end(agent_id)
+            elif create:
+                entry = self._agents[agent_id] = AgentIndexEntry()
+                while len(self._agents) > self.max_agents:
+                    self._agents.popitem(last=False)
+            return entry
+
+    def get(self, agent_id: str):
+        """
+        Index of an agent, refreshed in the background if missing or stale
+
+        Raises:
+            IndexNotReady: If the first build of the index takes longer than cold_wait_seconds
+        """
+        entry = self._entry(agent_id, create=True)
+        with entry.lock:
+            index = entry.index
+            if index is None or time.monotonic() - entry.checked_at > self.max_staleness_seconds:
+                if entry.refresh is None or entry.refresh.done():
+                    entry.checked_at = time.monotonic()
+                    entry.refresh = self.executor.submit(self._refresh, agent_id, entry)
+            refresh = entry.refresh
+        if index is not None:
+            return index
+
+        try:
+            # A failed build raises here, and is retried by the next search
+            refresh.result(timeout=self.cold_wait_seconds)
+        except FutureTimeoutError:
+            raise IndexNotReady(f"Search index of agent {agent_id} is being built")
+        with entry.lock:
+            if entry.index is None:
+                raise IndexNotReady(f"Search index of agent {agent_id} is being built")
+            return entry.index
+
+    def _refresh(self, agent_id: str, entry: AgentIndexEntry):
+        """Bring an agent's index up to date with document_chunks (background)"""
+        db = SessionLocal()
+        try:
+            signature = self._signature(db, agent_id)
+            with entry.lock:
+                index, current = entry.index, entry.signature
+            if index is not None and signature == current:
+                return
+            if index is not None and current is not None and self._apply_changes(db, agent_id, entry, index):
+                return
+
+            # Signature first: chunks written during the load are applied by the next refresh
+            start = time.perf_counter()
+            index = self._load(db, agent_id)
+            with entry.write_lock, entry.lock:
+                entry.index = index
+                entry.signature = signature
+                entry.max_chunk_id = signature[1] or 0
+            logger.info(f"Built {self.name} index of agent {agent_id} in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            logger.error(f"Could not refresh index of agent {agent_id}: {e}")
+            raise
+        finally:
+            db.close()
+
+    def _apply_changes(self, db: Session, agent_id: str, entry: AgentIndexEntry, index) -> bool:
+        """Apply the chunks added and the documents removed since the index was loaded"""
+        with entry.write_lock:
+            since = entry.max_chunk_id
+            added: Dict[str, List[int]] = {}
+            for chunk_id, document_id in db.execute(
+                select(DocumentChunk.id, DocumentChunk.document_id)
+                .where(DocumentChunk.agent_id == agent_id, DocumentChunk.id > since)
+            ):
+                added.setdefault(document_id, []).append(chunk_id)
+            live_documents = set(db.scalars(
+                select(DocumentChunk.document_id).where(DocumentChunk.agent_id == agent_id).distinct()
+            ))
+            removed = index.documents - live_documents
+            # Nothing explains the change (e.g. chunks committed with lower IDs): rebuild
+            if not added and not removed:
+                return False
+            if not self._apply(db, agent_id, index, added, removed):
+                return False
+
+            max_chunk_id = max([since, *(max(chunk_ids) for chunk_ids in added.values())])
+            with entry.lock:
+                entry.max_chunk_id = max_chunk_id
+                # Matches the table once every change is applied; a mismatch is refreshed again
+                entry.signature = (len(index), max_chunk_id or None)
+        logger.info(
+            f"Refreshed {self.name} index of agent {agent_id}: "
+            f"{len(added)} documents added, {len(removed)} removed"
+        )
+        return True
+
+    def _adopt_signature(
+        self,
+        db: Session,
+        agent_id: str,
+        entry: AgentIndexEntry,
+        expected_count: int,
+        chunk_ids: Sequence[int] = ()
+    ):
+        """Record the table state matching a local change, or refresh if others changed it too"""
+        signature = self._signature(db, agent_id)
+        with entry.lock:
+            entry.max_chunk_id = max([entry.max_chunk_id, *chunk_ids])
+            if signature[0] == expected_count:
+                entry.signature = signature
+            else:
+                entry.checked_at = 0.0
+
+    @staticmethod
+    def _force_rebuild(entry: AgentIndexEntry):
+        """Rebuild at the next search, serving the current index meanwhile"""
+        with entry.lock:
+            entry.signature = None
+            entry.checked_at = 0.0
+
+
+class SearchIndexRegistry(AgentIndexRegistry):
+    """BM25 indexes of the agents searched recently"""
+
+    name = "search"
+
+    # Chunks read per query when applying a delta
+    FETCH_BATCH = 5000
+
+    def _load(self, db: Session, agent_id: str) -> BM25Index:
+        index = BM25Index(k1=settings.SEARCH_BM25_K1, b=settings.SEARCH_BM25_B)
+        rows = db.execute(
+            select(DocumentChunk.id, DocumentChunk.document_id, DocumentChunk.content)
+            .where(DocumentChunk.agent_id == agent_id)
+            .execution_options(yield_per=self.FETCH_BATCH)
+        )
+        index.add_many(rows)
+        return index
+
+    def _apply(
+        self,
+        db: Session,
+        agent_id: str,
+        index: BM25Index,
+        added: Dict[str, List[int]],
+        removed: Set[str]
+    ) -> bool:
+        for document_id in removed:
+            index.remove(document_id)
+        chunk_ids = [chunk_id for document_chunk_ids in added.values() for chunk_id in document_chunk_ids]
+        for offset in range(0, len(chunk_ids), self.FETCH_BATCH):
+            index.add_many(db.execute(
+                select(DocumentChunk.id, DocumentChunk.document_id, DocumentChunk.content)
+                .where(DocumentChunk.id.in_(chunk_ids[offset:offset + self.FETCH_BATCH]))
+            ))
+        return True
+
+    def update_document(self, db: Session, agent_id: str, document_id: str, chunks: List[Tuple[int, str]]):
+        """Replace a document's chunks in the agent's index, if loaded (chunks are committed)"""
+        entry = self._entry(agent_id, create=False)
+        if entry is None:
+            return
+        with entry.write_lock:
+            if entry.index is None or entry.signature is None:
+                return
+            removed = entry.index.remove(document_id)
+            added = entry.index.add(document_id, chunks)
+            self._adopt_signature(
+                db, agent_id, entry, entry.signature[0] - removed + added, [chunk_id for chunk_id, _ in chunks]
+            )
+
+    def remove_document(self, db: Session, agent_id: str, document_id: str):
+        """Remove a document from the agent's index, if loaded (chunks are deleted)"""
+        entry = self._entry(agent_id, create=False)
+        if entry is None:
+            return
+        with entry.write_lock:
+            if entry.index is None or entry.signature is None:
+                return
+            removed = entry.index.remove(document_id)
+            self._adopt_signature(db, agent_id, entry, entry.signature[0] - removed)
+
+    def search(
+        self,
+        agent_id: str,
+        query: str,
+        limit: int = 10,
+        document_ids: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search an agent's document chunks (blocking, run it in a threadpool)
+
+        Returns:
+            Best chunks first, with their document, position and content
+
+        Raises:
+            IndexNotReady: If the agent's index is still being built
+        """
+        hits = self.get(agent_id).search(query, limit=limit, document_ids=document_ids)
+        db = SessionLocal()
+        try:
+            return fetch_chunk_results(db, hits)
+        finally:
+            db.close()
+
+
+# Index builds and refreshes are CPU-bound: a few threads, shared by the registries
+index_executor = ThreadPoolExecutor(
+    max_workers=settings.SEARCH_INDEX_BUILD_WORKERS,
+    thread_name_prefix="search-index",
+)
+
+# Global instance
+search_indexes = SearchIndexRegistry(
+    max_agents=settings.SEARCH_INDEX_MAX_AGENTS,
+    max_staleness_seconds=settings.SEARCH_INDEX_MAX_STALENESS_SECONDS,
+    cold_wait_seconds=settings.SEARCH_INDEX_COLD_WAIT_SECONDS,
+    executor=index_executor,
+)
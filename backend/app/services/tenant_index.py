@@ -0,0 +1,179 @@
+"""
+Tenant Index - In-memory routing of Vapi assistant IDs to their tenant
+
+Vapi webhooks only carry the call (and its assistantId). Resolving the owning
+agent, user and Google Calendar credential from memory keeps database round
+trips off the tool-call path, where every millisecond is dead air on a live
+phone call.
+
+The index is warmed at startup and kept fresh from committed ORM changes to
+agents and OAuth credentials. A miss falls back to the database, so entries
+written by another worker are picked up on first use.
+"""
+
+from typing import Dict, Any, List, Optional, NamedTuple, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from app.core.config import settings
+from app.models.agent import Agent
+from app.models.oauth_credential import OAuthCredential
+from app.models.user import User
+
+
+CALENDAR_SERVICE = "google_calendar"
+
+# session.info key holding index changes flushed but not yet committed
+PENDING_CHANGES_KEY = "tenant_index_changes"
+
+
+class AssistantTenant(NamedTuple):
+    """Who a Vapi assistant belongs to"""
+    agent_id: Optional[str]
+    user_id: str
+    calendar_credential_id: Optional[str]  # Active Google Calendar credential, if known
+
+
+class TenantIndex:
+    """assistant ID -> (agent, user, calendar credential), O(1) lookups"""
+
+    def __init__(self):
+        # vapi_assistant_id -> (agent_id, user_id)
+        self._assistants: Dict[str, Tuple[str, str]] = {}
+        # agent_id -> vapi_assistant_id, to drop the old entry when it changes
+        self._agent_assistants: Dict[str, str] = {}
+        # user_id -> active Google Calendar credential id
+        self._calendar_credentials: Dict[str, str] = {}
+
+    def resolve(self, assistant_id: Optional[str]) -> Optional[AssistantTenant]:
+        """Get the tenant of an assistant from memory (None if unknown)"""
+        entry = self._assistants.get(assistant_id) if assistant_id else None
+        if entry is None:
+            return None
+
+        agent_id, user_id = entry
+        return AssistantTenant(agent_id, user_id, self._calendar_credentials.get(user_id))
+
+    def calendar_credential_id(self, user_id: str) -> Optional[str]:
+        return self._calendar_credentials.get(user_id)
+
+    def warm(self, db: Session):
+        """Load every routed agent and active calendar credential"""
+        self._assistants.clear()
+        self._agent_assistants.clear()
+        self._calendar_credentials.clear()
+
+        for agent_id, user_id, assistant_id in db.execute(
+            select(Agent.id, Agent.user_id, Agent.vapi_assistant_id).where(Agent.vapi_assistant_id.isnot(None))
+        ):
+            self.set_agent(agent_id, user_id, assistant_id)
+
+        for credential_id, user_id in db.execute(
+            select(OAuthCredential.id, OAuthCredential.user_id).where(
+                OAuthCredential.service == CALENDAR_SERVICE,
+                OAuthCredential.is_active == True
+            )
+        ):
+            self._calendar_credentials[user_id] = credential_id
+
+        logger.info(
+            f"Tenant index warmed: {len(self._assistants)} assistants, "
+            f"{len(self._calendar_credentials)} calendar credentials"
+        )
+
+    def set_agent(self, agent_id: str, user_id: str, assistant_id: Optional[str]):
+        self.remove_agent(agent_id)
+        if assistant_id:
+            self._assistants[assistant_id] = (agent_id, user_id)
+            self._agent_assistants[agent_id] = assistant_id
+
+    def remove_agent(self, agent_id: str):
+        assistant_id = self._agent_assistants.pop(agent_id, None)
+        if assistant_id and self._assistants.get(assistant_id, (None,))[0] == agent_id:
+            del self._assistants[assistant_id]
+
+    def set_calendar_credential(self, user_id: str, credential_id: str, is_active: bool):
+        if is_active:
+            self._calendar_credentials[user_id] = credential_id
+        elif self._calendar_credentials.get(user_id) == credential_id:
+            del self._calendar_credentials[user_id]
+
+    async def resolve_call(self, call: Dict[str, Any], db: AsyncSession) -> AssistantTenant:
+        """
+        Resolve the tenant of a Vapi call
+
+        Served from memory when possible; otherwise the agent is looked up by
+        assistant ID and added to the index. In development, calls from
+        unknown assistants are routed to the dev user.
+
+        Raises:
+            ValueError: If no tenant owns the call's assistant
+        """
+        assistant_id = (call or {}).get("assistantId")
+
+        tenant = self.resolve(assistant_id)
+        if tenant is not None:
+            return tenant
+
+        if assistant_id:
+            row = (await db.execute(
+                select(Agent.id, Agent.user_id).where(Agent.vapi_assistant_id == assistant_id)
+            )).first()
+            if row is not None:
+                self.set_agent(row.id, row.user_id, assistant_id)
+                return AssistantTenant(row.id, row.user_id, self._calendar_credentials.get(row.user_id))
+
+        if settings.ENVIRONMENT == "development":
+            dev_user_id = await db.scalar(select(User.id).where(User.email == "dev@example.com"))
+            if dev_user_id:
+                return AssistantTenant(None, dev_user_id, self._calendar_credentials.get(dev_user_id))
+
+        raise ValueError(f"No agent found for assistant {assistant_id}")
+
+    def apply(self, changes: List[Tuple]):
+        for change in changes:
+            kind, args = change[0], change[1:]
+            if kind == "agent":
+                self.set_agent(*args)
+            elif kind == "agent_deleted":
+                self.remove_agent(*args)
+            elif kind == "calendar_credential":
+                self.set_calendar_credential(*args)
+
+
+# Global instance
+tenant_index = TenantIndex()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_tenant_changes(session: Session, flush_context):
+    """Record agent/credential writes; they reach the index only on commit"""
+    changes = []
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Agent):
+            changes.append(("agent", obj.id, obj.user_id, obj.vapi_assistant_id))
+        elif isinstance(obj, OAuthCredential) and obj.service == CALENDAR_SERVICE:
+            changes.append(("calendar_credential", obj.user_id, obj.id, bool(obj.is_active)))
+
+    for obj in session.deleted:
+        if isinstance(obj, Agent):
+            changes.append(("agent_deleted", obj.id))
+        elif isinstance(obj, OAuthCredential) and obj.service == CALENDAR_SERVICE:
+            changes.append(("calendar_credential", obj.user_id, obj.id, False))
+
+    if changes:
+        session.info.setdefault(PENDING_CHANGES_KEY, []).extend(changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_tenant_changes(session: Session):
+    changes = session.info.pop(PENDING_CHANGES_KEY, None)
+    if changes:
+        tenant_index.apply(changes)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_tenant_changes(session: Session, previous_transaction):
+    session.info.pop(PENDING_CHANGES_KEY, None)
@@ -0,0 +1,420 @@
+"""
+Text Extraction - Streaming extractors for text, office and data files
+
+Every extractor is a generator yielding a document's text piece by piece
+(blocks of lines, one slide, a group of spreadsheet rows...), so large
+files are read in bounded memory and chunked as their text is produced.
+PDFs are streamed page by page (pdf_extraction).
+
+Tables (csv, xlsx) are rendered one row per line, as "header: value"
+pairs when the first row looks like a header, so that a chunk taken from
+the middle of a table still says what its values are.
+"""
+
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+from datetime import date, datetime, time
+import csv
+import json
+import re
+import xml.etree.ElementTree as ElementTree
+
+from loguru import logger
+
+from app.services.pdf_extraction import iter_pdf_pages
+
+
+# Bump when a change to an extractor changes its text (invalidates cached text)
+EXTRACTION_VERSION = 1
+
+# Characters accumulated before a block of lines is yielded
+TEXT_BLOCK_SIZE = 64 * 1024
+# Characters read at a time from text files
+READ_SIZE = 64 * 1024
+
+
+def open_text(file_path: str) -> TextIO:
+    """UTF-8 (with or without BOM); undecodable bytes are replaced rather than failing the document"""
+    return open(file_path, "r", encoding="utf-8-sig", errors="replace", newline="")
+
+
+def iter_blocks(lines: Iterable[str], block_size: int = TEXT_BLOCK_SIZE) -> Iterator[str]:
+    """Group lines into newline-joined blocks of about block_size characters"""
+    block: List[str] = []
+    size = 0
+    for line in lines:
+        block.append(line)
+        size += len(line) + 1
+        if size >= block_size:
+            yield "\n".join(block)
+            block, size = [], 0
+    if block:
+        yield "\n".join(block)
+
+
+# --- Plain text and Markdown ---
+
+def iter_txt(file_path: str) -> Iterator[str]:
+    """Stream a text file in blocks of lines"""
+    with open_text(file_path) as file:
+        yield from iter_blocks(line.rstrip("\r\n") for line in file)
+
+
+MARKDOWN_IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+MARKDOWN_LINK = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+MARKDOWN_HTML_TAG = re.compile(r"</?[a-zA-Z][^>]*>")
+MARKDOWN_EMPHASIS = re.compile(r"(\*\*|__|\*|`)")
+MARKDOWN_PREFIX = re.compile(r"^\s{0,3}(#{1,6}\s+|>\s?|[-*+]\s+|\d+[.)]\s+)")
+MARKDOWN_RULE = re.compile(r"^\s*([-*_]\s*){3,}$")
+
+
+def clean_markdown_line(line: str) -> str:
+    """Markdown line to plain text: link and image labels kept, markup dropped"""
+    if MARKDOWN_RULE.match(line) or line.lstrip().startswith("```"):
+        return ""
+    line = MARKDOWN_IMAGE.sub(r"\1", line)
+    line = MARKDOWN_LINK.sub(r"\1", line)
+    line = MARKDOWN_HTML_TAG.sub("", line)
+    line = MARKDOWN_PREFIX.sub("", line)
+    line = MARKDOWN_EMPHASIS.sub("", line)
+    return line.rstrip()
+
+
+def iter_markdown(file_path: str) -> Iterator[str]:
+    """Stream a Markdown file as plain text, a new block starting at each heading once the current one is large"""
+    with open_text(file_path) as file:
+        block: List[str] = []
+        size = 0
+        for line in file:
+            # Flush on a heading (a section boundary) past a quarter block, or on a full block
+            if line.startswith("#") and size >= TEXT_BLOCK_SIZE // 4 or size >= TEXT_BLOCK_SIZE:
+                yield "\n".join(block)
+                block, size = [], 0
+            text = clean_markdown_line(line.rstrip("\r\n"))
+            block.append(text)
+            size += len(text) + 1
+        if block:
+            yield "\n".join(block)
+
+
+# --- Word documents ---
+
+def iter_docx(file_path: str) -> Iterator[str]:
+    """Stream the paragraphs of a Word document, then its table rows"""
+    from docx import Document as DocxDocument
+
+    document = DocxDocument(file_path)
+    yield from iter_blocks(paragraph.text for paragraph in document.paragraphs)
+
+    rows = (
+        " | ".join(cell.text.strip() for cell in row.cells)
+        for table in document.tables
+        for row in table.rows
+    )
+    yield from iter_blocks(row for row in rows if row.strip(" |"))
+
+
+# --- Tables (CSV, XLSX) ---
+
+def cell_text(value: Any) -> str:
+    """Spreadsheet or CSV cell value as text"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == time() else value.isoformat(sep=" ")
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    # Line breaks inside a cell would split its row
+    return " ".join(str(value).split())
+
+
+def looks_like_header(cells: Sequence[str]) -> bool:
+    """Every cell filled with a label (not a number)"""
+    if not cells or not all(cells):
+        return False
+    for cell in cells:
+        try:
+            float(cell.replace(",", "."))
+            return False
+        except ValueError:
+            continue
+    return True
+
+
+def iter_table_lines(rows: Iterable[Sequence[Any]]) -> Iterator[str]:
+    """One line per non-empty row: "header: value | ..." when the table has a header row"""
+    header: Optional[List[str]] = None
+    first = True
+    for row in rows:
+        cells = [cell_text(value) for value in row]
+        while cells and not cells[-1]:
+            cells.pop()
+        if not cells:
+            continue
+
+        if first:
+            first = False
+            if looks_like_header(cells):
+                header = cells
+                yield " | ".join(cells)
+                continue
+
+        if header:
+            yield " | ".join(
+                f"{header[i]}: {cell}" if i < len(header) else cell
+                for i, cell in enumerate(cells) if cell
+            )
+        else:
+            yield " | ".join(cell for cell in cells if cell)
+
+
+def iter_csv(file_path: str) -> Iterator[str]:
+    """Stream a CSV (delimiter detected from the first lines), one line per row"""
+    with open_text(file_path) as file:
+        sample = file.read(READ_SIZE)
+        file.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        yield from iter_blocks(iter_table_lines(csv.reader(file, dialect)))
+
+
+def iter_xlsx(file_path: str) -> Iterator[str]:
+    """
+    Stream the cells of a workbook, sheet by sheet
+
+    openpyxl's read-only mode parses the sheet XML as rows are iterated
+    instead of loading every cell; formulas give their last computed value.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            lines = iter_table_lines(sheet.iter_rows(values_only=True))
+            for position, block in enumerate(iter_blocks(lines)):
+                yield f"{sheet.title}\n{block}" if position == 0 else block
+    finally:
+        # Read-only workbooks keep the file open
+        workbook.close()
+
+
+# --- Presentations ---
+
+def iter_shape_text(shapes) -> Iterator[str]:
+    """Text of slide shapes: text frames, tables, and shapes inside groups"""
+    for shape in shapes:
+        if getattr(shape, "shapes", None) is not None:
+            yield from iter_shape_text(shape.shapes)
+        elif getattr(shape, "has_table", False) and shape.has_table:
+            yield from iter_table_lines(
+                [cell.text for cell in row.cells] for row in shape.table.rows
+            )
+        elif getattr(shape, "has_text_frame", False) and shape.has_text_frame:
+            text = shape.text_frame.text.strip()
+            if text:
+                yield text
+
+
+def iter_pptx(file_path: str) -> Iterator[str]:
+    """Stream a presentation, one block per slide (shapes, then speaker notes; empty for a slide without text)"""
+    from pptx import Presentation
+
+    presentation = Presentation(file_path)
+    for number, slide in enumerate(presentation.slides, start=1):
+        lines = list(iter_shape_text(slide.shapes))
+        if slide.has_notes_slide:
+            notes = slide.notes_slide.notes_text_frame
+            if notes is not None and notes.text.strip():
+                lines.append(notes.text.strip())
+        yield f"Slide {number}\n" + "\n".join(lines) if lines else ""
+
+
+# --- JSON ---
+
+def iter_json_lines(value: Any, path: str = "") -> Iterator[str]:
+    """Flatten a JSON value into "path: value" lines"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from iter_json_lines(item, f"{path}.{key}" if path else str(key))
+    elif isinstance(value, list):
+        if value and all(not isinstance(item, (dict, list)) for item in value):
+            yield f"{path}: {', '.join(cell_text(item) for item in value)}" if path else ", ".join(cell_text(item) for item in value)
+        else:
+            for item in value:
+                yield from iter_json_lines(item, path)
+    elif value is not None and value != "":
+        text = "true" if value is True else "false" if value is False else cell_text(value)
+        yield f"{path}: {text}" if path else text
+
+
+class JSONStream:
+    """
+    Incremental reader of the top-level items of a JSON document
+
+    The elements of a top-level array, the members of a top-level object,
+    or the values of a JSON Lines file are decoded one at a time from a
+    sliding buffer, so only one item is held in memory.
+    """
+
+    WHITESPACE = re.compile(r"[\s,]*")
+
+    def __init__(self, file: TextIO):
+        self.file = file
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, minimum: int = READ_SIZE) -> bool:
+        """Read more text, at least `minimum` characters unless the file ends; False at end of file"""
+        if self.eof:
+            return False
+        self.buffer = self.buffer[self.position:]
+        self.position = 0
+        data = self.file.read(max(READ_SIZE, minimum))
+        if not data:
+            self.eof = True
+            return False
+        self.buffer += data
+        return True
+
+    def _skip(self, characters: str = "") -> str:
+        """Skip whitespace and commas (and `characters`); the next character, "" at the end"""
+        while True:
+            self.position = self.WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer):
+                if self.buffer[self.position] in characters:
+                    self.position += 1
+                    continue
+                return self.buffer[self.position]
+            if not self._fill():
+                return ""
+
+    def _value(self) -> Any:
+        """Decode the next value, reading more of the file until it is complete"""
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                # A number at the end of the buffer may continue in the next read
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Read as much again as is buffered: long values are decoded a bounded number of times
+            if not self._fill(minimum=len(self.buffer) - self.position):
+                self.eof = True
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """(key, value) of each top-level item; the key is "" for array elements and JSON Lines"""
+        first = self._skip()
+        if first and first in "[{":
+            self.position += 1
+            while True:
+                character = self._skip()
+                if not character:
+                    return
+                if character in "]}":
+                    self.position += 1
+                    break
+                if first == "{":
+                    key = self._value()
+                    self._skip(":")
+                    yield str(key), self._value()
+                else:
+                    yield "", self._value()
+
+        # JSON Lines: values after the first one are decoded whole
+        while self._skip():
+            yield "", self._value()
+
+
+def iter_json(file_path: str) -> Iterator[str]:
+    """Stream a JSON or JSON Lines file as "path: value" lines, top-level items separated by blank lines"""
+    with open_text(file_path) as file:
+        items = JSONStream(file).items()
+        lines = (
+            line
+            for key, value in items
+            for line in (*iter_json_lines(value, key), "")
+        )
+        yield from iter_blocks(lines)
+
+
+# --- XML ---
+
+def local_name(tag: str) -> str:
+    """Tag without its namespace"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def iter_xml(file_path: str) -> Iterator[str]:
+    """
+    Stream the text of an XML document, one "tag: text" line per element with text
+
+    Parsed incrementally; each element is cleared once read, and the
+    children of the root once their subtree ends, so memory stays bounded
+    whatever the number of records.
+    """
+    def lines() -> Iterator[str]:
+        depth = 0
+        root = None
+        for event, element in ElementTree.iterparse(file_path, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = element
+                depth += 1
+                continue
+
+            depth -= 1
+            text = (element.text or "").strip()
+            if text:
+                yield f"{local_name(element.tag)}: {text}"
+            # Text between children (mixed content) is only parsed once the parent ends
+            for child in element:
+                tail = (child.tail or "").strip()
+                if tail:
+                    yield tail
+            tail = element.tail
+            element.clear()
+            element.tail = tail
+            if depth == 1:
+                # A record ended: drop it from the tree, and separate records
+                root.clear()
+                yield ""
+
+    yield from iter_blocks(lines())
+
+
+# Types whose streamed pieces are pages (or slides), one per page
+PAGED_TYPES = ("pdf", "pptx")
+
+EXTRACTORS = {
+    "pdf": iter_pdf_pages,
+    "docx": iter_docx,
+    "txt": iter_txt,
+    "md": iter_markdown,
+    "csv": iter_csv,
+    "xlsx": iter_xlsx,
+    "pptx": iter_pptx,
+    "json": iter_json,
+    "xml": iter_xml,
+}
+
+
+def iter_file_text(file_path: str, file_type: str) -> Iterator[str]:
+    """
+    Stream the text of a file with the extractor of its type
+
+    Raises:
+        ValueError: If there is no extractor for the type
+    """
+    extractor = EXTRACTORS.get(file_type)
+    if extractor is None:
+        raise ValueError(f"Unsupported file type: {file_type}")
+    logger.debug(f"Streaming text from {file_path} ({file_type})")
+    return extractor(file_path)
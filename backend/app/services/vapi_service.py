@@ -2,18 +2,68 @@
 Vapi Service - Integration with Vapi.ai API
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple, Union, BinaryIO
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+import asyncio
+import json
 import httpx
 import mimetypes
 from loguru import logger
 
 from app.core.config import settings
+from app.core.http_client import get_http_client
+from app.core.async_cache import AsyncTTLCache
 from app.core.background_sounds import get_background_sound_url
+from app.core.uploads import open_upload_stream
+
+
+def _parse_iso(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp (accepts a trailing 'Z')"""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _split_time_range(
+    start: Optional[str],
+    end: Optional[str],
+    window: timedelta
+) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Split an ISO 8601 time range into consecutive sub-windows
+
+    Open-ended or unparseable ranges are returned as a single window.
+    """
+    if not start or not end:
+        return [(start, end)]
+
+    try:
+        start_dt = _parse_iso(start)
+        end_dt = _parse_iso(end)
+    except ValueError:
+        return [(start, end)]
+
+    if end_dt - start_dt <= window:
+        return [(start, end)]
+
+    windows = []
+    window_start = start_dt
+    while window_start < end_dt:
+        window_end = min(window_start + window, end_dt)
+        windows.append((window_start.isoformat(), window_end.isoformat()))
+        window_start = window_end
+
+    # Keep the caller's original bounds verbatim
+    windows[0] = (start, windows[0][1])
+    windows[-1] = (windows[-1][0], end)
+    return windows
 
 
 class VapiService:
     """Service for interacting with Vapi.ai API"""
 
+    # Largest limit accepted by GET /call
+    MAX_CALLS_PAGE_SIZE = 1000
+
     def __init__(self):
         self.api_key = settings.VAPI_API_KEY
         self.base_url = "https://api.vapi.ai"
@@ -21,10 +71,16 @@ class VapiService:
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        # Assistant and tool reads, keyed by ("assistant" | "tool", id). Writes
+        # invalidate this worker's entries; other workers see them within the TTL
+        self._cache = AsyncTTLCache(
+            ttl_seconds=settings.VAPI_CACHE_TTL_SECONDS,
+            max_entries=settings.VAPI_CACHE_MAX_ENTRIES
+        )
 
-    def client(self):
-        """Get an HTTP client for making requests"""
-        return httpx.AsyncClient()
+    def client(self) -> httpx.AsyncClient:
+        """Get the shared pooled HTTP client (do not close it)"""
+        return get_http_client()
 
     async def _make_request(
         self,
@@ -44,22 +100,22 @@ class VapiService:
             Response JSON
         """
         try:
-            async with httpx.AsyncClient() as client:
-                url = f"{self.base_url}{endpoint}"
-
-                if method.upper() == "GET":
-                    response = await client.get(url, headers=self.headers, timeout=30.0)
-                elif method.upper() == "POST":
-                    response = await client.post(url, headers=self.headers, json=payload, timeout=30.0)
-                elif method.upper() == "PATCH":
-                    response = await client.patch(url, headers=self.headers, json=payload, timeout=30.0)
-                elif method.upper() == "DELETE":
-                    response = await client.delete(url, headers=self.headers, timeout=30.0)
-                else:
-                    raise ValueError(f"Unsupported HTTP method: {method}")
-
-                response.raise_for_status()
-                return response.json()
+            client = self.client()
+            url = f"{self.base_url}{endpoint}"
+
+            if method.upper() == "GET":
+                response = await client.get(url, headers=self.headers, timeout=30.0)
+            elif method.upper() == "POST":
+                response = await client.post(url, headers=self.headers, json=payload, timeout=30.0)
+            elif method.upper() == "PATCH":
+                response = await client.patch(url, headers=self.headers, json=payload, timeout=30.0)
+            elif method.upper() == "DELETE":
+                response = await client.delete(url, headers=self.headers, timeout=30.0)
+            else:
+                raise ValueError(f"Unsupported HTTP method: {method}")
+
+            response.raise_for_status()
+            return response.json()
 
         except httpx.HTTPStatusError as e:
             logger.error(f"Vapi API error: {e.response.status_code} - {e.response.text}")
@@ -182,15 +238,15 @@ class VapiService:
 
                 payload["backgroundSpeechDenoisingPlan"] = denoising_config
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/assistant",
-                    headers=self.headers,
-                    json=payload,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                result = response.json()
+            client = self.client()
+            response = await client.post(
+                f"{self.base_url}/assistant",
+                headers=self.headers,
+                json=payload,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            result = response.json()
 
             logger.info(f"Created Vapi assistant: {result.get('id')}")
             return result
@@ -218,15 +274,15 @@ class VapiService:
             Updated assistant data
         """
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.patch(
-                    f"{self.base_url}/assistant/{assistant_id}",
-                    headers=self.headers,
-                    json=updates,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                result = response.json()
+            client = self.client()
+            response = await client.patch(
+                f"{self.base_url}/assistant/{assistant_id}",
+                headers=self.headers,
+                json=updates,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            result = response.json()
 
             logger.info(f"Updated Vapi assistant: {assistant_id}")
             return result
@@ -237,26 +293,39 @@ class VapiService:
         except Exception as e:
             logger.error(f"Error updating assistant: {e}")
             raise
+        finally:
+            # Even a failed PATCH may have been applied remotely
+            self._cache.invalidate(("assistant", assistant_id))
 
     async def get_assistant(self, assistant_id: str) -> Dict[str, Any]:
         """
         Get assistant details from Vapi
 
+        Served from a short-lived cache; concurrent lookups of the same
+        assistant share one request.
+
         Args:
             assistant_id: Vapi assistant ID
 
         Returns:
             Assistant data
         """
+        return await self._cache.get_or_load(
+            ("assistant", assistant_id),
+            lambda: self._fetch_assistant(assistant_id)
+        )
+
+    async def _fetch_assistant(self, assistant_id: str) -> Dict[str, Any]:
+        """Fetch assistant details from Vapi, bypassing the cache"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/assistant/{assistant_id}",
-                    headers=self.headers,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                return response.json()
+            client = self.client()
+            response = await client.get(
+                f"{self.base_url}/assistant/{assistant_id}",
+                headers=self.headers,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            return response.json()
 
         except httpx.HTTPStatusError as e:
             logger.error(f"Error getting assistant: {e.response.status_code} - {e.response.text}")
@@ -276,13 +345,13 @@ class VapiService:
             True if deleted successfully
         """
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.delete(
-                    f"{self.base_url}/assistant/{assistant_id}",
-                    headers=self.headers,
-                    timeout=30.0
-                )
-                response.raise_for_status()
+            client = self.client()
+            response = await client.delete(
+                f"{self.base_url}/assistant/{assistant_id}",
+                headers=self.headers,
+                timeout=30.0
+            )
+            response.raise_for_status()
 
             logger.info(f"Deleted Vapi assistant: {assistant_id}")
             return True
@@ -293,6 +362,8 @@ class VapiService:
         except Exception as e:
             logger.error(f"Error deleting assistant: {e}")
             raise
+        finally:
+            self._cache.invalidate(("assistant", assistant_id))
 
     async def create_knowledge_base(
         self,
@@ -318,15 +389,15 @@ class VapiService:
             if files:
                 payload["fileIds"] = files
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/knowledge-base",
-                    headers=self.headers,
-                    json=payload,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                result = response.json()
+            client = self.client()
+            response = await client.post(
+                f"{self.base_url}/knowledge-base",
+                headers=self.headers,
+                json=payload,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            result = response.json()
 
             logger.info(f"Created knowledge base: {result.get('id')}")
             return result
@@ -340,14 +411,14 @@ class VapiService:
 
     async def upload_file(
         self,
-        file_content: bytes,
+        file_content: Union[bytes, BinaryIO],
         filename: str
     ) -> Dict[str, Any]:
         """
         Upload a file to Vapi
 
         Args:
-            file_content: File bytes
+            file_content: File bytes, or a file object streamed in chunks
             filename: Original filename
 
         Returns:
@@ -368,6 +439,8 @@ class VapiService:
                     'xml': 'application/xml',
                     'doc': 'application/msword',
                     'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+                    'pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+                    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
                     'html': 'text/html',
                     'css': 'text/css',
                     'js': 'text/javascript',
@@ -387,15 +460,15 @@ class VapiService:
                 "Authorization": f"Bearer {self.api_key}"
             }
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/file",
-                    headers=headers,
-                    files=files,
-                    timeout=60.0
-                )
-                response.raise_for_status()
-                result = response.json()
+            client = self.client()
+            response = await client.post(
+                f"{self.base_url}/file",
+                headers=headers,
+                files=files,
+                timeout=60.0
+            )
+            response.raise_for_status()
+            result = response.json()
 
             logger.info(f"Uploaded file to Vapi: {filename}")
             return result
@@ -407,6 +480,61 @@ class VapiService:
             logger.error(f"Error uploading file: {e}")
             raise
 
+    async def upload_files(
+        self,
+        files: List[Tuple[bytes, str]],
+        max_concurrency: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Upload several files to Vapi concurrently, all or nothing
+
+        Uploads run under a bounded semaphore. If any of them fails, the
+        files already uploaded are deleted and the first error is raised.
+
+        Args:
+            files: (content, filename) of each file
+            max_concurrency: Maximum number of uploads in flight
+
+        Returns:
+            Uploaded file data, in the order of files
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or settings.VAPI_MAX_CONCURRENT_REQUESTS)
+
+        async def upload_one(content: bytes, filename: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.upload_file(file_content=content, filename=filename)
+
+        results = await asyncio.gather(
+            *(upload_one(content, filename) for content, filename in files),
+            return_exceptions=True
+        )
+
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            uploaded = [result.get("id") for result in results if not isinstance(result, BaseException)]
+            logger.error(f"{len(errors)}/{len(files)} uploads failed, deleting {len(uploaded)} uploaded files")
+            await self.delete_files(uploaded, max_concurrency)
+            raise errors[0]
+
+        return results
+
+    async def delete_files(self, file_ids: List[str], max_concurrency: Optional[int] = None):
+        """
+        Delete several files from Vapi concurrently, to clean up after a failure
+
+        Failures are only logged.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or settings.VAPI_MAX_CONCURRENT_REQUESTS)
+
+        async def delete_one(file_id: str):
+            try:
+                async with semaphore:
+                    await self.delete_file(file_id)
+            except Exception as e:
+                logger.warning(f"Could not delete Vapi file {file_id}: {e}")
+
+        await asyncio.gather(*(delete_one(file_id) for file_id in file_ids))
+
     async def list_files(self) -> List[Dict[str, Any]]:
         """
         List all files in Vapi
@@ -415,14 +543,14 @@ class VapiService:
             List of file data
         """
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/file",
-                    headers=self.headers,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                return response.json()
+            client = self.client()
+            response = await client.get(
+                f"{self.base_url}/file",
+                headers=self.headers,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            return response.json()
 
         except httpx.HTTPStatusError as e:
             logger.error(f"Error listing files: {e.response.status_code} - {e.response.text}")
@@ -442,13 +570,13 @@ class VapiService:
             True if deleted successfully
         """
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.delete(
-                    f"{self.base_url}/file/{file_id}",
-                    headers=self.headers,
-                    timeout=30.0
-                )
-                response.raise_for_status()
+            client = self.client()
+            response = await client.delete(
+                f"{self.base_url}/file/{file_id}",
+                headers=self.headers,
+                timeout=30.0
+            )
+            response.raise_for_status()
 
             logger.info(f"Deleted Vapi file: {file_id}")
             return True
@@ -486,15 +614,15 @@ class VapiService:
             if previous_chat_id:
                 payload["previousChatId"] = previous_chat_id
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/chat",
-                    headers=self.headers,
-                    json=payload,
-                    timeout=60.0
-                )
-                response.raise_for_status()
-                result = response.json()
+            client = self.client()
+            response = await client.post(
+                f"{self.base_url}/chat",
+                headers=self.headers,
+                json=payload,
+                timeout=60.0
+            )
+            response.raise_for_status()
+            result = response.json()
 
             logger.info(f"Sent chat message to assistant: {assistant_id}")
             return result
@@ -506,6 +634,84 @@ class VapiService:
             logger.error(f"Error sending chat message: {e}")
             raise
 
+    async def stream_chat_message(
+        self,
+        assistant_id: str,
+        message_content: str,
+        previous_chat_id: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Send a chat message and stream the response as it is generated
+
+        Uses the Chat API with "stream": true, which answers with server-sent
+        events carrying text deltas.
+
+        Args:
+            assistant_id: Vapi assistant ID
+            message_content: The user's message content (string)
+            previous_chat_id: Optional previous chat ID for context
+
+        Yields:
+            {"delta": str, "chat_id": Optional[str]} for each text chunk
+        """
+        payload = {
+            "assistantId": assistant_id,
+            "input": message_content,
+            "stream": True
+        }
+
+        if previous_chat_id:
+            payload["previousChatId"] = previous_chat_id
+
+        try:
+            client = self.client()
+            # 60 s applies between chunks, not to the whole response
+            async with client.stream(
+                "POST",
+                f"{self.base_url}/chat",
+                headers=self.headers,
+                json=payload,
+                timeout=60.0
+            ) as response:
+                if response.is_error:
+                    await response.aread()
+                response.raise_for_status()
+
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+
+                    data = line[len("data:"):].strip()
+                    if not data:
+                        continue
+                    if data == "[DONE]":
+                        break
+
+                    try:
+                        event = json.loads(data)
+                    except ValueError:
+                        logger.warning(f"Skipping malformed chat stream event: {data[:200]}")
+                        continue
+
+                    delta = event.get("delta")
+                    if not isinstance(delta, str) and isinstance(event.get("choices"), list) and event["choices"]:
+                        # OpenAI-style chunk
+                        delta = (event["choices"][0].get("delta") or {}).get("content")
+
+                    yield {
+                        "delta": delta if isinstance(delta, str) else "",
+                        "chat_id": event.get("id") or event.get("chatId")
+                    }
+
+            logger.info(f"Streamed chat message to assistant: {assistant_id}")
+
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Error streaming chat message: {e.response.status_code} - {e.response.text}")
+            raise
+        except Exception as e:
+            logger.error(f"Error streaming chat message: {e}")
+            raise
+
     async def create_query_tool(
         self,
         name: str,
@@ -539,15 +745,15 @@ class VapiService:
                 ]
             }
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/tool",
-                    headers=self.headers,
-                    json=payload,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                result = response.json()
+            client = self.client()
+            response = await client.post(
+                f"{self.base_url}/tool",
+                headers=self.headers,
+                json=payload,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            result = response.json()
 
             logger.info(f"Created query tool: {result.get('id')}")
             return result
@@ -589,15 +795,15 @@ class VapiService:
             if description:
                 payload["knowledgeBases"][0]["description"] = description
 
-            async with httpx.AsyncClient() as client:
-                response = await client.patch(
-                    f"{self.base_url}/tool/{tool_id}",
-                    headers=self.headers,
-                    json=payload,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                result = response.json()
+            client = self.client()
+            response = await client.patch(
+                f"{self.base_url}/tool/{tool_id}",
+                headers=self.headers,
+                json=payload,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            result = response.json()
 
             logger.info(f"Updated query tool: {tool_id}")
             return result
@@ -608,26 +814,38 @@ class VapiService:
         except Exception as e:
             logger.error(f"Error updating query tool: {e}")
             raise
+        finally:
+            self._cache.invalidate(("tool", tool_id))
 
     async def get_tool(self, tool_id: str) -> Dict[str, Any]:
         """
         Get tool details from Vapi
 
+        Served from a short-lived cache; concurrent lookups of the same tool
+        share one request.
+
         Args:
             tool_id: Tool ID
 
         Returns:
             Tool data
         """
+        return await self._cache.get_or_load(
+            ("tool", tool_id),
+            lambda: self._fetch_tool(tool_id)
+        )
+
+    async def _fetch_tool(self, tool_id: str) -> Dict[str, Any]:
+        """Fetch tool details from Vapi, bypassing the cache"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/tool/{tool_id}",
-                    headers=self.headers,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                return response.json()
+            client = self.client()
+            response = await client.get(
+                f"{self.base_url}/tool/{tool_id}",
+                headers=self.headers,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            return response.json()
 
         except httpx.HTTPStatusError as e:
             logger.error(f"Error getting tool: {e.response.status_code} - {e.response.text}")
@@ -669,15 +887,15 @@ class VapiService:
                 }
             }
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/tool",
-                    headers=self.headers,
-                    json=payload,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                result = response.json()
+            client = self.client()
+            response = await client.post(
+                f"{self.base_url}/tool",
+                headers=self.headers,
+                json=payload,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            result = response.json()
 
             logger.info(f"Created function tool: {result.get('id')}")
             return result
@@ -767,137 +985,189 @@ class VapiService:
             params["createdAtLt"] = created_at_lt
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/call",
-                    headers=self.headers,
-                    params=params,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                return response.json()
+            return await self._fetch_call_page(params)
         except Exception as e:
             logger.error(f"Error fetching calls: {e}")
             return []
 
-    async def get_analytics(
+    async def _fetch_call_page(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Fetch a single page of calls, raising on HTTP errors"""
+        client = self.client()
+        response = await client.get(
+            f"{self.base_url}/call",
+            headers=self.headers,
+            params=params,
+            timeout=30.0
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def iter_call_pages(
         self,
         assistant_id: Optional[str] = None,
-        start_date: Optional[str] = None,
-        end_date: Optional[str] = None
-    ) -> Dict[str, Any]:
+        created_at_gt: Optional[str] = None,
+        created_at_lt: Optional[str] = None,
+        created_at_ge: Optional[str] = None,
+        page_size: Optional[int] = None,
+        semaphore: Optional[asyncio.Semaphore] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Iterate over every call in a time range, one page at a time
+
+        Vapi returns calls newest first, so each following page is requested
+        with a createdAt cursor set to the oldest call of the previous page.
+        The cursor is inclusive and calls already seen on the boundary are
+        skipped, so calls sharing a timestamp are never lost. When a whole
+        page shares one timestamp, the cursor can't move: every call at that
+        timestamp is fetched in one request, then pagination resumes
+        strictly before it.
+
+        Args:
+            assistant_id: Filter by assistant ID
+            created_at_gt: Only calls created after this date (ISO 8601)
+            created_at_lt: Only calls created before this date (ISO 8601)
+            created_at_ge: Only calls created at or after this date (ISO 8601)
+            page_size: Number of calls per request
+            semaphore: Optional semaphore bounding concurrent requests
+
+        Yields:
+            Lists of call data
         """
-        Get analytics data for calls
+        page_size = page_size or settings.VAPI_CALLS_PAGE_SIZE
+        cursor = None
+        cursor_param = "createdAtLe"
+        boundary_ids = set()
+
+        while True:
+            params = {"limit": page_size}
+            if assistant_id:
+                params["assistantId"] = assistant_id
+            if created_at_gt:
+                params["createdAtGt"] = created_at_gt
+            if created_at_ge:
+                params["createdAtGe"] = created_at_ge
+            if cursor:
+                params[cursor_param] = cursor
+            elif created_at_lt:
+                params["createdAtLt"] = created_at_lt
+
+            async with semaphore or nullcontext():
+                page = await self._fetch_call_page(params)
+
+            new_calls = [call for call in page if call.get("id") not in boundary_ids]
+            if new_calls:
+                yield new_calls
+
+            if len(page) < page_size or not new_calls:
+                break
+
+            oldest = min((call["createdAt"] for call in page if call.get("createdAt")), default=None)
+            if not oldest:
+                break
+
+            # Remember every call on the new boundary timestamp to skip it next page
+            page_boundary_ids = {call.get("id") for call in page if call.get("createdAt") == oldest}
+            boundary_ids = boundary_ids | page_boundary_ids if oldest == cursor else page_boundary_ids
+            cursor, cursor_param = oldest, "createdAtLe"
+
+            if len(page_boundary_ids) == len(page):
+                # More calls share this timestamp than fit in a page
+                tie_params = {
+                    key: value for key, value in params.items()
+                    if key in ("assistantId", "createdAtGt")
+                }
+                tie_params.update(limit=self.MAX_CALLS_PAGE_SIZE, createdAtGe=oldest, createdAtLe=oldest)
+                async with semaphore or nullcontext():
+                    tie = await self._fetch_call_page(tie_params)
+                if len(tie) >= self.MAX_CALLS_PAGE_SIZE:
+                    logger.warning(f"Over {self.MAX_CALLS_PAGE_SIZE} calls created at {oldest}, some may be skipped")
+
+                tie_calls = [call for call in tie if call.get("id") not in boundary_ids]
+                if tie_calls:
+                    yield tie_calls
+                cursor, cursor_param, boundary_ids = oldest, "createdAtLt", set()
+
+    async def iter_calls(
+        self,
+        assistant_id: Optional[str] = None,
+        created_at_gt: Optional[str] = None,
+        created_at_lt: Optional[str] = None,
+        window_days: Optional[int] = None,
+        max_concurrency: Optional[int] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Iterate over every call in a time range with concurrent sub-windows
+
+        Long date ranges are split into sub-windows that are paginated in
+        parallel under a bounded semaphore. Pages are yielded as soon as they
+        arrive (not in chronological order) so callers can aggregate them
+        without holding the whole range in memory.
 
         Args:
             assistant_id: Filter by assistant ID
-            start_date: Start date for analytics (ISO 8601)
-            end_date: End date for analytics (ISO 8601)
+            created_at_gt: Start date (ISO 8601)
+            created_at_lt: End date (ISO 8601)
+            window_days: Size of each sub-window in days
+            max_concurrency: Maximum number of in-flight requests
 
-        Returns:
-            Analytics data including metrics and time series data
+        Yields:
+            Lists of call data
         """
-        from datetime import datetime
-        from collections import defaultdict
-
-        calls = await self.get_calls(
-            assistant_id=assistant_id,
-            created_at_gt=start_date,
-            created_at_lt=end_date,
-            limit=100
+        windows = _split_time_range(
+            created_at_gt,
+            created_at_lt,
+            timedelta(days=window_days or settings.VAPI_CALLS_WINDOW_DAYS)
         )
 
-        # Calculate metrics from calls
-        total_calls = len(calls)
-        total_minutes = 0
-        total_cost = 0
-        successful_calls = 0
-        end_reasons = {}
-
-        # Time series data grouped by date
-        daily_data = defaultdict(lambda: {
-            "date": "",
-            "calls": 0,
-            "minutes": 0,
-            "cost": 0,
-            "avg_cost": 0
-        })
-
-        # Duration by assistant
-        assistant_durations = defaultdict(lambda: {"total_minutes": 0, "count": 0})
-
-        for call in calls:
-            # Duration in seconds to minutes
-            duration = call.get("duration", 0)
-            if duration:
-                total_minutes += duration / 60
-
-            # Cost
-            cost = call.get("cost", 0)
-            if cost:
-                total_cost += cost
-
-            # Status
-            status = call.get("status")
-            if status == "ended":
-                successful_calls += 1
-
-            # End reason
-            end_reason = call.get("endedReason", "unknown")
-            end_reasons[end_reason] = end_reasons.get(end_reason, 0) + 1
-
-            # Group by date for time series
-            created_at = call.get("createdAt")
-            if created_at:
-                # Parse ISO date and extract date only
-                date_str = created_at.split("T")[0]  # Get YYYY-MM-DD
-                daily_data[date_str]["date"] = date_str
-                daily_data[date_str]["calls"] += 1
-                daily_data[date_str]["minutes"] += duration / 60 if duration else 0
-                daily_data[date_str]["cost"] += cost if cost else 0
-
-            # Track duration by assistant
-            assistant_id_from_call = call.get("assistantId")
-            if assistant_id_from_call and duration:
-                assistant_durations[assistant_id_from_call]["total_minutes"] += duration / 60
-                assistant_durations[assistant_id_from_call]["count"] += 1
-
-        # Calculate average cost per call for each day
-        for date_key in daily_data:
-            if daily_data[date_key]["calls"] > 0:
-                daily_data[date_key]["avg_cost"] = round(
-                    daily_data[date_key]["cost"] / daily_data[date_key]["calls"], 4
-                )
-            daily_data[date_key]["minutes"] = round(daily_data[date_key]["minutes"], 2)
-            daily_data[date_key]["cost"] = round(daily_data[date_key]["cost"], 2)
-
-        # Convert to sorted list
-        time_series = sorted(daily_data.values(), key=lambda x: x["date"])
-
-        # Calculate average duration by assistant
-        avg_duration_by_assistant = {}
-        for assistant_id_key, data in assistant_durations.items():
-            if data["count"] > 0:
-                avg_duration_by_assistant[assistant_id_key] = round(
-                    data["total_minutes"] / data["count"], 2
-                )
-
-        avg_cost_per_call = total_cost / total_calls if total_calls > 0 else 0
-        avg_duration = total_minutes / total_calls if total_calls > 0 else 0
-
-        return {
-            "total_calls": total_calls,
-            "total_minutes": round(total_minutes, 2),
-            "total_cost": round(total_cost, 2),
-            "avg_cost_per_call": round(avg_cost_per_call, 4),
-            "avg_duration_minutes": round(avg_duration, 2),
-            "successful_calls": successful_calls,
-            "success_rate": round((successful_calls / total_calls * 100), 2) if total_calls > 0 else 0,
-            "end_reasons": end_reasons,
-            "time_series": time_series,
-            "avg_duration_by_assistant": avg_duration_by_assistant,
-            "calls": calls
-        }
+        if len(windows) == 1:
+            async for page in self.iter_call_pages(assistant_id, created_at_gt, created_at_lt):
+                yield page
+            return
+
+        max_concurrency = max_concurrency or settings.VAPI_MAX_CONCURRENT_REQUESTS
+        semaphore = asyncio.Semaphore(max_concurrency)
+        # Bounded queue applies backpressure so fetched pages don't pile up in memory
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_concurrency * 2)
+        window_done = object()
+
+        async def fetch_window(index: int, window_start: str, window_end: str):
+            try:
+                async for page in self.iter_call_pages(
+                    assistant_id,
+                    # The first window keeps the caller's exclusive lower bound
+                    created_at_gt=window_start if index == 0 else None,
+                    created_at_ge=window_start if index > 0 else None,
+                    created_at_lt=window_end,
+                    semaphore=semaphore
+                ):
+                    await queue.put(page)
+            except asyncio.CancelledError:
+                # The consumer stopped reading, nobody is left to drain the queue
+                raise
+            except Exception as e:
+                await queue.put(e)
+            else:
+                await queue.put(window_done)
+
+        tasks = [
+            asyncio.create_task(fetch_window(index, window_start, window_end))
+            for index, (window_start, window_end) in enumerate(windows)
+        ]
+
+        try:
+            remaining = len(tasks)
+            while remaining:
+                item = await queue.get()
+                if item is window_done:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
     async def get_voices(self) -> List[Dict[str, Any]]:
         """
@@ -994,18 +1264,19 @@ class VapiService:
             }
 
             # Call Vapi TTS endpoint
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    "https://api.vapi.ai/tts",
-                    headers=self.headers,
-                    json=payload
-                )
-                response.raise_for_status()
-
-                # Return audio data
-                audio_data = response.content
-                logger.info(f"Generated preview for voice {voice_id} ({provider}): {len(audio_data)} bytes")
-                return audio_data
+            client = self.client()
+            response = await client.post(
+                "https://api.vapi.ai/tts",
+                headers=self.headers,
+                json=payload,
+                timeout=60.0
+            )
+            response.raise_for_status()
+
+            # Return audio data
+            audio_data = response.content
+            logger.info(f"Generated preview for voice {voice_id} ({provider}): {len(audio_data)} bytes")
+            return audio_data
 
         except httpx.HTTPStatusError as e:
             logger.error(f"Vapi TTS error: {e.response.status_code} - {e.response.text}")
@@ -1032,16 +1303,11 @@ class VapiService:
             Cloned voice information
         """
         try:
-            # Prepare multipart form data
-            files = []
-            file_contents = []
-
-            for i, audio_file in enumerate(audio_files):
-                content = await audio_file.read()
-                file_contents.append(content)
-                files.append(
-                    ("files", (audio_file.filename, content, audio_file.content_type))
-                )
+            # Prepare multipart form data, streamed from the spooled uploads
+            files = [
+                ("files", (audio_file.filename, open_upload_stream(audio_file), audio_file.content_type))
+                for audio_file in audio_files
+            ]
 
             # Create form data
             data = {
@@ -1052,21 +1318,22 @@ class VapiService:
                 data["description"] = description
 
             # Call Vapi voice cloning endpoint (which uses ElevenLabs)
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/voice/clone",
-                    headers={"Authorization": f"Bearer {self.api_key}"},
-                    data=data,
-                    files=files
-                )
-                response.raise_for_status()
-                result = response.json()
-
-                logger.info(f"Voice cloned successfully: {result.get('id')}")
-                return {
-                    "success": True,
-                    "voice": result
-                }
+            client = self.client()
+            response = await client.post(
+                f"{self.base_url}/voice/clone",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                data=data,
+                files=files,
+                timeout=120.0
+            )
+            response.raise_for_status()
+            result = response.json()
+
+            logger.info(f"Voice cloned successfully: {result.get('id')}")
+            return {
+                "success": True,
+                "voice": result
+            }
 
         except httpx.HTTPStatusError as e:
             logger.error(f"Vapi voice cloning error: {e.response.status_code} - {e.response.text}")
@@ -1086,16 +1353,16 @@ class VapiService:
             Success response
         """
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.delete(
-                    f"{self.base_url}/voice/{voice_id}",
-                    headers=self.headers,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-
-                logger.info(f"Voice deleted: {voice_id}")
-                return {"success": True}
+            client = self.client()
+            response = await client.delete(
+                f"{self.base_url}/voice/{voice_id}",
+                headers=self.headers,
+                timeout=30.0
+            )
+            response.raise_for_status()
+
+            logger.info(f"Voice deleted: {voice_id}")
+            return {"success": True}
 
         except Exception as e:
             logger.error(f"Error deleting voice: {e}")
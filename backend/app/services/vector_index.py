@@ -0,0 +1,567 @@
+"""
+Vector Index - Semantic search over agent documents
+
+Chunk embeddings (app/services/embeddings.py) of each agent are stored in an
+append-only float32 matrix on disk (VECTOR_INDEX_DIR), memory-mapped for
+search, so large knowledge bases stay out of the Python heap.
+
+Search is exact (one matrix-vector product over the matrix) for small
+corpora. From VECTOR_ANN_MIN_VECTORS live vectors it is approximate, with
+an inverted file index: vectors are grouped by nearest k-means centroid and
+a query only scores the VECTOR_ANN_PROBES groups closest to it.
+"""
+
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple
+from contextlib import contextmanager
+import math
+import os
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.document import DocumentChunk
+from app.services.embeddings import embedding_service, normalize_rows
+from app.services.search_index import AgentIndexRegistry, fetch_chunk_results, index_executor
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within the process
+    fcntl = None
+
+
+class VectorStore:
+    """
+    Append-only matrix of chunk vectors on disk
+
+    vectors.f32 holds the rows (float32, row-major) and chunks.i64 the chunk
+    ID of each row. Writes and file swaps hold an exclusive lock (shared by
+    the workers using the directory), so rows are never interleaved or read
+    half-written. Rows of removed chunks stay until the store is compacted.
+    """
+
+    def __init__(self, directory: str, dimension: int):
+        self.directory = directory
+        self.dimension = dimension
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.chunks_path = os.path.join(directory, "chunks.i64")
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, open(os.path.join(self.directory, ".lock"), "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _disk_rows(self) -> int:
+        if not os.path.exists(self.vectors_path) or not os.path.exists(self.chunks_path):
+            return 0
+        return min(
+            os.path.getsize(self.vectors_path) // (4 * self.dimension),
+            os.path.getsize(self.chunks_path) // 8
+        )
+
+    def _generation(self) -> int:
+        """Changes when the files are replaced by a compaction"""
+        return os.stat(self.vectors_path).st_ino if os.path.exists(self.vectors_path) else 0
+
+    def read(self) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Map the stored rows: (vectors, chunk IDs, generation)"""
+        with self._locked():
+            rows = self._disk_rows()
+            generation = self._generation()
+            if rows == 0:
+                return np.zeros((0, self.dimension), dtype=np.float32), np.zeros(0, dtype=np.int64), generation
+            vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dimension))
+            chunk_ids = np.fromfile(self.chunks_path, dtype=np.int64, count=rows)
+            return vectors, chunk_ids, generation
+
+    def append(self, chunk_ids: List[int], vectors: np.ndarray) -> int:
+        """Append rows, returns the index of the first one"""
+        with self._locked():
+            rows = self._disk_rows()
+            # Drop a partial row left by an interrupted write
+            for path, size in ((self.vectors_path, rows * 4 * self.dimension), (self.chunks_path, rows * 8)):
+                if os.path.exists(path) and os.path.getsize(path) != size:
+                    os.truncate(path, size)
+
+            with open(self.vectors_path, "ab") as file:
+                file.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            with open(self.chunks_path, "ab") as file:
+                file.write(np.asarray(chunk_ids, dtype=np.int64).tobytes())
+            return rows
+
+    def compact(self, keep: np.ndarray, known_rows: int):
+        """
+        Rewrite the store with only the `keep` rows, plus any row appended
+        after the first `known_rows` (by another worker)
+        """
+        with self._locked():
+            rows = self._disk_rows()
+            keep = np.concatenate([keep[keep < rows], np.arange(known_rows, rows)]).astype(np.int64)
+            vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dimension))
+            chunk_ids = np.fromfile(self.chunks_path, dtype=np.int64, count=rows)
+
+            with open(self.vectors_path + ".tmp", "wb") as file:
+                for start in range(0, len(keep), 65536):
+                    file.write(np.ascontiguousarray(vectors[keep[start:start + 65536]]).tobytes())
+            chunk_ids[keep].tofile(self.chunks_path + ".tmp")
+
+            os.replace(self.chunks_path + ".tmp", self.chunks_path)
+            os.replace(self.vectors_path + ".tmp", self.vectors_path)
+
+
+class IVFIndex:
+    """
+    Inverted file index over rows of a vector matrix
+
+    sqrt(n) spherical k-means centroids are trained on a sample; each row is
+    listed under its nearest centroid. Rows of removed chunks stay listed and
+    are filtered out at query time.
+    """
+
+    TRAINING_ITERATIONS = 10
+    TRAINING_SAMPLE_PER_LIST = 64
+    ASSIGN_BATCH_SIZE = 16384
+
+    def __init__(self, vectors: np.ndarray, rows: np.ndarray, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.list_count = max(1, int(math.sqrt(len(rows))))
+        sample_size = min(len(rows), self.TRAINING_SAMPLE_PER_LIST * self.list_count)
+        sample = np.asarray(vectors[np.sort(rng.choice(rows, size=sample_size, replace=False))])
+        self.centroids = self._train(sample, rng)
+        self.trained_size = len(rows)
+        self.lists: List[np.ndarray] = [np.zeros(0, dtype=np.int64)] * self.list_count
+        self.add(vectors, rows)
+
+    def _train(self, sample: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        centroids = sample[rng.choice(len(sample), size=self.list_count, replace=False)].copy()
+        for _ in range(self.TRAINING_ITERATIONS):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            # Per-centroid sums as one matrix product
+            one_hot = np.zeros((len(sample), self.list_count), dtype=np.float32)
+            one_hot[np.arange(len(sample)), assignments] = 1.0
+            sums = one_hot.T @ sample
+            empty = one_hot.sum(axis=0) == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+            centroids = normalize_rows(sums)
+        return centroids
+
+    def add(self, vectors: np.ndarray, rows: np.ndarray):
+        """List rows under their nearest centroid"""
+        rows = np.asarray(rows, dtype=np.int64)
+        assignments = np.empty(len(rows), dtype=np.int64)
+        for start in range(0, len(rows), self.ASSIGN_BATCH_SIZE):
+            batch = np.asarray(vectors[rows[start:start + self.ASSIGN_BATCH_SIZE]])
+            assignments[start:start + len(batch)] = np.argmax(batch @ self.centroids.T, axis=1)
+
+        order = np.argsort(assignments, kind="stable")
+        sorted_lists = assignments[order]
+        sorted_rows = rows[order]
+        bounds = np.searchsorted(sorted_lists, np.arange(self.list_count + 1))
+        for list_id in np.unique(sorted_lists):
+            part = sorted_rows[bounds[list_id]:bounds[list_id + 1]]
+            existing = self.lists[list_id]
+            self.lists[list_id] = np.concatenate([existing, part]) if len(existing) else part
+
+    def candidates(self, query_vector: np.ndarray, probes: int) -> np.ndarray:
+        """Rows listed under the `probes` centroids closest to the query"""
+        probes = min(probes, self.list_count)
+        similarities = self.centroids @ query_vector
+        nearest = np.argpartition(-similarities, probes - 1)[:probes]
+        return np.concatenate([self.lists[list_id] for list_id in nearest])
+
+
+class VectorIndex:
+    """Vectors of one agent's chunks: stored rows mapped to live chunks, searched exactly or with IVF"""
+
+    def __init__(self, store: VectorStore, ann_min_vectors: int, probes: int):
+        self.store = store
+        self.ann_min_vectors = ann_min_vectors
+        self.probes = probes
+        self.lock = threading.Lock()
+        self._vectors = np.zeros((0, store.dimension), dtype=np.float32)
+        self._chunk_ids = np.zeros(0, dtype=np.int64)
+        self._generation = 0
+        self._alive = np.zeros(0, dtype=bool)
+        self._row_documents: List[Optional[str]] = []
+        self._documents: Dict[str, List[int]] = {}
+        self._live = 0
+        self._ivf: Optional[IVFIndex] = None
+
+    def __len__(self) -> int:
+        """Number of live vectors"""
+        return self._live
+
+    @property
+    def documents(self) -> Set[str]:
+        """IDs of the indexed documents"""
+        with self.lock:
+            return set(self._documents)
+
+    @property
+    def dead_rows(self) -> int:
+        return len(self._chunk_ids) - self._live
+
+    @property
+    def approximate(self) -> bool:
+        return self._ivf is not None
+
+    def attach(self, live_chunks: Dict[int, str]) -> List[int]:
+        """
+        Map the stored rows to the live chunks
+
+        Args:
+            live_chunks: chunk ID -> document ID of every chunk to search
+
+        Returns:
+            IDs of the live chunks without a stored vector
+        """
+        with self.lock:
+            self._vectors, self._chunk_ids, self._generation = self.store.read()
+            rows = len(self._chunk_ids)
+            self._alive = np.zeros(rows, dtype=bool)
+            self._row_documents = [None] * rows
+            self._documents = {}
+
+            # Latest row of each chunk (two workers may have stored the same one)
+            attached = set()
+            for row in range(rows - 1, -1, -1):
+                chunk_id = int(self._chunk_ids[row])
+                document_id = live_chunks.get(chunk_id)
+                if document_id is None or chunk_id in attached:
+                    continue
+                attached.add(chunk_id)
+                self._alive[row] = True
+                self._row_documents[row] = document_id
+                self._documents.setdefault(document_id, []).append(row)
+
+            self._live = len(attached)
+            self._ivf = None
+            self._update_ann()
+            return [chunk_id for chunk_id in live_chunks if chunk_id not in attached]
+
+    def attach_documents(self, documents: Dict[str, List[int]]) -> Optional[List[int]]:
+        """
+        Map stored rows to the chunks of documents added by other workers
+
+        The documents are replaced; the IVF lists are extended, not retrained.
+
+        Args:
+            documents: document ID -> IDs of all its chunks
+
+        Returns:
+            IDs of the chunks without a stored vector, None if the store was
+            compacted by another worker (attach everything again)
+        """
+        with self.lock:
+            known_rows = len(self._chunk_ids)
+            vectors_map, all_chunk_ids, generation = self.store.read()
+            if known_rows and generation != self._generation:
+                return None
+
+            wanted = {chunk_id: document_id for document_id, chunk_ids in documents.items() for chunk_id in chunk_ids}
+            for document_id in documents:
+                self._remove(document_id)
+
+            total_rows = len(all_chunk_ids)
+            alive = np.zeros(total_rows, dtype=bool)
+            alive[:known_rows] = self._alive[:known_rows]
+            self._row_documents.extend([None] * (total_rows - known_rows))
+
+            # Latest row of each chunk
+            attached = set()
+            new_rows = []
+            candidates = np.flatnonzero(np.isin(all_chunk_ids, np.fromiter(wanted, dtype=np.int64, count=len(wanted))))
+            for row in candidates[::-1].tolist():
+                chunk_id = int(all_chunk_ids[row])
+                if chunk_id in attached:
+                    continue
+                attached.add(chunk_id)
+                alive[row] = True
+                self._row_documents[row] = wanted[chunk_id]
+                self._documents.setdefault(wanted[chunk_id], []).append(row)
+                new_rows.append(row)
+
+            self._vectors, self._chunk_ids, self._generation, self._alive = vectors_map, all_chunk_ids, generation, alive
+            self._live += len(new_rows)
+            if self._ivf is not None and new_rows:
+                self._ivf.add(self._vectors, np.array(sorted(new_rows), dtype=np.int64))
+            self._update_ann()
+            return [chunk_id for chunk_id in wanted if chunk_id not in attached]
+
+    def add(self, document_id: str, chunk_ids: List[int], vectors: np.ndarray) -> bool:
+        """
+        Store and add (or replace) a document's vectors
+
+        Returns:
+            False if the store was compacted by another worker: rows must be
+            attached again
+        """
+        with self.lock:
+            self._remove(document_id)
+            known_rows = len(self._chunk_ids)
+            first_row = self.store.append(chunk_ids, vectors)
+            vectors_map, all_chunk_ids, generation = self.store.read()
+            if known_rows and generation != self._generation:
+                return False
+
+            # Rows appended meanwhile by other workers stay dead until the next attach
+            total_rows = len(all_chunk_ids)
+            alive = np.zeros(total_rows, dtype=bool)
+            alive[:known_rows] = self._alive[:known_rows]
+            new_rows = list(range(first_row, first_row + len(chunk_ids)))
+            alive[new_rows] = True
+
+            self._vectors, self._chunk_ids, self._generation, self._alive = vectors_map, all_chunk_ids, generation, alive
+            self._row_documents.extend([None] * (total_rows - known_rows))
+            for row in new_rows:
+                self._row_documents[row] = document_id
+            self._documents[document_id] = new_rows
+            self._live += len(new_rows)
+
+            if self._ivf is not None:
+                self._ivf.add(self._vectors, np.array(new_rows, dtype=np.int64))
+            self._update_ann()
+            return True
+
+    def remove(self, document_id: str) -> int:
+        """Remove a document's vectors from searches, returns how many"""
+        with self.lock:
+            removed = self._remove(document_id)
+            self._update_ann()
+            return removed
+
+    def compact(self):
+        """Drop the rows of removed chunks from the store (attach again afterwards)"""
+        with self.lock:
+            self.store.compact(np.flatnonzero(self._alive), known_rows=len(self._chunk_ids))
+
+    def _remove(self, document_id: str) -> int:
+        rows = self._documents.pop(document_id, None)
+        if not rows:
+            return 0
+        self._alive[rows] = False
+        for row in rows:
+            self._row_documents[row] = None
+        self._live -= len(rows)
+        return len(rows)
+
+    def _update_ann(self):
+        """Build the IVF index once there are enough vectors, retrain it when they doubled"""
+        if self._live < self.ann_min_vectors:
+            self._ivf = None
+        elif self._ivf is None or self._live > 2 * self._ivf.trained_size:
+            start = time.perf_counter()
+            self._ivf = IVFIndex(self._vectors, np.flatnonzero(self._alive))
+            logger.info(
+                f"Built IVF index: {self._live} vectors in {self._ivf.list_count} lists "
+                f"({time.perf_counter() - start:.2f}s)"
+            )
+
+    def search(
+        self,
+        query_vector: np.ndarray,
+        limit: int = 10,
+        document_ids: Optional[List[str]] = None,
+        exact: bool = False
+    ) -> List[Tuple[int, str, float]]:
+        """
+        Chunks closest to a query vector (cosine similarity)
+
+        Args:
+            query_vector: Normalized query embedding
+            limit: Max number of results
+            document_ids: Only search these documents (always exact)
+            exact: Score every vector even when the IVF index is built
+
+        Returns:
+            (chunk_id, document_id, score) tuples, best first
+        """
+        # A float64 query would upcast the whole matrix product
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        with self.lock:
+            if self._live == 0:
+                return []
+
+            if document_ids is not None:
+                rows = np.array(sorted(
+                    row for document_id in set(document_ids) for row in self._documents.get(document_id, [])
+                ), dtype=np.int64)
+            elif self._ivf is not None and not exact:
+                rows = self._ivf.candidates(query_vector, self.probes)
+                rows = np.sort(rows[self._alive[rows]])
+            else:
+                rows = None
+
+            if rows is None:
+                scores = np.asarray(self._vectors @ query_vector)
+                scores[~self._alive] = -np.inf
+                rows = np.arange(len(scores))
+            elif len(rows) == 0:
+                return []
+            else:
+                scores = np.asarray(self._vectors[rows]) @ query_vector
+
+            if len(scores) > limit:
+                top = np.argpartition(-scores, limit - 1)[:limit]
+            else:
+                top = np.arange(len(scores))
+            top = top[np.argsort(-scores[top], kind="stable")]
+
+            return [
+                (int(self._chunk_ids[rows[i]]), self._row_documents[rows[i]], float(scores[i]))
+                for i in top
+                # Nothing in common with the query
+                if scores[i] > 0
+            ]
+
+
+class VectorIndexRegistry(AgentIndexRegistry):
+    """Vector indexes of the agents searched recently"""
+
+    name = "vector"
+
+    # Chunks embedded per round when a load finds chunks without vectors
+    LOAD_EMBED_BATCH = 1000
+
+    def _store(self, agent_id: str) -> VectorStore:
+        # One directory per embedder: changing provider/model/dimension starts a new store
+        embedder = embedding_service.embedder
+        return VectorStore(os.path.join(settings.VECTOR_INDEX_DIR, embedder.key, agent_id), embedder.dimension)
+
+    def _new_index(self, agent_id: str) -> VectorIndex:
+        return VectorIndex(self._store(agent_id), settings.VECTOR_ANN_MIN_VECTORS, settings.VECTOR_ANN_PROBES)
+
+    def _store_missing(self, db: Session, index: VectorIndex, missing: List[int]):
+        """Embed chunks without a stored vector and append them to the store"""
+        # Chunks indexed before vectors existed, stored with another embedder, or by a worker that failed to embed
+        for offset in range(0, len(missing), self.LOAD_EMBED_BATCH):
+            batch = missing[offset:offset + self.LOAD_EMBED_BATCH]
+            contents = dict(db.execute(
+                select(DocumentChunk.id, DocumentChunk.content).where(DocumentChunk.id.in_(batch))
+            ).all())
+            chunk_ids = [chunk_id for chunk_id in batch if chunk_id in contents]
+            if chunk_ids:
+                vectors = embedding_service.embed_documents([contents[chunk_id] for chunk_id in chunk_ids])
+                index.store.append(chunk_ids, vectors)
+
+    def _load(self, db: Session, agent_id: str) -> VectorIndex:
+        index = self._new_index(agent_id)
+        live_chunks = dict(db.execute(
+            select(DocumentChunk.id, DocumentChunk.document_id).where(DocumentChunk.agent_id == agent_id)
+        ).all())
+
+        missing = index.attach(live_chunks)
+        if missing:
+            self._store_missing(db, index, missing)
+            index.attach(live_chunks)
+
+        if index.dead_rows > max(4096, len(index)):
+            index.compact()
+            index.attach(live_chunks)
+
+        logger.info(
+            f"Loaded vector index of agent {agent_id}: {len(index)} vectors "
+            f"({'IVF' if index.approximate else 'exact'}, {len(missing)} embedded)"
+        )
+        return index
+
+    def _apply(
+        self,
+        db: Session,
+        agent_id: str,
+        index: VectorIndex,
+        added: Dict[str, List[int]],
+        removed: Set[str]
+    ) -> bool:
+        for document_id in removed:
+            index.remove(document_id)
+        if not added:
+            return True
+
+        # Vectors of chunks indexed by other workers are usually in the store already
+        missing = index.attach_documents(added)
+        if missing is None:
+            return False
+        if missing:
+            self._store_missing(db, index, missing)
+            missing_set = set(missing)
+            documents = {
+                document_id: chunk_ids for document_id, chunk_ids in added.items()
+                if not missing_set.isdisjoint(chunk_ids)
+            }
+            if index.attach_documents(documents) is None:
+                return False
+        return True
+
+    def update_document(self, db: Session, agent_id: str, document_id: str, chunk_ids: List[int], vectors: np.ndarray):
+        """Store a document's chunk vectors and replace them in the agent's index, if loaded"""
+        entry = self._entry(agent_id, create=False)
+        if entry is not None:
+            with entry.write_lock:
+                if entry.index is not None and entry.signature is not None:
+                    removed = entry.index.remove(document_id)
+                    if entry.index.add(document_id, chunk_ids, vectors):
+                        self._adopt_signature(
+                            db, agent_id, entry, entry.signature[0] - removed + len(chunk_ids), chunk_ids
+                        )
+                    else:
+                        # Stored, but the store was compacted by another worker
+                        self._force_rebuild(entry)
+                    return
+
+        # Not loaded (or being rebuilt): stored for the agent's next load
+        self._store(agent_id).append(chunk_ids, vectors)
+
+    def remove_document(self, db: Session, agent_id: str, document_id: str):
+        """Remove a document from the agent's index, if loaded (its rows go at the next compaction)"""
+        entry = self._entry(agent_id, create=False)
+        if entry is None:
+            return
+        with entry.write_lock:
+            if entry.index is None or entry.signature is None:
+                return
+            removed = entry.index.remove(document_id)
+            self._adopt_signature(db, agent_id, entry, entry.signature[0] - removed)
+
+    def search(
+        self,
+        agent_id: str,
+        query: str,
+        limit: int = 10,
+        document_ids: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Semantic search of an agent's document chunks (blocking, run it in a threadpool)
+
+        Returns:
+            Closest chunks first, with their document, position and content
+
+        Raises:
+            IndexNotReady: If the agent's index is still being built
+        """
+        index = self.get(agent_id)
+        hits = index.search(embedding_service.embed_query(query), limit=limit, document_ids=document_ids)
+        db = SessionLocal()
+        try:
+            return fetch_chunk_results(db, hits)
+        finally:
+            db.close()
+
+
+# Global instance
+vector_indexes = VectorIndexRegistry(
+    max_agents=settings.SEARCH_INDEX_MAX_AGENTS,
+    max_staleness_seconds=settings.SEARCH_INDEX_MAX_STALENESS_SECONDS,
+    cold_wait_seconds=settings.SEARCH_INDEX_COLD_WAIT_SECONDS,
+    executor=index_executor,
+)
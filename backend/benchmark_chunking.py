@@ -0,0 +1,158 @@
+"""
+Benchmark of the document chunker
+
+Splits synthetic multi-megabyte documents (paragraphs of sentences, split
+in pages) with TextChunker (app/services/chunking.py) and with langchain's
+RecursiveCharacterTextSplitter, the splitter it replaces, and compares
+throughput, peak memory and output. Also measures streaming the pages
+through TextChunker.stream, and token-measured chunks.
+
+langchain is not a dependency of the app: install langchain-text-splitters
+to include it in the comparison.
+
+Usage:
+    python benchmark_chunking.py [megabytes...]
+    python benchmark_chunking.py 1 5 20
+"""
+
+from typing import Callable, List, Optional
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from loguru import logger
+
+from app.services.chunking import TextChunker, count_tokens
+
+
+DEFAULT_SIZES = [1, 5, 20]
+PAGE_SIZE = 3000  # Characters per page, like a dense PDF page
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+TOKEN_CHUNK_SIZE = 250
+TOKEN_CHUNK_OVERLAP = 50
+SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+WORDS = (
+    "le la les un une des de du et à en pour sur dans avec par est sont nous vous client réservation "
+    "horaires ouverture tarif chambre service the a of and to in for is are we you booking opening "
+    "hours price room policy refund delivery invoice account support appointment consultation"
+).split()
+
+
+def generate_pages(megabytes: float, seed: int = 42) -> List[str]:
+    """Pages of paragraphs of sentences, with occasional line breaks and long tokens"""
+    rng = random.Random(seed)
+    target = int(megabytes * 1024 * 1024)
+    pages, page, size = [], [], 0
+    while size < target:
+        sentences = []
+        for _ in range(rng.randint(1, 8)):
+            words = rng.choices(WORDS, k=rng.randint(5, 30))
+            if rng.random() < 0.02:
+                words.append("https://example.com/" + "x" * rng.randint(50, 300))
+            sentences.append(" ".join(words).capitalize() + ".")
+        paragraph = ("\n" if rng.random() < 0.2 else " ").join(sentences)
+        page.append(paragraph)
+        size += len(paragraph) + 2
+        if sum(len(p) for p in page) >= PAGE_SIZE:
+            pages.append("\n\n".join(page))
+            page = []
+    if page:
+        pages.append("\n\n".join(page))
+    return pages
+
+
+def load_langchain_splitter() -> Optional[Callable]:
+    try:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+    except ImportError:
+        try:
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
+        except ImportError:
+            return None
+    return RecursiveCharacterTextSplitter
+
+
+def import_seconds(module: str) -> float:
+    """Time to import a module in a fresh interpreter"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def measure(function: Callable[[], int]):
+    """
+    Seconds and result of a run, then peak memory in MB allocated by a second run
+
+    The document is allocated beforehand: only the splitter's allocations count.
+    """
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, result, peak / 1024 / 1024
+
+
+def report(name: str, megabytes: float, seconds: float, chunks: int, peak: float):
+    logger.info(f"    {name:<28} {seconds * 1000:8.0f} ms | {megabytes / seconds:6.1f} MB/s | {chunks:>6} chunks | peak {peak:6.1f} MB")
+
+
+def main(sizes: List[float]):
+    splitter_class = load_langchain_splitter()
+    if splitter_class is None:
+        logger.warning("langchain is not installed: pip install langchain-text-splitters to compare with it")
+    else:
+        module = splitter_class.__module__.split(".")[0]
+        logger.info(
+            f"Import time: {module} {import_seconds(module):.2f}s, "
+            f"app.services.chunking {import_seconds('app.services.chunking'):.2f}s (fresh interpreters)"
+        )
+
+    chunker = TextChunker(CHUNK_SIZE, CHUNK_OVERLAP, SEPARATORS)
+    token_chunker = TextChunker(TOKEN_CHUNK_SIZE, TOKEN_CHUNK_OVERLAP, SEPARATORS, length_function=count_tokens)
+
+    for megabytes in sizes:
+        pages = generate_pages(megabytes)
+        text = "\n".join(pages)
+        logger.info(f"{len(text) / 1024 / 1024:.1f} MB document, {len(pages)} pages")
+
+        native_seconds, native_chunks, peak = measure(lambda: len(chunker.split_text(text)))
+        report("TextChunker.split_text", megabytes, native_seconds, native_chunks, peak)
+
+        seconds, chunks, peak = measure(lambda: sum(1 for _ in chunker.stream(iter(pages))))
+        report("TextChunker.stream (pages)", megabytes, seconds, chunks, peak)
+
+        if splitter_class is not None:
+            splitter = splitter_class(
+                chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, length_function=len, separators=SEPARATORS
+            )
+            seconds, chunks, peak = measure(lambda: len(splitter.split_text(text)))
+            report("langchain split_text", megabytes, seconds, chunks, peak)
+            logger.info(f"    TextChunker {seconds / native_seconds:.1f}x faster")
+            if megabytes == sizes[0]:
+                same = chunker.split_text(text) == splitter.split_text(text)
+                logger.info(f"    Identical chunks: {same}")
+
+        if megabytes == sizes[0]:
+            seconds, chunks, peak = measure(lambda: len(token_chunker.split_text(text)))
+            report(f"TextChunker tokens ({TOKEN_CHUNK_SIZE})", megabytes, seconds, chunks, peak)
+            if splitter_class is not None:
+                splitter = splitter_class(
+                    chunk_size=TOKEN_CHUNK_SIZE, chunk_overlap=TOKEN_CHUNK_OVERLAP,
+                    length_function=count_tokens, separators=SEPARATORS
+                )
+                seconds, chunks, peak = measure(lambda: len(splitter.split_text(text)))
+                report(f"langchain tokens ({TOKEN_CHUNK_SIZE})", megabytes, seconds, chunks, peak)
+                same = token_chunker.split_text(text) == splitter.split_text(text)
+                logger.info(f"    Identical chunks: {same}")
+
+
+if __name__ == "__main__":
+    main([float(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,147 @@
+"""
+Benchmark of sync vs async database sessions under mixed load
+
+Simulates what the API does on one event loop: a mix of requests that read
+from the database and requests that mostly wait on an upstream API (Vapi,
+Google). With the sync Session, every query blocks the event loop, so the
+upstream-bound requests queue behind it. With the AsyncSession, the loop
+keeps serving them while queries run.
+
+Runs against a throwaway SQLite file (aiosqlite for the async side), which
+understates the gap compared to a networked PostgreSQL with asyncpg.
+
+Usage:
+    python benchmark_db.py [requests] [concurrency]
+    python benchmark_db.py 400 50
+"""
+
+import os
+import sys
+import time
+import asyncio
+import random
+import tempfile
+from statistics import median
+from typing import List
+
+from loguru import logger
+from sqlalchemy import create_engine, select, func, Column, Integer, String, Float
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+
+DEFAULT_REQUESTS = 400
+DEFAULT_CONCURRENCY = 50
+ROWS = 200_000
+DB_SHARE = 0.5  # fraction of requests hitting the database
+UPSTREAM_LATENCY = 0.02  # simulated upstream API call, in seconds
+
+BenchBase = declarative_base()
+
+
+class BenchCall(BenchBase):
+    __tablename__ = "bench_calls"
+
+    id = Column(Integer, primary_key=True)
+    assistant_id = Column(String(32), nullable=False)
+    duration = Column(Float, default=0.0)
+
+
+def per_assistant_query(assistant_id: str):
+    """Un-indexed aggregate, a stand-in for a moderately slow analytics query"""
+    return select(func.count(BenchCall.id), func.sum(BenchCall.duration)).where(
+        BenchCall.assistant_id == assistant_id
+    )
+
+
+def seed(url: str):
+    engine = create_engine(url)
+    BenchBase.metadata.create_all(engine)
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(BenchCall.__table__.insert(), [
+            {"assistant_id": f"assistant-{rng.randint(0, 19)}", "duration": rng.uniform(0, 600)}
+            for _ in range(ROWS)
+        ])
+    engine.dispose()
+
+
+def percentile(latencies: List[float], pct: float) -> float:
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_load(handler, requests: int, concurrency: int):
+    """Fire the requests with bounded concurrency, return per-kind latencies"""
+    semaphore = asyncio.Semaphore(concurrency)
+    rng = random.Random(7)
+    kinds = ["db" if rng.random() < DB_SHARE else "upstream" for _ in range(requests)]
+    latencies = {"db": [], "upstream": []}
+
+    async def one(i: int, kind: str):
+        async with semaphore:
+            start = time.perf_counter()
+            await handler(kind, f"assistant-{i % 20}")
+            latencies[kind].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i, kind) for i, kind in enumerate(kinds)))
+    return time.perf_counter() - start, latencies
+
+
+def report(name: str, requests: int, elapsed: float, latencies):
+    logger.info(
+        f"{name:<5} | {requests / elapsed:7.1f} req/s | "
+        f"db p50 {median(latencies['db']) * 1000:6.1f}ms | "
+        f"upstream p50 {median(latencies['upstream']) * 1000:6.1f}ms "
+        f"p99 {percentile(latencies['upstream'], 99) * 1000:6.1f}ms"
+    )
+
+
+async def main(requests: int, concurrency: int):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    seed(f"sqlite:///{path}")
+
+    sync_engine = create_engine(f"sqlite:///{path}")
+    SyncSession = sessionmaker(bind=sync_engine)
+
+    async def sync_handler(kind: str, assistant_id: str):
+        if kind == "db":
+            # Same shape as the old endpoints: a sync session inside an async route
+            db = SyncSession()
+            try:
+                db.execute(per_assistant_query(assistant_id)).one()
+            finally:
+                db.close()
+        else:
+            await asyncio.sleep(UPSTREAM_LATENCY)
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def async_handler(kind: str, assistant_id: str):
+        if kind == "db":
+            async with AsyncSession() as db:
+                (await db.execute(per_assistant_query(assistant_id))).one()
+        else:
+            await asyncio.sleep(UPSTREAM_LATENCY)
+
+    logger.info(f"{requests} requests, concurrency {concurrency}, {ROWS:,} rows, {DB_SHARE:.0%} database-bound")
+
+    elapsed, latencies = await run_load(sync_handler, requests, concurrency)
+    report("sync", requests, elapsed, latencies)
+
+    elapsed, latencies = await run_load(async_handler, requests, concurrency)
+    report("async", requests, elapsed, latencies)
+
+    sync_engine.dispose()
+    await async_engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    asyncio.run(main(
+        args[0] if len(args) > 0 else DEFAULT_REQUESTS,
+        args[1] if len(args) > 1 else DEFAULT_CONCURRENCY,
+    ))
@@ -0,0 +1,172 @@
+"""
+Benchmark of the local BM25 search index
+
+Builds a BM25Index (app/services/search_index.py) over a synthetic corpus
+of document chunks with a Zipf word distribution, then measures build time,
+postings size and query latency. The same queries are scored by a
+straightforward pure-Python BM25 (dict postings, one loop iteration per
+posting) to check the rankings and compare speed.
+
+Usage:
+    python benchmark_search.py [chunks] [--queries N]
+    python benchmark_search.py 100000 --queries 1000
+"""
+
+from typing import Dict, List, Tuple
+from collections import Counter
+import math
+import random
+import sys
+import time
+
+import numpy as np
+from loguru import logger
+
+from app.services.search_index import BM25Index, tokenize
+
+
+DEFAULT_CHUNKS = 100_000
+DEFAULT_QUERIES = 1000
+CHUNKS_PER_DOCUMENT = 20
+WORDS_PER_CHUNK = (80, 220)  # ~1000 characters, like DocumentService chunks
+VOCABULARY_SIZE = 50_000
+TOP_K = 10
+
+SEED_WORDS = (
+    "rendez-vous réservation horaires ouverture fermeture tarif remboursement garantie livraison "
+    "facture compte client assistance annulation disponibilité consultation adresse parking "
+    "appointment booking opening hours refund warranty delivery invoice account support "
+    "cancellation availability consultation address parking price policy manual service"
+).split()
+
+
+def generate_corpus(chunks: int, seed: int = 42) -> List[Tuple[int, str, str]]:
+    """(chunk_id, document_id, text) rows with Zipf-distributed words"""
+    rng = random.Random(seed)
+    syllables = ["ka", "ro", "mi", "te", "lu", "san", "ver", "do", "pi", "chen", "ma", "tro", "bel", "ni"]
+    vocabulary = list(SEED_WORDS)
+    while len(vocabulary) < VOCABULARY_SIZE:
+        vocabulary.append("".join(rng.choices(syllables, k=rng.randint(2, 4))) + str(len(vocabulary)))
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    cumulative = np.cumsum(weights)
+    cumulative /= cumulative[-1]
+
+    rows = []
+    for chunk_id in range(1, chunks + 1):
+        count = rng.randint(*WORDS_PER_CHUNK)
+        picks = np.searchsorted(cumulative, [rng.random() for _ in range(count)])
+        text = " ".join(vocabulary[pick] for pick in picks)
+        rows.append((chunk_id, f"doc-{chunk_id // CHUNKS_PER_DOCUMENT}", text))
+    return rows
+
+
+def generate_queries(rows: List[Tuple[int, str, str]], count: int, seed: int = 7) -> List[str]:
+    """Queries of 2 to 6 words taken from random chunks"""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        words = rng.choice(rows)[2].split()
+        queries.append(" ".join(rng.sample(words, min(len(words), rng.randint(2, 6)))))
+    return queries
+
+
+class NaiveBM25:
+    """Reference BM25 with dict postings, scored posting by posting"""
+
+    def __init__(self, rows: List[Tuple[int, str, str]], k1: float = 1.2, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.lengths: Dict[int, int] = {}
+        for chunk_id, _, text in rows:
+            terms = tokenize(text)
+            self.lengths[chunk_id] = len(terms)
+            for term, tf in Counter(terms).items():
+                self.postings.setdefault(term, {})[chunk_id] = tf
+        self.average_length = sum(self.lengths.values()) / len(self.lengths)
+
+    def search(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        return sorted(self.scores(query).items(), key=lambda item: -item[1])[:limit]
+
+    def scores(self, query: str) -> Dict[int, float]:
+        count = len(self.lengths)
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term, {})
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[chunk_id] / self.average_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+
+def postings_megabytes(index: BM25Index) -> float:
+    """Size of the postings arrays (allocated capacity)"""
+    size = sum(postings.slots.nbytes + postings.tfs.nbytes for postings in index._postings.values())
+    return size / 1024 / 1024
+
+
+def percentiles(latencies: List[float]) -> str:
+    values = np.array(latencies) * 1000
+    return (
+        f"p50 {np.percentile(values, 50):6.2f} ms | p95 {np.percentile(values, 95):6.2f} ms | "
+        f"p99 {np.percentile(values, 99):6.2f} ms | max {values.max():6.2f} ms"
+    )
+
+
+def main(chunks: int, query_count: int):
+    logger.info(f"Generating {chunks:,} chunks...")
+    rows = generate_corpus(chunks)
+    queries = generate_queries(rows, query_count)
+
+    start = time.perf_counter()
+    index = BM25Index()
+    index.add_many(rows)
+    build_seconds = time.perf_counter() - start
+    logger.info(
+        f"BM25Index built in {build_seconds:.1f}s ({chunks / build_seconds:,.0f} chunks/s), "
+        f"{len(index._postings):,} terms, postings {postings_megabytes(index):.0f} MB"
+    )
+
+    logger.info("Building the pure-Python reference...")
+    naive = NaiveBM25(rows)
+
+    latencies, naive_latencies = [], []
+    mismatches = 0
+    for query in queries:
+        start = time.perf_counter()
+        hits = index.search(query, limit=TOP_K)
+        latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        expected = naive.search(query, limit=TOP_K)
+        naive_latencies.append(time.perf_counter() - start)
+
+        # Scores are float32: chunks tied with the last result may be swapped
+        reference = naive.scores(query)
+        cutoff = expected[-1][1] if expected else 0.0
+        if any(abs(reference.get(chunk_id, 0.0) - cutoff) > 1e-4 * cutoff
+               for chunk_id in {chunk_id for chunk_id, _, _ in hits} - {chunk_id for chunk_id, _ in expected}):
+            mismatches += 1
+
+    logger.info(f"BM25Index  ({query_count} queries, top {TOP_K}): {percentiles(latencies)}")
+    logger.info(f"pure Python ({query_count} queries, top {TOP_K}): {percentiles(naive_latencies)}")
+    logger.info(f"Top-{TOP_K} results differing from the reference (beyond ties): {mismatches}/{query_count}")
+
+    # Incremental updates: remove then re-add one document
+    document_rows = [(chunk_id, text) for chunk_id, document_id, text in rows if document_id == "doc-1"]
+    start = time.perf_counter()
+    index.remove("doc-1")
+    index.add("doc-1", document_rows)
+    logger.info(f"Document of {len(document_rows)} chunks replaced in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    query_count = DEFAULT_QUERIES
+    if "--queries" in args:
+        position = args.index("--queries")
+        query_count = int(args[position + 1])
+        del args[position:position + 2]
+    main(int(args[0]) if args else DEFAULT_CHUNKS, query_count)
@@ -0,0 +1,122 @@
+"""
+Benchmark of the vector index
+
+Stores clustered random unit vectors in a VectorStore (a stand-in for
+chunk embeddings: overlapping topics in a low-dimensional latent space)
+and compares exact search (one product over the memory-mapped matrix) with
+the IVF index (app/services/vector_index.py): latency, recall@k of IVF
+against exact results for several probe counts, and IVF build time.
+
+Usage:
+    python benchmark_vectors.py [vectors...] [--dimension D] [--queries N]
+    python benchmark_vectors.py 10000 100000 --dimension 1024 --queries 200
+"""
+
+from typing import List
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+from loguru import logger
+
+from app.core.config import settings
+from app.services.embeddings import normalize_rows
+from app.services.vector_index import VectorIndex, VectorStore
+
+
+DEFAULT_SIZES = [10_000, 100_000]
+DEFAULT_QUERIES = 200
+TOP_K = 10
+PROBES = [4, 8, 16, 32]
+VECTORS_PER_CLUSTER = 200  # ~ chunks per topic
+LATENT_DIMENSION = 64  # text embeddings have a low intrinsic dimension
+SPREAD = 1.0  # spread of a topic around its center, in the latent space: topics overlap
+WRITE_BATCH = 10_000
+
+
+class ClusteredVectors:
+    """
+    Unit vectors around topic centers in a low-dimensional latent space,
+    projected to the embedding dimension, plus a little isotropic noise
+    """
+
+    def __init__(self, topics: int, dimension: int, seed: int = 42):
+        self.rng = np.random.default_rng(seed)
+        self.dimension = dimension
+        self.projection = (
+            self.rng.standard_normal((LATENT_DIMENSION, dimension)) / np.sqrt(LATENT_DIMENSION)
+        ).astype(np.float32)
+        self.centers = self.rng.standard_normal((topics, LATENT_DIMENSION)).astype(np.float32)
+
+    def sample(self, count: int) -> np.ndarray:
+        latent = self.centers[self.rng.integers(len(self.centers), size=count)]
+        latent = latent + (self.rng.standard_normal((count, LATENT_DIMENSION)) * SPREAD).astype(np.float32)
+        noise = (self.rng.standard_normal((count, self.dimension)) * 0.02).astype(np.float32)
+        return normalize_rows(latent @ self.projection + noise)
+
+
+def fill_store(store: VectorStore, vectors: ClusteredVectors, count: int):
+    """Append `count` vectors (chunk ids 1 to count) to the store"""
+    for start in range(0, count, WRITE_BATCH):
+        size = min(WRITE_BATCH, count - start)
+        store.append(list(range(start + 1, start + size + 1)), vectors.sample(size))
+
+
+def timed_search(index: VectorIndex, queries: np.ndarray, exact: bool):
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = index.search(query, limit=TOP_K, exact=exact)
+        latencies.append(time.perf_counter() - start)
+        results.append({chunk_id for chunk_id, _, _ in hits})
+    return results, np.array(latencies) * 1000
+
+
+def describe(latencies: np.ndarray) -> str:
+    return f"p50 {np.percentile(latencies, 50):7.2f} ms | p95 {np.percentile(latencies, 95):7.2f} ms"
+
+
+def main(sizes: List[int], dimension: int, query_count: int):
+    for count in sizes:
+        directory = tempfile.mkdtemp()
+        try:
+            store = VectorStore(directory, dimension)
+            vectors = ClusteredVectors(max(1, count // VECTORS_PER_CLUSTER), dimension)
+            fill_store(store, vectors, count)
+            logger.info(f"{count:,} vectors x {dimension} ({os.path.getsize(store.vectors_path) / 1024 / 1024:.0f} MB memory-mapped)")
+
+            # A single document: the IVF is built explicitly below
+            index = VectorIndex(store, ann_min_vectors=count + 1, probes=PROBES[0])
+            index.attach({chunk_id: "doc" for chunk_id in range(1, count + 1)})
+            # New samples of the same topics, not copies of stored vectors
+            queries = vectors.sample(query_count)
+
+            exact_results, exact_latencies = timed_search(index, queries, exact=True)
+            logger.info(f"    exact            {describe(exact_latencies)} | recall@{TOP_K} 1.000")
+
+            index.ann_min_vectors = 0
+            start = time.perf_counter()
+            index._update_ann()
+            logger.info(f"    IVF built in {time.perf_counter() - start:.1f}s ({index._ivf.list_count} lists)")
+
+            for probes in PROBES:
+                index.probes = probes
+                results, latencies = timed_search(index, queries, exact=False)
+                recall = np.mean([len(found & expected) / max(1, len(expected)) for found, expected in zip(results, exact_results)])
+                logger.info(f"    IVF {probes:>2} probes     {describe(latencies)} | recall@{TOP_K} {recall:.3f}")
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {"--dimension": settings.EMBEDDING_DIMENSION, "--queries": DEFAULT_QUERIES}
+    for option in options:
+        if option in args:
+            position = args.index(option)
+            options[option] = int(args[position + 1])
+            del args[position:position + 2]
+    main([int(arg) for arg in args] or DEFAULT_SIZES, options["--dimension"], options["--queries"])
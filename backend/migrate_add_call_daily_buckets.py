@@ -0,0 +1,42 @@
+"""
+Migration script to add daily call histograms
+
+Creates the call_daily_buckets table (duration and cost histograms used for
+percentiles) and backfills it, with the daily rollups, from the calls
+already stored in the calls table.
+
+Usage:
+    python migrate_add_call_daily_buckets.py
+"""
+
+from loguru import logger
+
+from app.core.database import engine, SessionLocal
+from app.models.call import CallDailyBucket
+from app.services.call_sync_service import call_sync_service
+
+
+def run_migration():
+    """Create call_daily_buckets and backfill it"""
+
+    try:
+        CallDailyBucket.__table__.create(bind=engine, checkfirst=True)
+        logger.info("Created call_daily_buckets table (if missing)")
+
+        db = SessionLocal()
+        try:
+            replayed = call_sync_service.rebuild_rollups(db)
+        finally:
+            db.close()
+
+        logger.info("✅ Migration completed successfully!")
+        logger.info(f"   - Backfilled histograms from {replayed} calls")
+
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    logger.info("Starting call histograms migration...")
+    run_migration()
@@ -0,0 +1,50 @@
+"""
+Migration script to move daily end reason counts to their own table
+
+Creates call_daily_end_reasons, rebuilds the daily rollups (which fills
+it) from the calls table, then drops the call_daily_rollups.end_reasons
+JSON column it replaces.
+
+Usage:
+    python migrate_add_call_daily_end_reasons.py
+"""
+
+from sqlalchemy import inspect, text
+from loguru import logger
+
+from app.core.database import engine, SessionLocal
+from app.models.call import CallDailyEndReason
+from app.services.call_sync_service import call_sync_service
+
+
+def run_migration():
+    """Create call_daily_end_reasons, backfill it and drop call_daily_rollups.end_reasons"""
+
+    try:
+        CallDailyEndReason.__table__.create(bind=engine, checkfirst=True)
+        logger.info("Created call_daily_end_reasons table (if missing)")
+
+        db = SessionLocal()
+        try:
+            replayed = call_sync_service.rebuild_rollups(db)
+        finally:
+            db.close()
+
+        columns = [column["name"] for column in inspect(engine).get_columns("call_daily_rollups")]
+        if "end_reasons" in columns:
+            with engine.connect() as conn:
+                conn.execute(text("ALTER TABLE call_daily_rollups DROP COLUMN end_reasons"))
+                conn.commit()
+            logger.info("Dropped call_daily_rollups.end_reasons column")
+
+        logger.info("✅ Migration completed successfully!")
+        logger.info(f"   - Backfilled end reasons from {replayed} calls")
+
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    logger.info("Starting call end reasons migration...")
+    run_migration()
@@ -0,0 +1,41 @@
+"""
+Migration script to add daily call rollups
+
+Creates the call_daily_rollups table and backfills it from the calls
+already stored in the calls table.
+
+Usage:
+    python migrate_add_call_rollups.py
+"""
+
+from loguru import logger
+
+from app.core.database import engine, SessionLocal
+from app.models.call import CallDailyRollup
+from app.services.call_sync_service import call_sync_service
+
+
+def run_migration():
+    """Create call_daily_rollups and backfill it"""
+
+    try:
+        CallDailyRollup.__table__.create(bind=engine, checkfirst=True)
+        logger.info("Created call_daily_rollups table (if missing)")
+
+        db = SessionLocal()
+        try:
+            replayed = call_sync_service.rebuild_rollups(db)
+        finally:
+            db.close()
+
+        logger.info("✅ Migration completed successfully!")
+        logger.info(f"   - Backfilled rollups from {replayed} calls")
+
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    logger.info("Starting call rollups migration...")
+    run_migration()
@@ -0,0 +1,112 @@
+"""
+Migration script to normalize conversation messages
+
+Creates the conversation_messages table, adds conversations.vapi_chat_id and
+copies the messages stored in the legacy conversations.messages JSON array
+into rows.
+
+Messages appended since the new code was deployed are kept: the legacy
+messages are merged in before them, which moves them up if needed.
+
+Usage:
+    python migrate_add_conversation_messages.py
+"""
+
+from datetime import datetime
+from sqlalchemy import func, inspect, text, update
+from loguru import logger
+
+from app.core.database import engine, SessionLocal
+from app.models.conversation import Conversation, ConversationMessage
+
+
+def _parse_timestamp(value):
+    """Parse a legacy ISO timestamp, None if missing or invalid"""
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _shift_messages(db, conversation_id: str, shift: int):
+    """Move a conversation's messages up by shift positions"""
+    # Through negative positions, so the unique (conversation_id, seq) index holds at every row
+    for seq in (-ConversationMessage.seq - 1, -ConversationMessage.seq - 1 + shift):
+        db.execute(
+            update(ConversationMessage)
+            .where(ConversationMessage.conversation_id == conversation_id)
+            .values(seq=seq)
+        )
+
+
+def run_migration():
+    """Create conversation_messages and backfill it from the JSON arrays"""
+
+    try:
+        columns = [column["name"] for column in inspect(engine).get_columns("conversations")]
+        if "vapi_chat_id" not in columns:
+            with engine.connect() as conn:
+                conn.execute(text("ALTER TABLE conversations ADD COLUMN vapi_chat_id VARCHAR(255)"))
+                conn.commit()
+            logger.info("Added conversations.vapi_chat_id column")
+
+        ConversationMessage.__table__.create(bind=engine, checkfirst=True)
+        logger.info("Created conversation_messages table (if missing)")
+
+        db = SessionLocal()
+        migrated = 0
+        try:
+            conversation_ids = [conversation_id for (conversation_id,) in db.query(Conversation.id).all()]
+            for conversation_id in conversation_ids:
+                conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+                legacy_messages = conversation.messages or []
+                if not legacy_messages:
+                    continue
+
+                # Skip already migrated conversations (the script can be re-run)
+                merged = db.query(ConversationMessage.role, ConversationMessage.content).filter(
+                    ConversationMessage.conversation_id == conversation.id,
+                    ConversationMessage.seq < len(legacy_messages)
+                ).order_by(ConversationMessage.seq).all()
+                if [tuple(row) for row in merged] == [
+                    (msg.get("role") or "user", msg.get("content") or "") for msg in legacy_messages
+                ]:
+                    continue
+
+                # Messages appended since the deploy go after the legacy ones
+                first_seq, last_seq = db.query(
+                    func.min(ConversationMessage.seq), func.max(ConversationMessage.seq)
+                ).filter(ConversationMessage.conversation_id == conversation.id).one()
+                if first_seq is not None and first_seq < len(legacy_messages):
+                    _shift_messages(db, conversation.id, len(legacy_messages) - first_seq)
+                    last_seq += len(legacy_messages) - first_seq
+
+                for seq, msg in enumerate(legacy_messages):
+                    db.add(ConversationMessage(
+                        conversation_id=conversation.id,
+                        seq=seq,
+                        role=msg.get("role") or "user",
+                        content=msg.get("content") or "",
+                        vapi_chat_id=msg.get("vapi_chat_id"),
+                        created_at=_parse_timestamp(msg.get("timestamp")) or conversation.started_at
+                    ))
+                    if msg.get("vapi_chat_id") and last_seq is None:
+                        conversation.vapi_chat_id = msg["vapi_chat_id"]
+
+                conversation.message_count = len(legacy_messages) if last_seq is None else last_seq + 1
+                db.commit()
+                migrated += 1
+        finally:
+            db.close()
+
+        logger.info("✅ Migration completed successfully!")
+        logger.info(f"   - Copied messages of {migrated} conversations")
+
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    logger.info("Starting conversation messages migration...")
+    run_migration()
@@ -0,0 +1,40 @@
+"""
+Migration script to add source offsets to document chunks
+
+Adds document_chunks.page, start_offset and end_offset. Chunks indexed
+before the migration keep NULL offsets until their document is indexed
+again.
+
+Usage:
+    python migrate_add_document_chunk_offsets.py
+"""
+
+from sqlalchemy import inspect, text
+from loguru import logger
+
+from app.core.database import engine
+
+
+def run_migration():
+    """Add page, start_offset and end_offset to document_chunks"""
+
+    try:
+        columns = [column["name"] for column in inspect(engine).get_columns("document_chunks")]
+
+        with engine.connect() as conn:
+            for column in ("page", "start_offset", "end_offset"):
+                if column not in columns:
+                    conn.execute(text(f"ALTER TABLE document_chunks ADD COLUMN {column} INTEGER"))
+                    logger.info(f"Added document_chunks.{column} column")
+            conn.commit()
+
+        logger.info("✅ Migration completed successfully!")
+
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    logger.info("Starting document chunk offsets migration...")
+    run_migration()
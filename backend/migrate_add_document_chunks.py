@@ -0,0 +1,44 @@
+"""
+Migration script to add local document search
+
+Adds documents.vapi_file_id and creates the document_chunks table used by
+the local BM25 index. Documents are indexed when they are uploaded.
+
+Usage:
+    python migrate_add_document_chunks.py
+"""
+
+from sqlalchemy import inspect, text
+from loguru import logger
+
+from app.core.database import engine
+from app.models.document import Document, DocumentChunk
+
+
+def run_migration():
+    """Add documents.vapi_file_id and create document_chunks"""
+
+    try:
+        Document.__table__.create(bind=engine, checkfirst=True)
+
+        columns = [column["name"] for column in inspect(engine).get_columns("documents")]
+        if "vapi_file_id" not in columns:
+            with engine.connect() as conn:
+                conn.execute(text("ALTER TABLE documents ADD COLUMN vapi_file_id VARCHAR(255)"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_documents_vapi_file_id ON documents(vapi_file_id)"))
+                conn.commit()
+            logger.info("Added documents.vapi_file_id column")
+
+        DocumentChunk.__table__.create(bind=engine, checkfirst=True)
+        logger.info("Created document_chunks table (if missing)")
+
+        logger.info("✅ Migration completed successfully!")
+
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    logger.info("Starting document chunks migration...")
+    run_migration()
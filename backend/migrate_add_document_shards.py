@@ -0,0 +1,34 @@
+"""
+Migration script to add document shards
+
+Creates the document_shards table, which records the Vapi files a large
+document was uploaded as when it is sharded (VAPI_SHARD_LARGE_DOCUMENTS or
+?shard=true on upload).
+
+Usage:
+    python migrate_add_document_shards.py
+"""
+
+from loguru import logger
+
+from app.core.database import engine
+from app.models.document import DocumentShard
+
+
+def run_migration():
+    """Create document_shards"""
+
+    try:
+        DocumentShard.__table__.create(bind=engine, checkfirst=True)
+        logger.info("Created document_shards table (if missing)")
+
+        logger.info("✅ Migration completed successfully!")
+
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    logger.info("Starting document shards migration...")
+    run_migration()
@@ -0,0 +1,35 @@
+"""
+Migration script to add the knowledge base file registry
+
+Creates the knowledge_base_files table mapping the SHA-256 of uploaded
+documents to their Vapi file. Files uploaded before this migration are not
+registered (their content was never hashed) and are uploaded once more on
+their next upload.
+
+Usage:
+    python migrate_add_knowledge_base_files.py
+"""
+
+from loguru import logger
+
+from app.core.database import engine
+from app.models.knowledge_base_file import KnowledgeBaseFile
+
+
+def run_migration():
+    """Create knowledge_base_files"""
+
+    try:
+        KnowledgeBaseFile.__table__.create(bind=engine, checkfirst=True)
+        logger.info("Created knowledge_base_files table (if missing)")
+
+        logger.info("✅ Migration completed successfully!")
+
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    logger.info("Starting knowledge base files migration...")
+    run_migration()
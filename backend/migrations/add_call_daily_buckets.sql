@@ -0,0 +1,14 @@
+-- Migration: Add daily call histograms for percentiles
+-- Description: Adds call_daily_buckets, maintained incrementally by the call sync
+-- Run migrate_add_call_daily_buckets.py afterwards to backfill it from existing calls
+
+CREATE TABLE IF NOT EXISTS call_daily_buckets (
+    assistant_id VARCHAR(255) NOT NULL,
+    day DATE NOT NULL,
+    metric VARCHAR(20) NOT NULL,
+    bucket INTEGER NOT NULL,
+
+    count INTEGER NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (assistant_id, day, metric, bucket)
+);
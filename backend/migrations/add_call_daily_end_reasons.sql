@@ -0,0 +1,16 @@
+-- Migration: Move daily end reason counts out of call_daily_rollups
+-- Description: Adds call_daily_end_reasons (incremented in SQL by concurrent syncs,
+-- unlike the JSON column it replaces) and drops call_daily_rollups.end_reasons
+-- Run migrate_add_call_daily_end_reasons.py afterwards to backfill it from existing calls
+
+CREATE TABLE IF NOT EXISTS call_daily_end_reasons (
+    assistant_id VARCHAR(255) NOT NULL,
+    day DATE NOT NULL,
+    reason VARCHAR(255) NOT NULL,
+
+    count INTEGER NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (assistant_id, day, reason)
+);
+
+ALTER TABLE call_daily_rollups DROP COLUMN IF EXISTS end_reasons;
@@ -0,0 +1,21 @@
+-- Migration: Add daily call rollups for analytics
+-- Description: Adds call_daily_rollups table, maintained incrementally by the call sync
+-- Run migrate_add_call_rollups.py afterwards to backfill rollups from existing calls
+
+CREATE TABLE IF NOT EXISTS call_daily_rollups (
+    assistant_id VARCHAR(255) NOT NULL,
+    day DATE NOT NULL,
+
+    calls INTEGER DEFAULT 0,
+    successful_calls INTEGER DEFAULT 0,
+    duration DOUBLE PRECISION DEFAULT 0,
+    duration_count INTEGER DEFAULT 0,
+    cost DOUBLE PRECISION DEFAULT 0,
+
+    -- Count of calls per end reason
+    end_reasons JSONB,
+
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (assistant_id, day)
+);
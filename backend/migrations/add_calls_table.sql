@@ -0,0 +1,35 @@
+-- Migration: Add local call store for analytics
+-- Description: Adds calls and call_sync_state tables populated by the incremental Vapi call sync
+
+-- Create calls table
+CREATE TABLE IF NOT EXISTS calls (
+    id VARCHAR PRIMARY KEY,
+    assistant_id VARCHAR(255) NOT NULL,
+
+    -- Call info
+    type VARCHAR(50),
+    status VARCHAR(50),
+    ended_reason VARCHAR(255),
+
+    -- Metrics
+    duration DOUBLE PRECISION DEFAULT 0,
+    cost DOUBLE PRECISION DEFAULT 0,
+
+    -- Summary of the Vapi call payload
+    data JSONB,
+
+    -- Timestamps
+    created_at TIMESTAMP NOT NULL,
+    ended_at TIMESTAMP,
+    synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Analytics queries filter by assistant and date range
+CREATE INDEX IF NOT EXISTS idx_calls_assistant_created ON calls(assistant_id, created_at);
+
+-- Create call_sync_state table (incremental sync cursor per assistant)
+CREATE TABLE IF NOT EXISTS call_sync_state (
+    assistant_id VARCHAR(255) PRIMARY KEY,
+    last_created_at TIMESTAMP,
+    last_synced_at TIMESTAMP
+);
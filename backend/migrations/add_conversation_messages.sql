@@ -0,0 +1,24 @@
+-- Migration: Normalize conversation messages
+-- Description: Adds an append-only conversation_messages table and stores the latest Vapi chat ID on conversations
+
+-- Latest Vapi chat ID (previousChatId for the next turn)
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS vapi_chat_id VARCHAR(255);
+
+-- Create conversation_messages table
+CREATE TABLE IF NOT EXISTS conversation_messages (
+    id VARCHAR PRIMARY KEY,
+    conversation_id VARCHAR NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+
+    role VARCHAR(50) NOT NULL,
+    content TEXT NOT NULL,
+    vapi_chat_id VARCHAR(255),
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Messages are appended and paginated by position within a conversation
+CREATE UNIQUE INDEX IF NOT EXISTS idx_conversation_messages_conversation_seq
+    ON conversation_messages(conversation_id, seq);
+
+-- Existing JSON messages are copied over by migrate_add_conversation_messages.py
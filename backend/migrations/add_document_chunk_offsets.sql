@@ -0,0 +1,6 @@
+-- Migration: Document chunk offsets
+-- Description: Records where each chunk comes from in the extracted text (page and character offsets)
+
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS page INTEGER;
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS start_offset INTEGER;
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS end_offset INTEGER;
@@ -0,0 +1,20 @@
+-- Migration: Local document search
+-- Description: Stores the chunks of uploaded documents for the local BM25 index and links documents to their Vapi file
+
+-- Vapi file the local document was uploaded as
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS vapi_file_id VARCHAR(255);
+CREATE INDEX IF NOT EXISTS ix_documents_vapi_file_id ON documents(vapi_file_id);
+
+-- Create document_chunks table
+CREATE TABLE IF NOT EXISTS document_chunks (
+    id SERIAL PRIMARY KEY,
+    document_id VARCHAR NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    agent_id VARCHAR NOT NULL,
+
+    seq INTEGER NOT NULL,
+    content TEXT NOT NULL
+);
+
+-- Chunks are loaded per agent, and ordered within a document
+CREATE INDEX IF NOT EXISTS ix_document_chunks_agent_id ON document_chunks(agent_id);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_document_chunks_document_seq ON document_chunks(document_id, seq);
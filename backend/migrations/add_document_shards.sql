@@ -0,0 +1,23 @@
+-- Migration: Document shards
+-- Description: Vapi files a large document was uploaded as (text shards under the recommended file size)
+
+CREATE TABLE IF NOT EXISTS document_shards (
+    id SERIAL PRIMARY KEY,
+    document_id VARCHAR NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+
+    seq INTEGER NOT NULL,
+    vapi_file_id VARCHAR(255) NOT NULL,
+    filename VARCHAR(500) NOT NULL,
+    size INTEGER NOT NULL,
+    content_sha256 VARCHAR(64) NOT NULL,
+
+    start_offset INTEGER NOT NULL,
+    end_offset INTEGER NOT NULL,
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Shards are listed per document, and found by Vapi file when a file is deleted
+CREATE INDEX IF NOT EXISTS ix_document_shards_document_id ON document_shards(document_id);
+CREATE INDEX IF NOT EXISTS ix_document_shards_vapi_file_id ON document_shards(vapi_file_id);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_document_shards_document_seq ON document_shards(document_id, seq);
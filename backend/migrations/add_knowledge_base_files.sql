@@ -0,0 +1,23 @@
+-- Migration: Knowledge base file registry
+-- Description: Maps the SHA-256 of uploaded documents to their Vapi file, so re-uploads reuse it
+
+CREATE TABLE IF NOT EXISTS knowledge_base_files (
+    id VARCHAR PRIMARY KEY,
+    user_id VARCHAR NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+
+    content_sha256 VARCHAR(64) NOT NULL,
+    vapi_file_id VARCHAR(255) NOT NULL,
+
+    filename VARCHAR(500) NOT NULL,
+    file_size INTEGER NOT NULL,
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- One Vapi file per content and user
+CREATE UNIQUE INDEX IF NOT EXISTS uq_knowledge_base_files_user_sha256
+    ON knowledge_base_files(user_id, content_sha256);
+
+-- Registry entries are dropped when their Vapi file is deleted
+CREATE INDEX IF NOT EXISTS ix_knowledge_base_files_vapi_file_id
+    ON knowledge_base_files(vapi_file_id);